@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from dashboard_cache import FoldingCache
+from db_operations import JeopardyDB
+
+@dataclass
+class LLMScore:
+    llm_id: int
+    llm_name: str
+    rating_count: int
+    accuracy: float
+    coherence: float
+    completion: float
+    question_structure: float
+    avg_generated_tokens: float
+    avg_input_tokens: float
+    avg_judge_input_tokens: float
+
+# Measures summed per LLM, and the LLMScore field holding each one's mean
+MEASURES = {
+    "accuracy": "accuracy",
+    "coherence": "coherence",
+    "completion": "completion",
+    "question_structure": "question_structure",
+    "generated_tokens": "avg_generated_tokens",
+    "input_tokens": "avg_input_tokens",
+    "judge_input_tokens": "avg_judge_input_tokens",
+}
+
+@dataclass
+class LLMTotals:
+    """Running rating count, and sum and non-null count of every measure, for one LLM."""
+    llm_id: int
+    llm_name: str
+    rating_count: int = 0
+    sums: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def plus(self, row) -> "LLMTotals":
+        return LLMTotals(
+            llm_id=self.llm_id, llm_name=self.llm_name, rating_count=self.rating_count + row.rating_count,
+            sums={name: self.sums.get(name, 0.0) + (getattr(row, f"{name}_sum") or 0.0) for name in MEASURES},
+            counts={name: self.counts.get(name, 0) + getattr(row, f"{name}_count") for name in MEASURES})
+
+    def score(self) -> LLMScore:
+        means = {field_name: self.sums[name] / self.counts[name] if self.counts.get(name) else None
+                 for name, field_name in MEASURES.items()}
+        return LLMScore(llm_id=self.llm_id, llm_name=self.llm_name, rating_count=self.rating_count, **means)
+
+class ScoreBoard:
+    """
+    Per-LLM mean scores computed in SQL and kept up to date per (test_run, judge).
+
+    Totals are folded forward as ratings arrive: a refresh only aggregates the ratings
+    written since the last one, and when nothing changed it costs one primary-key lookup.
+    """
+
+    def __init__(self, db: JeopardyDB):
+        self.db = db
+        self._cache = FoldingCache(maxsize=64)
+
+    def summary(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None) -> List[LLMScore]:
+        """
+        Get the mean score of every LLM for a test run and judge.
+
+        Args:
+            test_run_id (Optional[int]): Only ratings from this test run; all runs when None.
+            judge_model (Optional[str]): Only ratings by this judge; all judges when None.
+
+        Returns:
+            List[LLMScore]: One entry per LLM that has at least one rating, ordered by LLM id.
+        """
+        def update(totals: Optional[Dict[int, LLMTotals]], after_id: int, up_to_id: int) -> Dict[int, LLMTotals]:
+            totals = dict(totals or {})
+            for row in self.db.get_llm_score_totals(test_run_id, judge_model, after_id, up_to_id):
+                llm_totals = totals.get(row.llm_id, LLMTotals(llm_id=row.llm_id, llm_name=row.llm_name))
+                totals[row.llm_id] = llm_totals.plus(row)
+            return totals
+
+        with self.db.session_scope():
+            _, rating_watermark = self.db.get_watermarks()
+            totals = self._cache.get((test_run_id, judge_model), rating_watermark, update)
+        return [totals[llm_id].score() for llm_id in sorted(totals)]
+
+    def runs_of(self, llm_id: int, judge_model: Optional[str] = None) -> Dict[int, LLMScore]:
+        """
+        Get an LLM's mean scores in every test run it was rated in, by test run id.
+
+        All runs are aggregated in one query and cached as a single entry, so a model
+        with many runs does not push every other summary out of the cache.
+        """
+        def update(totals: Optional[Dict[int, LLMTotals]], after_id: int, up_to_id: int) -> Dict[int, LLMTotals]:
+            totals = dict(totals or {})
+            for row in self.db.get_llm_score_totals(None, judge_model, after_id, up_to_id, llm_id=llm_id,
+                                                    by_test_run=True):
+                run_totals = totals.get(row.test_run_id, LLMTotals(llm_id=row.llm_id, llm_name=row.llm_name))
+                totals[row.test_run_id] = run_totals.plus(row)
+            return totals
+
+        with self.db.session_scope():
+            _, rating_watermark = self.db.get_watermarks()
+            totals = self._cache.get(("runs_of", llm_id, judge_model), rating_watermark, update)
+        return {test_run_id: totals[test_run_id].score() for test_run_id in sorted(totals)}
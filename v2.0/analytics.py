@@ -0,0 +1,256 @@
+import copy
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dashboard_cache import FoldingCache
+from db_operations import CRITERIA, JeopardyDB
+
+# Question attributes scores can be broken down by
+DIMENSIONS = ("category", "round", "value_amount", "air_year")
+
+@dataclass
+class SliceScore:
+    llm_id: int
+    llm_name: str
+    label: object
+    rating_count: int
+    accuracy: Optional[float]
+    coherence: Optional[float]
+    completion: Optional[float]
+    question_structure: Optional[float]
+
+@dataclass
+class Pivot:
+    """Mean of one criterion for every (slice, LLM) pair; NaN where there are too few ratings."""
+    dimension: str
+    metric: str
+    labels: List[object]
+    llm_names: List[str]
+    means: np.ndarray
+    counts: np.ndarray
+
+def _label_order(label) -> Tuple[bool, object]:
+    """Sort key for slice labels; None (no value or air date) sorts first."""
+    return (label is not None, label)
+
+class ScoreCube:
+    """
+    Judge ratings pre-aggregated per LLM, category, round, value and air year.
+
+    Built from JeopardyDB.get_score_cube_rows. Every breakdown is rolled up from the cube
+    with NumPy, so drilling down or changing a range filter never queries the database.
+    Newer ratings are added with `folded`, which costs as much as the new cube rows plus a
+    copy of the cube, however many ratings it already holds.
+    """
+
+    def __init__(self, rows: Sequence = ()):
+        self.size = 0
+        self.llm_ids: List[int] = []
+        self.llm_names: List[str] = []
+        self.labels: Dict[str, List] = {dimension: [] for dimension in DIMENSIONS}
+        self._llm_codes: Dict[int, int] = {}
+        self._label_codes: Dict[str, Dict] = {dimension: {} for dimension in DIMENSIONS}
+        # cube key (llm_id, category, round, value_amount, air_year) -> position in the arrays
+        self._positions: Dict[Tuple, int] = {}
+
+        self.llm_codes = np.empty(0, dtype=np.int64)
+        self.codes: Dict[str, np.ndarray] = {dimension: np.empty(0, dtype=np.int64) for dimension in DIMENSIONS}
+        # numeric copies for range filters; NaN where the question has no value or air date
+        self.value_amount = np.empty(0)
+        self.air_year = np.empty(0)
+        self.rating_counts = np.empty(0, dtype=np.int64)
+        self.sums: Dict[str, np.ndarray] = {criterion: np.empty(0) for criterion in CRITERIA}
+        self.counts: Dict[str, np.ndarray] = {criterion: np.empty(0, dtype=np.int64) for criterion in CRITERIA}
+        self._add(rows)
+
+    def folded(self, rows: Sequence) -> "ScoreCube":
+        """
+        Return a copy of this cube with more cube rows added, e.g. those of newer ratings.
+
+        This cube is left untouched, so threads still reading it are not disturbed.
+        """
+        cube = copy.copy(self)
+        cube.llm_ids = list(self.llm_ids)
+        cube.llm_names = list(self.llm_names)
+        cube.labels = {dimension: list(labels) for dimension, labels in self.labels.items()}
+        cube._llm_codes = dict(self._llm_codes)
+        cube._label_codes = {dimension: dict(codes) for dimension, codes in self._label_codes.items()}
+        cube._positions = dict(self._positions)
+        cube._add(rows)
+        return cube
+
+    def _llm_code(self, row) -> int:
+        code = self._llm_codes.get(row.llm_id)
+        if code is None:
+            code = self._llm_codes[row.llm_id] = len(self.llm_ids)
+            self.llm_ids.append(row.llm_id)
+            self.llm_names.append(row.llm_name)
+        return code
+
+    def _label_code(self, dimension: str, label) -> int:
+        code = self._label_codes[dimension].get(label)
+        if code is None:
+            code = self._label_codes[dimension][label] = len(self.labels[dimension])
+            self.labels[dimension].append(label)
+        return code
+
+    def _add(self, rows: Sequence):
+        # arrays are replaced, never written in place, so copies made by `folded` stay independent
+        updated_positions, updated_rows, new_rows = [], [], []
+        for row in rows:
+            key = (row.llm_id, row.category, row.round, row.value_amount, row.air_year)
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = self.size + len(new_rows)
+                new_rows.append(row)
+            else:
+                updated_positions.append(position)
+                updated_rows.append(row)
+
+        def merged(array: np.ndarray, values, dtype) -> np.ndarray:
+            array = array.copy()
+            np.add.at(array, np.array(updated_positions, dtype=np.int64),
+                      np.array([values(row) for row in updated_rows], dtype=dtype))
+            return np.concatenate([array, np.array([values(row) for row in new_rows], dtype=dtype)])
+
+        self.rating_counts = merged(self.rating_counts, lambda row: row.rating_count, np.int64)
+        self.sums, self.counts = dict(self.sums), dict(self.counts)
+        for criterion in CRITERIA:
+            self.sums[criterion] = merged(self.sums[criterion],
+                                          lambda row: getattr(row, f"{criterion}_sum") or 0.0, float)
+            self.counts[criterion] = merged(self.counts[criterion],
+                                            lambda row: getattr(row, f"{criterion}_count"), np.int64)
+
+        self.llm_codes = np.concatenate([self.llm_codes, np.array([self._llm_code(row) for row in new_rows],
+                                                                  dtype=np.int64)])
+        self.codes = {dimension: np.concatenate([self.codes[dimension], np.array(
+            [self._label_code(dimension, getattr(row, dimension)) for row in new_rows], dtype=np.int64)])
+            for dimension in DIMENSIONS}
+        self.value_amount = np.concatenate([self.value_amount,
+                                            np.array([row.value_amount for row in new_rows], dtype=float)])
+        self.air_year = np.concatenate([self.air_year, np.array([row.air_year for row in new_rows], dtype=float)])
+        self.size += len(new_rows)
+
+    def _mask(self, value_range: Optional[Tuple[Optional[float], Optional[float]]] = None,
+              year_range: Optional[Tuple[Optional[float], Optional[float]]] = None,
+              rounds: Optional[Sequence[str]] = None) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        for values, bounds in ((self.value_amount, value_range), (self.air_year, year_range)):
+            low, high = bounds or (None, None)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        if rounds:
+            round_codes = [code for code, label in enumerate(self.labels["round"]) if label in rounds]
+            mask &= np.isin(self.codes["round"], round_codes)
+        return mask
+
+    def rollup(self, dimension: str, value_range=None, year_range=None,
+               rounds: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Roll the cube up to (LLM, dimension) cells.
+
+        Args:
+            dimension (str): One of DIMENSIONS.
+            value_range: Inclusive (low, high) clue value bounds; either may be None.
+            year_range: Inclusive (low, high) air year bounds; either may be None.
+            rounds (Optional[Sequence[str]]): Only these rounds.
+
+        Returns:
+            Tuple: Rating counts, per-criterion score sums and per-criterion score counts,
+            each shaped (number of LLMs, number of labels of `dimension`).
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Cannot break down by {dimension}; expected one of {list(DIMENSIONS)}")
+        mask = self._mask(value_range, year_range, rounds)
+        shape = (len(self.llm_ids), len(self.labels[dimension]))
+        cells = self.llm_codes[mask] * shape[1] + self.codes[dimension][mask]
+        size = shape[0] * shape[1]
+
+        def total(weights: np.ndarray) -> np.ndarray:
+            return np.bincount(cells, weights=weights[mask], minlength=size).reshape(shape)
+
+        return (total(self.rating_counts).astype(np.int64),
+                {criterion: total(self.sums[criterion]) for criterion in CRITERIA},
+                {criterion: total(self.counts[criterion]).astype(np.int64) for criterion in CRITERIA})
+
+    def breakdown(self, dimension: str, value_range=None, year_range=None,
+                  rounds: Optional[Sequence[str]] = None, min_count: int = 1) -> List[SliceScore]:
+        """
+        Mean score per LLM for every slice of `dimension`, after the range filters.
+
+        Returns:
+            List[SliceScore]: One entry per (LLM, slice) with at least `min_count` ratings.
+        """
+        rating_counts, sums, counts = self.rollup(dimension, value_range, year_range, rounds)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = {criterion: sums[criterion] / counts[criterion] for criterion in CRITERIA}
+        scores = []
+        for llm_code, label_code in zip(*np.nonzero(rating_counts >= max(min_count, 1))):
+            scores.append(SliceScore(
+                llm_id=self.llm_ids[llm_code],
+                llm_name=self.llm_names[llm_code],
+                label=self.labels[dimension][label_code],
+                rating_count=int(rating_counts[llm_code, label_code]),
+                **{criterion: (float(means[criterion][llm_code, label_code])
+                               if counts[criterion][llm_code, label_code] else None) for criterion in CRITERIA},
+            ))
+        return scores
+
+    def pivot(self, dimension: str, metric: str = "accuracy", value_range=None, year_range=None,
+              rounds: Optional[Sequence[str]] = None, min_count: int = 1,
+              limit: Optional[int] = None, weakest_first: bool = False) -> Pivot:
+        """
+        Slices x LLMs matrix of one criterion's mean, for heatmaps and tables.
+
+        Args:
+            metric (str): One of CRITERIA.
+            min_count (int): Cells with fewer scored ratings are NaN; slices where every cell
+                is NaN are dropped.
+            limit (Optional[int]): Keep at most this many slices.
+            weakest_first (bool): Order slices by their mean across LLMs, lowest first,
+                instead of by label.
+        """
+        if metric not in CRITERIA:
+            raise ValueError(f"Unknown metric {metric}; expected one of {list(CRITERIA)}")
+        _, sums, counts = self.rollup(dimension, value_range, year_range, rounds)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts[metric] >= max(min_count, 1), sums[metric] / counts[metric], np.nan)
+        keep = np.nonzero(~np.all(np.isnan(means), axis=0))[0]
+        if weakest_first:
+            with np.errstate(invalid="ignore"):
+                keep = keep[np.argsort(np.nanmean(means[:, keep], axis=0), kind="stable")]
+        else:
+            # labels are coded in the order they were first seen
+            keep = np.array(sorted(keep, key=lambda code: _label_order(self.labels[dimension][code])), dtype=np.int64)
+        if limit is not None:
+            keep = keep[:limit]
+        return Pivot(dimension=dimension, metric=metric,
+                     labels=[self.labels[dimension][code] for code in keep],
+                     llm_names=list(self.llm_names),
+                     means=means[:, keep].T,
+                     counts=counts[metric][:, keep].T)
+
+class Analytics:
+    """
+    Score cubes per (test_run, judge), kept up to date as ratings arrive.
+
+    Building a cube is one GROUP BY over the ratings. After that, every drill-down is served
+    from memory, and each refresh only aggregates the ratings written since the last one.
+    """
+
+    def __init__(self, db: JeopardyDB):
+        self.db = db
+        self._cache = FoldingCache(maxsize=16)
+
+    def cube(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None) -> ScoreCube:
+        def update(cube: Optional[ScoreCube], after_id: int, up_to_id: int) -> ScoreCube:
+            rows = self.db.get_score_cube_rows(test_run_id, judge_model, after_id, up_to_id)
+            return ScoreCube(rows) if cube is None else cube.folded(rows)
+
+        with self.db.session_scope():
+            _, rating_watermark = self.db.get_watermarks()
+            return self._cache.get((test_run_id, judge_model), rating_watermark, update)
@@ -0,0 +1,53 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from db_operations import LLM
+
+class AnswerCache:
+    """
+    Answers that decoding makes deterministic, shared by every test run of a sweep.
+
+    At temperature 0 a model decodes greedily, so top_p and top_k make no difference:
+    the answer only depends on the model, the prompt and the output limits, and is asked
+    for once. Calls for the same answer that overlap wait for the one already in flight.
+    Failed calls are not cached, so a retry asks again.
+    """
+
+    def __init__(self):
+        self._results: Dict[Hashable, Dict] = {}
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(llm: LLM, prompt: str, limits: Dict[str, Optional[int | List[str]]],
+            decoding: Optional[Dict]) -> Optional[Hashable]:
+        """The key an answer is cached under, or None if it is sampled and so not reusable."""
+        if not decoding or decoding.get("temperature") != 0:
+            return None
+        return llm.provider.lower(), llm.name, prompt, json.dumps(limits, sort_keys=True)
+
+    async def aget(self, key: Hashable, make_call: Callable[[], Awaitable[Dict]]) -> Dict:
+        """The cached result for `key`, awaiting `make_call()` only if no call for it was made yet."""
+        if key in self._results:
+            self.hits += 1
+            return self._results[key]
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._in_flight[key] = asyncio.ensure_future(self._call(key, make_call))
+        else:
+            self.hits += 1
+        # one waiter giving up, e.g. past its deadline, does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _call(self, key: Hashable, make_call: Callable[[], Awaitable[Dict]]) -> Dict:
+        try:
+            self._results[key] = result = await make_call()
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._results)}
@@ -1,7 +1,10 @@
 import os
 import anthropic
 from dotenv import load_dotenv
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional
+
+from hedging import request_timeout
+from streaming import PerLoop, collect_stream
 
 load_dotenv()
 
@@ -10,16 +13,44 @@ class AnthropicClaude:
         # Set your Anthropic API key
         self.ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
         
-        # Initialize the Anthropic AI client
-        self.client = anthropic.Anthropic(api_key=self.ANTHROPIC_API_KEY)
+        # Initialize the Anthropic AI clients; this adapter is shared process-wide, and the
+        # async client's connections belong to an event loop, so there is one per loop
+        self.client = anthropic.Anthropic(api_key=self.ANTHROPIC_API_KEY, timeout=request_timeout())
+        self._async_clients = PerLoop(lambda: anthropic.AsyncAnthropic(api_key=self.ANTHROPIC_API_KEY,
+                                                                       timeout=request_timeout()))
+
+    def _request(self, prompt: str, model_name: str, max_tokens: Optional[int], stop: Optional[List[str]],
+                 decoding: Optional[Dict]) -> Dict:
+        # Format the prompt as expected by the API
+        formatted_prompt = f"\n\nHuman: {prompt}"
+        request = dict(
+            model=model_name,
+            messages=[
+                {"role": "user", "content": formatted_prompt}
+            ],
+            max_tokens=max_tokens or 500,
+            temperature=0.7
+        )
+        # temperature, top_p and top_k, when given, override the defaults above
+        request.update(decoding or {})
+        # the Messages API rejects stop sequences that are only whitespace
+        stop_sequences = [sequence for sequence in stop or [] if sequence.strip()]
+        if stop_sequences:
+            request["stop_sequences"] = stop_sequences
+        return request
 
-    def generate_answer(self, prompt : str, model_name : str) -> Dict[str, str | int]:
+    def generate_answer(self, prompt : str, model_name : str, max_tokens: Optional[int] = None,
+                        stop: Optional[List[str]] = None,
+                        decoding: Optional[Dict] = None) -> Dict[str, str | int]:
         """
         Send a question to the Claude model and return the response.
 
         Args:
             prompt (str): The input prompt for the model.
             model_name (str): The name of the Claude model to use.
+            max_tokens (Optional[int]): Most tokens to generate; 500 when None.
+            stop (Optional[List[str]]): Sequences that end the answer.
+            decoding (Optional[Dict]): temperature (0.7 when not given), top_p and top_k.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -35,18 +66,9 @@ class AnthropicClaude:
         #    "content": "You are Claude, an AI assistant created by Anthropic. Please provide a helpful response to the user's query."
         #}
 
-        # Format the prompt as expected by the API
-        formatted_prompt = f"\n\nHuman: {prompt}"
-
         # Call the Claude model and get the response
-        response = self.client.messages.create(
-            model=model_name,
-            messages=[
-                {"role": "user", "content": formatted_prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
+        request = self._request(prompt, model_name, max_tokens, stop, decoding)
+        response = self.client.messages.create(**request)
 
         # Calculate the token counts
         return {
@@ -57,6 +79,34 @@ class AnthropicClaude:
             "input_token_count": response.usage.input_tokens
         }
 
+    async def astream_answer(self, prompt: str, model_name: str, max_tokens: Optional[int] = None,
+                             stop: Optional[List[str]] = None,
+                             decoding: Optional[Dict] = None) -> AsyncIterator[Dict[str, str | int]]:
+        """
+        Stream the Claude model's answer as it is generated.
+
+        Yields:
+            dict: {"text": ...} for each piece of the answer, then
+            {"generated_token_count": ..., "input_token_count": ...} once it is complete.
+        """
+        request = self._request(prompt, model_name, max_tokens, stop, decoding)
+        async with self._async_clients.get().messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield {"text": text}
+            message = await stream.get_final_message()
+        yield {"generated_token_count": message.usage.output_tokens, "input_token_count": message.usage.input_tokens}
+
+    async def agenerate_answer(self, prompt: str, model_name: str, max_tokens: Optional[int] = None,
+                               stop: Optional[List[str]] = None,
+                               decoding: Optional[Dict] = None) -> Dict[str, str | int | float]:
+        """
+        Like generate_answer, but streamed, so many answers can be generated on one event loop.
+
+        The result also has "time_to_first_token" and "latency", in seconds.
+        """
+        return await collect_stream(self.astream_answer(prompt, model_name, max_tokens, stop, decoding),
+                                    f"claude/{model_name}", prompt)
+
 # Example usage
 if __name__ == "__main__":
     prompt = "Who killed Jessica Rabbit?"
@@ -0,0 +1 @@
+# Benchmarks are run as modules from the v2.0 directory, e.g. `python -m benchmarks.bench_judging_memory`.
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from sqlalchemy import insert
+
+import view_responses
+from benchmarks.synthetic_db import build_synthetic_db
+from db_operations import JeopardyDB, LLMJudgeRating
+
+JUDGES = ["gpt-4", "claude-3-opus"]
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def summarise(latencies: List[float], elapsed: float) -> Dict:
+    if not latencies:
+        return {"calls": 0}
+    return {
+        "calls": len(latencies),
+        "calls_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+def user_actions(llm_ids: List[int]):
+    """What a dashboard user does: the handlers behind the LLM and judge dropdowns and the chart."""
+    return {
+        "display_llm_responses": lambda rng: view_responses.display_llm_responses(rng.choice(llm_ids)),
+        "display_judge_ratings": lambda rng: view_responses.display_judge_ratings(rng.choice(llm_ids),
+                                                                                  rng.choice(JUDGES)),
+        "plot_spider_chart": lambda rng: view_responses.plot_spider_chart(None, rng.choice(JUDGES)),
+    }
+
+def write_ratings(db_file: str, interval: float, batch: int, stop: threading.Event) -> int:
+    """
+    Add a batch of ratings every `interval` seconds, like a judging job running next to the dashboard.
+
+    Every batch moves the rating watermark, so the users' cached pages and totals go stale.
+    """
+    db = JeopardyDB(db_file)
+    with db.session_scope():
+        max_response_id, _ = db.get_watermarks()
+    rng = random.Random(1)
+    written = 0
+    while not stop.wait(interval):
+        rows = [dict(llm_response_id=rng.randint(1, max_response_id), test_run_id=1, judge_model=JUDGES[0],
+                     accuracy=round(rng.random(), 2), coherence=round(rng.random(), 2),
+                     completion=round(rng.random(), 2), question_structure=1.0,
+                     generated_tokens=8, input_token_count=300, judge_llm_response="")
+                for _ in range(batch)]
+        db.session.execute(insert(LLMJudgeRating), rows)
+        db.session.commit()
+        written += batch
+    db.close()
+    return written
+
+def run(questions: int, llms: int, users: int, seconds: float, think_ms: float, write_interval: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        build_synthetic_db(db_file, n_questions=questions, n_llms=llms, judges=JUDGES).close()
+        view_responses.database_file = db_file
+        with view_responses.get_db().session_scope():
+            llm_ids = [llm.id for llm in view_responses.get_db().get_all_llms()]
+        actions = user_actions(llm_ids)
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def user(seed: int):
+            rng = random.Random(seed)
+            local_latencies, local_errors = defaultdict(list), defaultdict(int)
+            while time.perf_counter() < deadline:
+                name = rng.choice(list(actions))
+                start = time.perf_counter()
+                try:
+                    actions[name](rng)
+                except Exception as e:
+                    local_errors[f"{name}: {type(e).__name__}"] += 1
+                local_latencies[name].append(time.perf_counter() - start)
+                if think_ms:
+                    time.sleep(rng.expovariate(1000 / think_ms))
+            with lock:
+                for name, values in local_latencies.items():
+                    latencies[name].extend(values)
+                for name, count in local_errors.items():
+                    errors[name] += count
+
+        writes = {}
+        stop = threading.Event()
+        writer = None
+        if write_interval:
+            writer = threading.Thread(
+                target=lambda: writes.update(ratings=write_ratings(db_file, write_interval, 100, stop)))
+            writer.start()
+        threads = [threading.Thread(target=user, args=(seed,)) for seed in range(users)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if writer is not None:
+            writer.join()
+        view_responses.get_db().close()
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        "benchmark": "dashboard",
+        "questions": questions,
+        "llms": llms,
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "think_ms": think_ms,
+        "ratings_written": writes.get("ratings", 0),
+        "overall": summarise(all_latencies, elapsed),
+        "handlers": {name: summarise(values, elapsed) for name, values in sorted(latencies.items())},
+        "errors": dict(errors),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard users against a synthetic database.")
+    parser.add_argument("--questions", type=int, default=50000, help="Questions per LLM in the synthetic database.")
+    parser.add_argument("--llms", type=int, default=4, help="Number of LLMs.")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent dashboard users.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long the users keep clicking.")
+    parser.add_argument("--think_ms", type=float, default=0.0,
+                        help="Mean pause between a user's actions; 0 clicks as fast as possible.")
+    parser.add_argument("--write_interval", type=float, default=0.0,
+                        help="Seconds between batches of new ratings written alongside; 0 writes nothing.")
+    parser.add_argument("--max_p95_ms", type=float, default=None, help="Fail if the overall p95 exceeds this.")
+    args = parser.parse_args()
+
+    result = run(args.questions, args.llms, args.users, args.seconds, args.think_ms, args.write_interval)
+    passed = not result["errors"] and result["overall"]["calls"] > 0
+    if args.max_p95_ms is not None:
+        passed = passed and result["overall"]["p95_ms"] <= args.max_p95_ms
+    result["passed"] = passed
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+from benchmarks.synthetic_db import build_synthetic_db
+from judge_manager import JudgeManager
+from judges.judge import Judge
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MiB."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+@dataclass
+class ConstantJudge(Judge):
+    """Judge that answers instantly with a fixed score, so only our own overhead is measured."""
+
+    def _make_api_call(self, prompt: str, system_prompt: str, max_tokens: int, temperature: float) -> Tuple[int, int, str]:
+        return 250, 3, "0.8"
+
+class RssSamplingJudgeManager(JudgeManager):
+    """Records RSS after every unit of work written by judge_unrated_responses."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.samples = []
+        insert_ratings = self.db.insert_llm_judge_ratings
+
+        def insert_and_sample(ratings):
+            written = insert_ratings(ratings)
+            self.samples.append((time.perf_counter(), current_rss_mb()))
+            return written
+        self.db.insert_llm_judge_ratings = insert_and_sample
+
+def run(ratings: int, batch_size: int, max_growth_mb: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        build_synthetic_db(db_file, n_questions=ratings, n_llms=1).close()
+
+        manager = RssSamplingJudgeManager(db_file, judges=[ConstantJudge(name="bench-judge", env_key="")])
+        start_rss = current_rss_mb()
+        start = time.perf_counter()
+        written = manager.judge_unrated_responses(llm_id=1, test_run_id=1, judge_llm="bench-judge",
+                                                  batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        manager.db.close()
+
+    rss = [sample[1] for sample in manager.samples]
+    # measure growth after the first 10% so one-off warm-up allocations are not counted
+    warm = rss[max(1, len(rss) // 10) - 1]
+    growth = max(rss) - warm
+    return {
+        "benchmark": "judging_memory",
+        "ratings": written,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "ratings_per_sec": round(written / elapsed, 1),
+        "rss_start_mb": round(start_rss, 1),
+        "rss_after_warmup_mb": round(warm, 1),
+        "rss_peak_mb": round(max(rss), 1),
+        "rss_growth_mb": round(growth, 1),
+        "max_growth_mb": max_growth_mb,
+        "passed": growth <= max_growth_mb,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that judging memory stays flat over a long run.")
+    parser.add_argument("--ratings", type=int, default=100000, help="Number of responses to rate.")
+    parser.add_argument("--batch_size", type=int, default=100, help="Responses per unit of work.")
+    parser.add_argument("--max_growth_mb", type=float, default=25.0,
+                        help="Fail if RSS grows by more than this after warm-up.")
+    args = parser.parse_args()
+
+    result = run(args.ratings, args.batch_size, args.max_growth_mb)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["passed"] else 1)
@@ -0,0 +1,132 @@
+import argparse
+import http.client
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import event
+
+from benchmarks.synthetic_db import build_synthetic_db
+from leaderboard_api import make_server
+
+PATHS = ["/leaderboard", "/leaderboard?judge=gpt-4", "/runs/1", "/models/1", "/models/2"]
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def run_clients(port: int, clients: int, seconds: float, conditional: bool) -> Dict:
+    """
+    Poll the API from `clients` threads for `seconds`, each on its own keep-alive connection.
+
+    With `conditional`, clients send back the ETag they last saw for each path, like a
+    well-behaved poller, and mostly get 304s.
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(offset: int):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        etags: Dict[str, str] = {}
+        local_latencies, local_statuses = [], Counter()
+        request = offset
+        while time.perf_counter() < deadline:
+            path = PATHS[request % len(PATHS)]
+            request += 1
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            start = time.perf_counter()
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[response.status] += 1
+            etags[path] = response.getheader("ETag")
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "statuses": dict(statuses),
+    }
+
+def cold_requests(port: int) -> Dict[str, float]:
+    """Time the first request to every path, which builds its aggregates."""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    timings = {}
+    for path in PATHS:
+        start = time.perf_counter()
+        connection.request("GET", path)
+        connection.getresponse().read()
+        timings[path] = round((time.perf_counter() - start) * 1000, 1)
+    connection.close()
+    return timings
+
+def run(questions: int, clients: int, seconds: float, watermark_ttl: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        build_synthetic_db(db_file, n_questions=questions, n_llms=3, judges=["gpt-4"]).close()
+
+        server = make_server(db_file, port=0, watermark_ttl=watermark_ttl)
+        queries = Counter()
+        event.listen(server.RequestHandlerClass.service.db.engine, "before_cursor_execute",
+                     lambda *args: queries.update(["sql"]))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            phases = {"cold_ms": cold_requests(server.server_port)}
+            for name, conditional in (("cached_200", False), ("conditional_304", True)):
+                queries.clear()
+                phases[name] = run_clients(server.server_port, clients, seconds, conditional)
+                phases[name]["db_queries"] = queries["sql"]
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.RequestHandlerClass.service.db.close()
+
+    # each TTL expiry costs two primary-key lookups, and nothing else may touch the database
+    allowed_queries = 2 * (math.ceil(seconds / watermark_ttl) + 1)
+    conditional = phases["conditional_304"]
+    return {
+        "benchmark": "leaderboard_api",
+        "questions": questions,
+        "clients": clients,
+        "seconds_per_phase": seconds,
+        "watermark_ttl": watermark_ttl,
+        "phases": phases,
+        "passed": conditional["db_queries"] <= allowed_queries
+                  and conditional["statuses"].get(304, 0) >= conditional["requests"] - clients * len(PATHS),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the leaderboard API against a synthetic database.")
+    parser.add_argument("--questions", type=int, default=20000, help="Questions per LLM in the synthetic database.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent polling clients.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase.")
+    parser.add_argument("--watermark_ttl", type=float, default=1.0, help="Server watermark TTL in seconds.")
+    args = parser.parse_args()
+
+    result = run(args.questions, args.clients, args.seconds, args.watermark_ttl)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["passed"] else 1)
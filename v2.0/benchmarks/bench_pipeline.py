@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from benchmarks.bench_startup import SOURCE_DIR, time_import
+
+BENCH_LLM = "mock-bench"
+BENCH_JUDGE = "mock-judge"
+
+# Metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    ("generate", "items_per_sec"): True,
+    ("generate", "db_rows_per_sec"): True,
+    ("generate", "p99_ms"): False,
+    ("generate", "peak_rss_mb"): False,
+    ("judge", "items_per_sec"): True,
+    ("judge", "db_rows_per_sec"): True,
+    ("judge", "p99_ms"): False,
+    ("judge", "peak_rss_mb"): False,
+    ("startup", "gen_jeopardy"): False,
+    ("startup", "gen_judgement"): False,
+}
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class WriteTimer:
+    """Counts the rows a JeopardyDB insert method writes and the time spent writing them."""
+
+    def __init__(self, owner, name: str):
+        """Replace `owner.name`, on a JeopardyDB instance or on the class itself, with a timed version."""
+        self.rows = 0
+        self.seconds = 0.0
+        insert = getattr(owner, name)
+
+        def timed_insert(*args):
+            start = time.perf_counter()
+            written = insert(*args)
+            self.seconds += time.perf_counter() - start
+            self.rows += len(args[-1])
+            return written
+        setattr(owner, name, timed_insert)
+
+def summarise(items: int, elapsed: float, latencies: List[float], writes: WriteTimer) -> Dict:
+    return {
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(items / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "db_rows": writes.rows,
+        "db_write_seconds": round(writes.seconds, 3),
+        "db_rows_per_sec": round(writes.rows / writes.seconds, 1) if writes.seconds else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def generate_phase(db_file: str, batch_size: int, concurrency: int) -> Dict:
+    """Answer every question with the mock provider through gen_jeopardy's pipeline."""
+    from db_operations import JeopardyDB, LLMResponse
+    from gen_jeopardy import generate_answers
+    from prompts import PROMPTS
+
+    # the pipeline opens its own JeopardyDB, so inserts are timed on the class
+    writes = WriteTimer(JeopardyDB, "insert_llm_responses")
+    with JeopardyDB(db_file) as db:
+        llm = db.get_llm(db.insert_llm(BENCH_LLM, "Mock"))
+        test_run_id = db.insert_test_run(PROMPTS["play"]["user"], PROMPTS["play"]["system"])
+
+    start = time.perf_counter()
+    written = generate_answers(llm, db_file, test_run_id, batch_size, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+
+    with JeopardyDB(db_file) as db:
+        # the per-answer latency the pipeline recorded, from request to last token
+        latencies = [latency for (latency,) in db.session.query(LLMResponse.latency)
+                     .filter(LLMResponse.test_run_id == test_run_id, LLMResponse.latency.isnot(None))]
+    return summarise(written, elapsed, latencies, writes)
+
+def judge_phase(db_file: str, batch_size: int) -> Dict:
+    """Rate every answer of the generate phase with the mock judge through JudgeManager."""
+    from db_operations import LLM
+    from judge_manager import JudgeManager
+
+    manager = JudgeManager(db_file, BENCH_JUDGE)
+    with manager.db.session_scope():
+        llm_id = manager.db.session.query(LLM.id).filter(LLM.name == BENCH_LLM).scalar()
+        test_run_id = manager.db.get_last_test_run_id()
+    writes = WriteTimer(manager.db, "insert_llm_judge_ratings")
+
+    latencies = []
+    for judge in manager.judges:
+        judge_llmresponse = judge.judge_llmresponse
+
+        def timed_judgement(*args, judge_llmresponse=judge_llmresponse):
+            start = time.perf_counter()
+            rating = judge_llmresponse(*args)
+            latencies.append(time.perf_counter() - start)
+            return rating
+        judge.judge_llmresponse = timed_judgement
+
+    start = time.perf_counter()
+    written = manager.judge_unrated_responses(llm_id, test_run_id, BENCH_JUDGE, batch_size)
+    elapsed = time.perf_counter() - start
+    manager.db.close()
+    return summarise(written, elapsed, latencies, writes)
+
+def run_phase(phase: str, db_file: str, args: argparse.Namespace, env: Dict[str, str]) -> Dict:
+    """Run one phase in a fresh interpreter, so its peak RSS is its own."""
+    command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--phase", phase, "--db_file", db_file,
+               "--batch_size", str(args.batch_size), "--concurrency", str(args.concurrency)]
+    completed = subprocess.run(command, cwd=SOURCE_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def git_commit() -> Optional[str]:
+    completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SOURCE_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return None
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SOURCE_DIR,
+                           capture_output=True, text=True).stdout.strip()
+    return completed.stdout.strip() + ("-dirty" if dirty else "")
+
+def run(questions: int, args: argparse.Namespace) -> Dict:
+    from benchmarks.synthetic_db import build_synthetic_db
+
+    env = dict(os.environ, MOCK_LATENCY_MS=str(args.latency_ms), MOCK_JUDGE_LATENCY_MS=str(args.judge_latency_ms),
+               MOCK_SEED="0", MOCK_JUDGE_SEED="0")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        # questions and rendered prompts only; the phases add the answers and ratings
+        build_synthetic_db(db_file, n_questions=questions, n_llms=0, n_test_runs=0).close()
+        generate = run_phase("generate", db_file, args, env)
+        judge = run_phase("judge", db_file, args, env) if "error" not in generate else {"error": "skipped"}
+        db_mb = sum(os.path.getsize(path) for path in (db_file, db_file + "-wal") if os.path.exists(path)) / (1024 * 1024)
+
+    return {
+        "questions": questions,
+        "latency_ms": args.latency_ms,
+        "judge_latency_ms": args.judge_latency_ms,
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "db_mb": round(db_mb, 1),
+        "generate": generate,
+        "judge": judge,
+    }
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """
+    Compare a result with the baseline run of the same size and settings.
+
+    Returns:
+        List[Dict]: One entry per metric, with "regressed" set when it is more than
+        `tolerance` (a fraction) worse than the baseline.
+    """
+    changes = []
+    for (section, metric), higher_is_better in COMPARED_METRICS.items():
+        new, old = result.get(section, {}).get(metric), baseline.get(section, {}).get(metric)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        changes.append({"metric": f"{section}.{metric}", "baseline": old, "value": new,
+                        "change": round(change, 3),
+                        "regressed": -change > tolerance if higher_is_better else change > tolerance})
+    return changes
+
+def find_baseline(baseline_file: str, result: Dict) -> Optional[Dict]:
+    """The most recent result in a results file that was run with the same settings."""
+    settings = ("questions", "latency_ms", "judge_latency_ms", "batch_size", "concurrency")
+    baseline = None
+    with open(baseline_file, encoding="utf-8") as results:
+        for line in results:
+            if line.strip():
+                for entry in json.loads(line)["results"]:
+                    if all(entry.get(key) == result[key] for key in settings):
+                        baseline = entry
+    return baseline
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure answer generation and judging end to end against the mock provider and judge.")
+    parser.add_argument("--questions", type=int, nargs="+", default=[1000],
+                        help="Synthetic question set sizes to run, e.g. 1000 10000 200000.")
+    parser.add_argument("--latency_ms", type=float, default=0.0,
+                        help="Median simulated provider latency; 0 measures only our own overhead.")
+    parser.add_argument("--judge_latency_ms", type=float, default=0.0, help="Median simulated judge latency.")
+    parser.add_argument("--batch_size", type=int, default=25, help="Questions and ratings per committed batch.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Answers streamed at once.")
+    parser.add_argument("--startup_repeats", type=int, default=3,
+                        help="Fresh interpreters per CLI when timing startup; 0 skips it.")
+    parser.add_argument("--output", type=str, default=None,
+                        help="JSON Lines file the result is appended to, one line per run.")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Results file to compare against; its latest run with the same settings is used.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Fail if a compared metric is worse than the baseline by more than this fraction.")
+    # internal: run a single phase in this process
+    parser.add_argument("--phase", choices=["generate", "judge"], default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--db_file", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "generate":
+        print(json.dumps(generate_phase(args.db_file, args.batch_size, args.concurrency)))
+        sys.exit(0)
+    if args.phase == "judge":
+        print(json.dumps(judge_phase(args.db_file, args.batch_size)))
+        sys.exit(0)
+
+    startup = {}
+    if args.startup_repeats:
+        for module in ("gen_jeopardy", "gen_judgement"):
+            startup[module] = time_import(module, args.startup_repeats).get("median_seconds")
+    results = [{**run(questions, args), "startup": startup} for questions in args.questions]
+    passed = all("error" not in result["generate"] and "error" not in result["judge"] for result in results)
+
+    if args.baseline:
+        for result in results:
+            baseline = find_baseline(args.baseline, result)
+            result["comparison"] = compare(result, baseline, args.tolerance) if baseline else None
+            passed = passed and not any(change["regressed"] for change in result["comparison"] or [])
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "passed": passed,
+    }
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as output:
+            output.write(json.dumps(report) + "\n")
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# Entry points whose cold import time is measured
+DEFAULT_MODULES = ["view_responses", "gen_jeopardy", "gen_judgement", "judge_manager", "llmproviders"]
+
+# Heavy third-party modules we report on when an entry point loads them
+SDK_MODULES = ["anthropic", "openai", "genai", "google.generativeai", "gradio", "plotly", "pyarrow"]
+
+# Run in a fresh interpreter, so nothing is cached between measurements
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {sdk_modules!r} if name in sys.modules]}}))
+"""
+
+# v2.0/, where the entry points live
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_import(module: str, repeats: int) -> Dict:
+    """Import `module` in `repeats` fresh interpreters and summarise the import times."""
+    seconds: List[float] = []
+    loaded: List[str] = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, "-c", PROBE.format(module=module, sdk_modules=SDK_MODULES)],
+                                   cwd=SOURCE_DIR, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1:]}
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        seconds.append(probe["seconds"])
+        loaded = probe["loaded"]
+    return {
+        "module": module,
+        "median_seconds": round(statistics.median(seconds), 3),
+        "min_seconds": round(min(seconds), 3),
+        "max_seconds": round(max(seconds), 3),
+        "sdks_loaded": loaded,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time of the dashboard and CLIs.")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import.")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module.")
+    parser.add_argument("--max_seconds", type=float, default=None,
+                        help="Fail if any module's median import time exceeds this.")
+    args = parser.parse_args()
+
+    results = [time_import(module, args.repeats) for module in args.modules]
+    passed = all("error" not in result for result in results)
+    if args.max_seconds is not None:
+        passed = passed and all(result["median_seconds"] <= args.max_seconds for result in results)
+    print(json.dumps({"benchmark": "startup", "results": results, "passed": passed}, indent=2))
+    sys.exit(0 if passed else 1)
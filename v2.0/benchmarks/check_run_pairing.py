@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from benchmarks.bench_startup import SOURCE_DIR
+
+MODELS_FILE = "data/models-mock.jsonl"
+JUDGE = "mock-judge"
+
+def run_cli(script: str, arguments: List[str], env: Dict[str, str]):
+    completed = subprocess.run([sys.executable, script, *arguments], cwd=SOURCE_DIR, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{script} failed: {completed.stderr.strip().splitlines()[-1:]}")
+
+def check(questions: int) -> Dict:
+    """
+    Play and judge the same questions in two separate gen_jeopardy and gen_judgement runs,
+    as after a prompt or model change, and diff the two test runs.
+
+    Every model should answer every question once per run, and the runs should pair on
+    every question: none rated in only one of them.
+    """
+    from sqlalchemy import func
+
+    from db_operations import JeopardyDB, LLMResponse
+    from run_diff import RunComparison
+
+    env = dict(os.environ, MOCK_LATENCY_MS="0", MOCK_JUDGE_LATENCY_MS="0", MOCK_SEED="0", MOCK_JUDGE_SEED="0")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "pairing.db")
+        questions_file = os.path.join(tmp_dir, "questions.jsonl")
+        with open(os.path.join(SOURCE_DIR, "data/questions.jsonl"), encoding="utf-8") as source, \
+                open(questions_file, "w", encoding="utf-8") as target:
+            target.writelines(line for _, line in zip(range(questions), source))
+        for _ in range(2):
+            run_cli("gen_jeopardy.py", ["--models_file", MODELS_FILE, "--questions_file", questions_file,
+                                        "--db_file", db_file], env)
+            run_cli("gen_judgement.py", ["--db_file", db_file, "--judge_llm", JUDGE], env)
+
+        db = JeopardyDB(db_file, read_only=True)
+        with db.session_scope():
+            loaded = db.count_questions()
+            answered = dict(db.session.query(LLMResponse.test_run_id, func.count(LLMResponse.id))
+                            .group_by(LLMResponse.test_run_id).all())
+        shifts = RunComparison(db).diff(1, 2, JUDGE).shifts()
+        db.close()
+
+    models = [{"llm": shift.llm_name, "shared_questions": shift.shared_questions,
+               "base_only": shift.base_only, "compare_only": shift.compare_only} for shift in shifts]
+    with open(os.path.join(SOURCE_DIR, MODELS_FILE), encoding="utf-8") as models_file:
+        n_models = sum(1 for line in models_file if line.strip())
+    passed = len(shifts) == n_models and all(
+        shift.shared_questions == loaded and not shift.base_only and not shift.compare_only for shift in shifts) \
+        and all(count == loaded * n_models for count in answered.values())
+    return {"questions_loaded": loaded, "responses_per_run": answered, "models": models, "passed": passed}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that two separate CLI runs over the same questions and models can be compared.")
+    parser.add_argument("--questions", type=int, default=20, help="Lines of data/questions.jsonl to play in each run.")
+    args = parser.parse_args()
+    result = check(args.questions)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["passed"] else 1)
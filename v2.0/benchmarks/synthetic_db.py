@@ -0,0 +1,119 @@
+import argparse
+import hashlib
+import random
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from db_operations import JeopardyDB, Question, RenderedPrompt, LLMResponse, LLMJudgeRating, LLM, \
+    parse_air_year, parse_value_amount
+from prompts import PROMPTS
+
+CATEGORIES = ["HISTORY", "SCIENCE", "LITERATURE", "POTPOURRI", "WORLD GEOGRAPHY", "SPORTS",
+              "U.S. PRESIDENTS", "OPERA", "BEFORE & AFTER", "WORD ORIGINS", "ANIMALS", "THE BIBLE"]
+ROUNDS = ["Jeopardy!", "Double Jeopardy!", "Final Jeopardy!"]
+VALUES = ["$200", "$400", "$600", "$800", "$1000", "$1200", "$1600", "$2000"]
+LLM_NAMES = ["meta-llama/llama-2-70b", "mistralai/mixtral-8x7b-instruct-v0-1", "tiiuae/falcon-180b",
+             "tiiuae/falcon-40b", "google/flan-t5-xl", "ibm/granite-13b-instruct-v2"]
+
+# Rows per executemany call
+INSERT_CHUNK = 10000
+
+def _insert_chunked(db: JeopardyDB, model, rows: List[dict]):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(insert(model), rows[start:start + INSERT_CHUNK])
+    db.session.commit()
+
+def build_synthetic_db(db_file: str, n_questions: int, n_llms: int = 3, n_test_runs: int = 1,
+                       judges: Optional[List[str]] = None, seed: int = 0) -> JeopardyDB:
+    """
+    Fill a database with synthetic questions, responses and (optionally) judge ratings.
+
+    Rows are bulk-inserted with Core so databases with hundreds of thousands of rows build
+    in seconds. Every LLM answers every question in every test run, and every judge in
+    `judges` rates every response. Each LLM gets a random strength per category, so
+    accuracy differs between models and categories the way real results do.
+
+    Args:
+        db_file (str): Path to the database file to create or extend.
+        n_questions (int): Number of questions.
+        n_llms (int): Number of LLMs, taken from LLM_NAMES and then numbered.
+        n_test_runs (int): Number of test runs.
+        judges (Optional[List[str]]): Judge model names to generate ratings for.
+        seed (int): Random seed, so the same arguments always build the same database.
+
+    Returns:
+        JeopardyDB: The open database.
+    """
+    rng = random.Random(seed)
+    db = JeopardyDB(db_file)
+
+    llm_ids = [db.insert_llm(LLM_NAMES[i] if i < len(LLM_NAMES) else f"synthetic/model-{i}", "Mock")
+               for i in range(n_llms)]
+
+    first_question_id = (db.session.query(Question.id).order_by(Question.id.desc()).limit(1).scalar() or 0) + 1
+    strengths = {(llm_id, category): rng.uniform(-0.2, 0.2) for llm_id in llm_ids for category in CATEGORIES}
+
+    questions = []
+    for i in range(first_question_id, first_question_id + n_questions):
+        air_date = f"{rng.randint(1984, 2012)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        value = rng.choice(VALUES)
+        questions.append(dict(
+            category=rng.choice(CATEGORIES),
+            air_date=air_date,
+            question=f"'Synthetic clue number {i} about {rng.choice(CATEGORIES).lower()}'",
+            value=value,
+            answer=f"Answer {i}",
+            round=rng.choice(ROUNDS),
+            show_number=str(rng.randint(1, 8000)),
+            value_amount=parse_value_amount(value),
+            air_year=parse_air_year(air_date),
+        ))
+    _insert_chunked(db, Question, questions)
+    question_ids = range(first_question_id, first_question_id + n_questions)
+
+    first_prompt_id = (db.session.query(RenderedPrompt.id).order_by(RenderedPrompt.id.desc()).limit(1).scalar() or 0) + 1
+    prompts = []
+    for question_id, question in zip(question_ids, questions):
+        prompt = PROMPTS["play"]["user"].format(question["category"], question["question"])
+        prompts.append(dict(prompt_hash=hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+                            text=prompt))
+    _insert_chunked(db, RenderedPrompt, prompts)
+    categories = [question["category"] for question in questions]
+    del questions, prompts
+
+    for _ in range(n_test_runs):
+        test_run_id = db.insert_test_run(PROMPTS["play"]["user"], PROMPTS["play"]["system"])
+        for llm_id in llm_ids:
+            first_response_id = (db.session.query(LLMResponse.id).order_by(LLMResponse.id.desc()).limit(1).scalar() or 0) + 1
+            responses = [dict(question_id=question_id, llm_id=llm_id, test_run_id=test_run_id,
+                              prompt_id=first_prompt_id + offset, prompt="",
+                              response=f"What is answer {offset}?" if rng.random() < 0.8 else f"Answer {offset}",
+                              generated_tokens=rng.randint(3, 60), input_token_count=rng.randint(60, 110))
+                         for offset, question_id in enumerate(question_ids)]
+            _insert_chunked(db, LLMResponse, responses)
+            del responses
+
+            for judge_model in judges or []:
+                ratings = [dict(llm_response_id=first_response_id + offset, test_run_id=test_run_id,
+                                judge_model=judge_model,
+                                accuracy=round(min(max(rng.random() + strengths[llm_id, category], 0.0), 1.0), 2),
+                                coherence=round(rng.random(), 2),
+                                completion=round(rng.random(), 2), question_structure=float(rng.random() < 0.8),
+                                generated_tokens=rng.randint(4, 16), input_token_count=rng.randint(200, 400),
+                                judge_llm_response="")
+                           for offset, category in enumerate(categories)]
+                _insert_chunked(db, LLMJudgeRating, ratings)
+                del ratings
+    return db
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a synthetic jeopardy database for benchmarks.")
+    parser.add_argument("--db_file", type=str, required=True, help="Path to the database file to create.")
+    parser.add_argument("--questions", type=int, default=10000, help="Number of questions.")
+    parser.add_argument("--llms", type=int, default=3, help="Number of LLMs.")
+    parser.add_argument("--test_runs", type=int, default=1, help="Number of test runs.")
+    parser.add_argument("--judges", type=str, nargs="*", default=["gpt-4"], help="Judge models to rate with.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+    build_synthetic_db(args.db_file, args.questions, args.llms, args.test_runs, args.judges, args.seed).close()
@@ -0,0 +1,105 @@
+import math
+import threading
+import time
+from itertools import zip_longest
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+class RunBudget:
+    """
+    How long a run may take and how many tokens it may spend, shared by every model and judge of the run.
+
+    Work is charged as it completes; callers check `allows` before starting more, so a
+    run stops sending requests once a budget is used up and keeps what it already has.
+    Requests still in flight are counted at the average cost of the finished ones, so
+    a run that keeps many requests in flight does not overshoot its token budget by them.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, tokens: Optional[int] = None):
+        self.seconds = seconds
+        self.tokens = tokens
+        self.tokens_used = 0
+        self.requests = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def charge(self, tokens: int):
+        """Count the input and generated tokens of a finished request."""
+        with self._lock:
+            self.tokens_used += tokens
+            self.requests += 1
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def seconds_left(self) -> float:
+        """Seconds until the time budget is used up; infinite without one."""
+        return math.inf if self.seconds is None else max(self.seconds - self.elapsed(), 0.0)
+
+    def exhausted_by(self) -> Optional[str]:
+        """Which budget is used up: "time", "tokens", or None while work may continue."""
+        if self.seconds is not None and self.elapsed() >= self.seconds:
+            return "time"
+        if self.tokens is not None and self.tokens_used >= self.tokens:
+            return "tokens"
+        return None
+
+    @property
+    def exhausted(self) -> bool:
+        return self.exhausted_by() is not None
+
+    def allows(self, requests: int = 1) -> bool:
+        """
+        Whether `requests` more requests fit in the budget, on top of the tokens already used.
+
+        Args:
+            requests (int): Requests that would be in flight, including those already sent
+                and not yet charged; they are expected to cost the average so far.
+        """
+        if self.exhausted:
+            return False
+        if self.tokens is None or not self.requests:
+            return True
+        return self.tokens_used + requests * self.tokens_used / self.requests < self.tokens
+
+    def stats(self) -> Dict[str, Optional[float | int | str]]:
+        return {
+            "seconds": round(self.elapsed(), 1),
+            "time_budget": self.seconds,
+            "tokens": self.tokens_used,
+            "requests": self.requests,
+            "token_budget": self.tokens,
+            "exhausted_by": self.exhausted_by(),
+        }
+
+def round_robin(iterables: Iterable[Iterable[T]]) -> Iterator[T]:
+    """
+    Take one item from each iterable in turn until all are exhausted.
+
+    E.g. round_robin([[1, 2, 3], [4], [5, 6]]) yields 1, 4, 5, 2, 6, 3.
+    """
+    missing = object()
+    for items in zip_longest(*iterables, fillvalue=missing):
+        for item in items:
+            if item is not missing:
+                yield item
+
+def stratified(groups: Dict[Hashable, Sequence[T]]) -> List[T]:
+    """
+    Order the items of every group so that any prefix covers the groups as evenly as possible.
+
+    Items are taken round-robin over the groups, in group order, and in their own order
+    within a group; a run cut short by its budget has sampled every category alike.
+    """
+    return list(round_robin(groups[group] for group in sorted(groups, key=str)))
+
+def interleave(workers: Sequence[T], batches: Iterable[U]) -> Iterator[Tuple[T, U]]:
+    """
+    Hand every batch to every worker, batch by batch, so that all workers progress through
+    the batches together and any prefix of the schedule gives each of them the same work.
+    """
+    for batch in batches:
+        for worker in workers:
+            yield worker, batch
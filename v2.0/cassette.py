@@ -0,0 +1,292 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from llmproviders import _options, registry
+from streaming import collect_stream
+
+class CassetteMissError(LookupError):
+    """A replayed request that the cassette holds no recording of."""
+    # a client error, so misses do not open the provider's circuit (see circuit_breaker.is_outage)
+    status_code = 404
+
+def request_key(kind: str, request: Dict) -> str:
+    """The hash a request is recorded and looked up under."""
+    return hashlib.sha256(json.dumps([kind, request], sort_keys=True).encode("utf-8")).hexdigest()
+
+def read_cassette(path: str) -> Tuple[List[Dict], bool]:
+    """
+    Read every complete entry of a cassette.
+
+    A run that crashed while recording leaves a truncated gzip member, or a partial
+    line, at the end of the file; everything before it is still returned.
+
+    Returns:
+        Tuple[List[Dict], bool]: The entries, and whether the file ended in a truncated write.
+    """
+    entries = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entries.append(json.loads(line))
+    except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError):
+        return entries, True
+    return entries, False
+
+def _write_cassette(path: str, entries: List[Dict]):
+    # written aside and renamed into place, so a crash leaves either the old file or the new one
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8") as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + "\n")
+    os.replace(path + ".tmp", path)
+
+class Cassette:
+    """
+    Provider and judge traffic recorded to, or replayed from, a gzipped JSON Lines file.
+
+    Each line holds one request, its response and its timings, keyed by a hash of the
+    request. Recording appends, so the answers of a gen_jeopardy run and the ratings of
+    the gen_judgement run after it can go to the same cassette. Only successful calls are
+    recorded. A request recorded several times, e.g. sampled at a positive temperature,
+    is replayed in recorded order and then from the first recording again.
+
+    Replays return the recorded timings; with `replay_latency` they also wait for them,
+    so a replayed run takes as long as the recorded one did and reports measured timings.
+
+    A write cut short by a crash only loses the entries it held: the reader stops at the
+    truncated tail, and recording to such a cassette rewrites it without the tail first.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", replay_latency: bool = False):
+        """
+        Args:
+            path (str): The cassette file, conventionally ending in .jsonl.gz.
+            mode (str): "record" to append calls to the cassette, "replay" to answer them from it.
+            replay_latency (bool): Whether replayed calls wait for their recorded latency.
+
+        Raises:
+            ValueError: If the mode is neither "record" nor "replay".
+            FileNotFoundError: If a cassette to replay does not exist.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._recordings: Dict[str, List[Dict]] = {}
+        self._served: Dict[str, int] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        if self.replaying:
+            entries, truncated = read_cassette(path)
+            if truncated:
+                print(f"{path} ends in an incomplete write; replaying the {len(entries)} complete entries")
+            for entry in entries:
+                self._recordings.setdefault(entry["key"], []).append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(self, kind: str, request: Dict, response: Dict, latency: float,
+               time_to_first_token: Optional[float] = None):
+        """Append a successful call to the cassette."""
+        entry = {"key": request_key(kind, request), "kind": kind, "request": request, "response": response,
+                 "latency": latency, "time_to_first_token": time_to_first_token}
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if os.path.exists(self.path):
+                    entries, truncated = read_cassette(self.path)
+                    if truncated:
+                        # appended entries would be unreadable behind the truncated member
+                        print(f"{self.path} ends in an incomplete write; keeping its {len(entries)} complete entries")
+                        _write_cassette(self.path, entries)
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(line)
+            self.recorded += 1
+
+    def replay(self, kind: str, request: Dict) -> Dict:
+        """
+        The next recording of a request: its "response", "latency" and "time_to_first_token".
+
+        Raises:
+            CassetteMissError: If the request was never recorded.
+        """
+        key = request_key(kind, request)
+        with self._lock:
+            entries = self._recordings.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMissError(f"{self.path} has no recording of this {kind} request to "
+                                        f"{request.get('model') or request.get('judge')}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            self.replayed += 1
+            return entries[served % len(entries)]
+
+    def judge_names(self) -> List[str]:
+        """The names of the judges whose ratings were recorded."""
+        return sorted({entry["request"]["judge"] for entries in self._recordings.values() for entry in entries
+                       if entry["kind"] == "judge"})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def stats(self) -> Dict[str, int | str]:
+        return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+class CassetteAdapter:
+    """
+    A provider adapter whose answers are recorded to a cassette, or one answering from a cassette instead.
+
+    Replaying needs no adapter, and so neither the provider's SDK nor its credentials.
+    """
+
+    def __init__(self, provider_name: str, cassette: Cassette, adapter=None):
+        self.provider_name = provider_name
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def _request(self, prompt: str, model_name: str, max_tokens: Optional[int], stop: Optional[List[str]],
+                 decoding: Optional[Dict]) -> Dict:
+        # every call path, recording or replaying, keys a request here
+        return {"provider": self.provider_name.lower(), "model": model_name, "prompt": prompt,
+                "max_tokens": max_tokens, "stop": stop, "decoding": decoding}
+
+    def _label(self, model_name: str) -> str:
+        """The "llm" of recorded and replayed answers, the same whichever call path made them."""
+        return f"{self.provider_name.lower()}/{model_name}"
+
+    def _record(self, request: Dict, result: Dict, latency: float, time_to_first_token: Optional[float]):
+        response = {"llm": self._label(request["model"]),
+                    **{key: result.get(key) for key in ("answer", "generated_token_count", "input_token_count")}}
+        self.cassette.record("answer", request, response, latency, time_to_first_token)
+
+    def _replayed(self, entry: Dict, prompt: str) -> Dict:
+        return {**entry["response"], "llm": self._label(entry["request"]["model"]), "prompt": prompt}
+
+    async def _replay_stream(self, entry: Dict) -> AsyncIterator[Dict]:
+        # the whole answer arrives as its first token would have, and the token counts as it ended
+        response = entry["response"]
+        first_token = entry["time_to_first_token"] or 0.0
+        if self.cassette.replay_latency:
+            await asyncio.sleep(first_token)
+        if response["answer"]:
+            yield {"text": response["answer"]}
+        if self.cassette.replay_latency:
+            await asyncio.sleep(max(entry["latency"] - first_token, 0.0))
+        yield {"generated_token_count": response["generated_token_count"],
+               "input_token_count": response["input_token_count"]}
+
+    def generate_answer(self, prompt: str, model_name: str, max_tokens: Optional[int] = None,
+                        stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> Dict:
+        request = self._request(prompt, model_name, max_tokens, stop, decoding)
+        if self.cassette.replaying:
+            entry = self.cassette.replay("answer", request)
+            if self.cassette.replay_latency:
+                time.sleep(entry["latency"])
+            return self._replayed(entry, prompt)
+        start = time.perf_counter()
+        result = self.adapter.generate_answer(prompt, model_name, **_options(
+            self.adapter.generate_answer, max_tokens=max_tokens, stop=stop, decoding=decoding))
+        self._record(request, result, time.perf_counter() - start, None)
+        return result
+
+    async def astream_answer(self, prompt: str, model_name: str, max_tokens: Optional[int] = None,
+                             stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """Stream a recorded answer as one text event, or relay and record the adapter's stream."""
+        request = self._request(prompt, model_name, max_tokens, stop, decoding)
+        if self.cassette.replaying:
+            async for event in self._replay_stream(self.cassette.replay("answer", request)):
+                yield event
+            return
+        start = time.perf_counter()
+        time_to_first_token = None
+        parts = []
+        usage = {"generated_token_count": None, "input_token_count": None}
+        async for event in self.adapter.astream_answer(prompt, model_name, **_options(
+                self.adapter.astream_answer, max_tokens=max_tokens, stop=stop, decoding=decoding)):
+            if event.get("text"):
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start
+                parts.append(event["text"])
+            usage.update({key: event[key] for key in usage if event.get(key) is not None})
+            yield event
+        self._record(request, {"answer": "".join(parts), **usage}, time.perf_counter() - start, time_to_first_token)
+
+    async def agenerate_answer(self, prompt: str, model_name: str, max_tokens: Optional[int] = None,
+                               stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> Dict:
+        """
+        Like generate_answer, with "time_to_first_token" and "latency" in seconds.
+
+        Replayed answers carry their recorded timings, unless the latency is replayed too,
+        in which case the timings are measured as for a live answer.
+        """
+        request = self._request(prompt, model_name, max_tokens, stop, decoding)
+        if self.cassette.replaying:
+            entry = self.cassette.replay("answer", request)
+            if self.cassette.replay_latency:
+                return await collect_stream(self._replay_stream(entry), self._label(model_name), prompt)
+            return {**self._replayed(entry, prompt), "time_to_first_token": entry["time_to_first_token"],
+                    "latency": entry["latency"]}
+        if hasattr(self.adapter, "agenerate_answer"):
+            result = await self.adapter.agenerate_answer(prompt, model_name, **_options(
+                self.adapter.agenerate_answer, max_tokens=max_tokens, stop=stop, decoding=decoding))
+        else:
+            start = time.perf_counter()
+            result = await asyncio.to_thread(self.adapter.generate_answer, prompt, model_name, **_options(
+                self.adapter.generate_answer, max_tokens=max_tokens, stop=stop, decoding=decoding))
+            result = {**result, "time_to_first_token": None, "latency": time.perf_counter() - start}
+        self._record(request, result, result["latency"], result["time_to_first_token"])
+        return result
+
+def use_cassette(cassette: Optional[Cassette]):
+    """
+    Route every provider adapter through a cassette from now on, or stop doing so when None.
+
+    Judges are routed by JudgeManager, which takes the cassette as well.
+    """
+    if cassette is None:
+        registry.intercept(None)
+    elif cassette.replaying:
+        registry.intercept(lambda name, create: CassetteAdapter(name, cassette))
+    else:
+        registry.intercept(lambda name, create: CassetteAdapter(name, cassette, create()))
+
+def open_cassette(record: Optional[str] = None, replay: Optional[str] = None,
+                  replay_latency: bool = False) -> Optional[Cassette]:
+    """
+    Open the cassette the --record or --replay flag names, and route the providers through it.
+
+    Returns:
+        Optional[Cassette]: The cassette, or None when neither flag was given.
+    """
+    if record and replay:
+        raise ValueError("Pass either --record or --replay, not both")
+    if not (record or replay):
+        return None
+    cassette = Cassette(record or replay, "record" if record else "replay", replay_latency)
+    use_cassette(cassette)
+    return cassette
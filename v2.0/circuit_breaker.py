@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Consecutive failures that open a circuit
+FAILURE_THRESHOLD = 5
+# Seconds an open circuit waits before letting a probe through; doubled after every failed probe
+RESET_TIMEOUT = 5.0
+MAX_RESET_TIMEOUT = 120.0
+# Passes over work parked during an outage, and the longest a run waits in total for circuits to close
+RETRY_ROUNDS = 5
+MAX_OUTAGE_WAIT = 300.0
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, key: Hashable, retry_in: float):
+        super().__init__(f"Circuit for {key} is open; next probe in {retry_in:.1f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+def is_outage(error: BaseException) -> bool:
+    """
+    Whether an error says the provider is failing, as opposed to our request being wrong.
+
+    Client errors (4xx) other than timeouts and rate limits would fail the same way on a
+    healthy provider, so they do not count towards opening a circuit.
+    """
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500:
+        return status_code in (408, 429)
+    return True
+
+class CircuitBreaker:
+    """
+    Stops calls to a provider after repeated failures, and lets them resume once it recovers.
+
+    Closed, calls go through. After `failure_threshold` failures in a row the circuit
+    opens and calls fail at once with CircuitOpenError. Once `reset_timeout` has passed
+    a single probe call is let through: if it succeeds the circuit closes, otherwise it
+    opens again for twice as long, up to `max_reset_timeout`.
+    """
+
+    def __init__(self, key: Hashable, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT, max_reset_timeout: float = MAX_RESET_TIMEOUT):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failures = 0
+        self.opened_count = 0
+        self._open_until: Optional[float] = None
+        self._timeout = reset_timeout
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._open_until is None:
+                return "closed"
+            return "half-open" if time.monotonic() >= self._open_until else "open"
+
+    def retry_in(self) -> float:
+        """Seconds until the next call may go through; 0 when the circuit is closed or ready to probe."""
+        with self._lock:
+            if self._open_until is None:
+                return 0.0
+            return max(self._open_until - time.monotonic(), 0.0)
+
+    def before_call(self):
+        """
+        Raises:
+            CircuitOpenError: If the circuit is open, or another caller is already probing it.
+        """
+        with self._lock:
+            if self._open_until is None:
+                return
+            now = time.monotonic()
+            if now < self._open_until or self._probing:
+                raise CircuitOpenError(self.key, max(self._open_until - now, 0.0))
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._open_until = None
+            self._timeout = self.reset_timeout
+            self._probing = False
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            if not is_outage(error):
+                # the provider answered; only this request was bad
+                self.failures = 0
+                if self._probing:
+                    self._probing = False
+                    self._open_until = None
+                    self._timeout = self.reset_timeout
+                return
+            self.failures += 1
+            if self._probing:
+                self._probing = False
+                self._timeout = min(self._timeout * 2, self.max_reset_timeout)
+                self._open_until = time.monotonic() + self._timeout
+            elif self._open_until is None and self.failures >= self.failure_threshold:
+                self.opened_count += 1
+                self._open_until = time.monotonic() + self._timeout
+
+    def _abandon(self):
+        # an interrupted or cancelled call says nothing about the provider, but a probe must not stay claimed
+        with self._lock:
+            self._probing = False
+
+    def call(self, make_call: Callable[[], T]) -> T:
+        """Call `make_call()` through the breaker, recording how it went."""
+        self.before_call()
+        try:
+            result = make_call()
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self._abandon()
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, make_call: Callable[[], Awaitable[T]]) -> T:
+        """Await `make_call()` through the breaker, recording how it went."""
+        self.before_call()
+        try:
+            result = await make_call()
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self._abandon()
+            raise
+        self.record_success()
+        return result
+
+class CircuitBreakers:
+    """Process-wide breakers, one per key such as (provider, model) or ("judge", name)."""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers: Dict[Hashable, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> CircuitBreaker:
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(key, **self.settings)
+            return self._breakers[key]
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {str(breaker.key): breaker.state for breaker in breakers}
+
+breakers = CircuitBreakers()
+
+def wait_until_ready(retry_in: Callable[[], float], max_wait: float,
+                     cancel_event: Optional[threading.Event] = None) -> float:
+    """
+    Sleep until `retry_in()` is 0, i.e. a probe may go through, for at most `max_wait` seconds.
+
+    Returns early once `cancel_event` is set.
+
+    Returns:
+        float: The seconds waited.
+    """
+    waited = 0.0
+    while True:
+        # short steps, so a circuit closed by another caller or a cancelled job is noticed promptly
+        pause = min(retry_in(), max_wait - waited, 1.0)
+        if pause <= 0:
+            return waited
+        if cancel_event is not None:
+            if cancel_event.wait(pause):
+                return waited + pause
+        else:
+            time.sleep(pause)
+        waited += pause
+
+async def await_ready(retry_in: Callable[[], float], max_wait: float,
+                      cancelled: Callable[[], bool] = lambda: False) -> float:
+    """Like wait_until_ready, without blocking the event loop."""
+    waited = 0.0
+    while not cancelled():
+        pause = min(retry_in(), max_wait - waited, 1.0)
+        if pause <= 0:
+            break
+        await asyncio.sleep(pause)
+        waited += pause
+    return waited
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class WatermarkCache:
+    """
+    A thread-safe LRU cache that is emptied whenever the database watermark moves.
+
+    The dashboard passes JeopardyDB.get_watermarks() to `validate` before reading, so
+    anything cached stays valid until new responses or ratings are written.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._watermark: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+    def validate(self, watermark: Hashable) -> bool:
+        """
+        Drop every entry if `watermark` differs from the one the entries were built at.
+
+        Returns:
+            bool: True if the cache was still valid.
+        """
+        with self._lock:
+            if watermark == self._watermark:
+                return True
+            self._entries.clear()
+            self._watermark = watermark
+            return False
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+class FoldingCache:
+    """
+    A thread-safe LRU cache of aggregates that are brought forward instead of rebuilt.
+
+    Each entry remembers the watermark (highest row id) it covers. When the database has
+    moved on, `update(value, after_id, up_to_id)` folds in just the rows in
+    (after_id, up_to_id], so refreshing costs the same however large the table is. The
+    first request for a key calls `update(None, 0, up_to_id)` to build the value.
+
+    Rows must only ever be appended; `update` should return a new value rather than
+    mutate the old one, which other threads may still be reading.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, watermark: int, update: Callable[[Optional[Any], int, int], Any]) -> Any:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # only one thread builds or folds a given key; other keys are served meanwhile
+        with key_lock:
+            with self._lock:
+                covered, value = self._entries.get(key, (0, None))
+            if value is None or covered != watermark:
+                # a watermark below `covered` means the database was replaced; start over
+                value = update(value, covered, watermark) if value is not None and covered < watermark \
+                    else update(None, 0, watermark)
+            with self._lock:
+                self._entries[key] = (watermark, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted, None)
+        return value
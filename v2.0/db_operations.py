@@ -1,18 +1,54 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine, Integer, String, Float, ForeignKey, DateTime, text
-from sqlalchemy.orm import sessionmaker, relationship, DeclarativeBase
+from sqlalchemy import Row, create_engine, event, case, exists, func, inspect, or_, select, tuple_, Index, Integer, String, Float, ForeignKey, DateTime, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship, joinedload, aliased, DeclarativeBase, Session
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TypeDecorator
+from contextlib import contextmanager
 from datetime import datetime
+import hashlib
 import json
 import os
-from typing import List, Optional
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
 
 #Base : Type[DeclarativeMeta]= declarative_base()
 
 class Base(DeclarativeBase):
     pass
 
+class CompressedText(TypeDecorator):
+    """
+    A text column that is transparently zlib-compressed when JEOPARDY_COMPRESS_TEXT is set.
+
+    Values shorter than `min_length` are always stored as plain text. Reads accept both
+    plain and compressed values, so compression can be switched on for an existing database.
+    """
+    impl = String
+    cache_ok = True
+
+    # None follows JEOPARDY_COMPRESS_TEXT
+    enabled: Optional[bool] = None
+    min_length = 256
+
+    def compressing(self) -> bool:
+        # read on every write rather than at import, which runs before the scripts' load_dotenv()
+        if self.enabled is not None:
+            return self.enabled
+        return os.environ.get("JEOPARDY_COMPRESS_TEXT", "").lower() in ("1", "true", "yes")
+
+    def process_bind_param(self, value, dialect):
+        if value is None or len(value) < self.min_length or not self.compressing():
+            return value
+        return zlib.compress(value.encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return zlib.decompress(value).decode("utf-8")
+        return value
+
 class LLM(Base):
     __tablename__ = 'llms'
 
@@ -22,6 +58,16 @@ class LLM(Base):
 
     llm_responses: Mapped[List[LLMResponse]] = relationship(back_populates="llm")
 
+def parse_value_amount(value: Optional[str]) -> Optional[int]:
+    """Dollar value of a clue as an integer, e.g. "$1,200" -> 1200; None when there is none."""
+    digits = (value or "").replace("$", "").replace(",", "").strip()
+    return int(digits) if digits.isdigit() else None
+
+def parse_air_year(air_date: Optional[str]) -> Optional[int]:
+    """Year of a YYYY-MM-DD air date; None when it cannot be read."""
+    year = (air_date or "")[:4]
+    return int(year) if year.isdigit() else None
+
 class Question(Base):
     __tablename__ = 'questions'
 
@@ -33,28 +79,66 @@ class Question(Base):
     answer: Mapped[str] = mapped_column(String)
     round: Mapped[str] = mapped_column(String)
     show_number: Mapped[str] = mapped_column(String)
+    # typed copies of value and air_date, so analytics can filter on ranges
+    value_amount: Mapped[Optional[int]] = mapped_column(Integer)
+    air_year: Mapped[Optional[int]] = mapped_column(Integer)
 
     llm_responses: Mapped[List[LLMResponse]] = relationship(back_populates="question")
 
 class LLMResponse(Base):
     __tablename__ = 'llm_responses'
+    __table_args__ = (
+        # keyset paging over one model's responses, optionally within a test run
+        Index('ix_llm_responses_llm_id_id', 'llm_id', 'id'),
+        Index('ix_llm_responses_test_run_id_llm_id_id', 'test_run_id', 'llm_id', 'id'),
+        # keyset paging over one model's responses sorted by a token count in the response table
+        Index('ix_llm_responses_llm_id_generated_tokens_id', 'llm_id', 'generated_tokens', 'id'),
+        Index('ix_llm_responses_llm_id_input_token_count_id', 'llm_id', 'input_token_count', 'id'),
+        # looks up both runs' answers to the same questions when showing a run diff
+        Index('ix_llm_responses_test_run_id_question_id_llm_id', 'test_run_id', 'question_id', 'llm_id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     question_id: Mapped[Optional[int]] = mapped_column(ForeignKey('questions.id'))
     llm_id: Mapped[Optional[int]] = mapped_column(ForeignKey('llms.id'))
     test_run_id: Mapped[Optional[int]] = mapped_column(ForeignKey('test_runs.id'))
-    prompt: Mapped[str] = mapped_column(String)
+    prompt_id: Mapped[Optional[int]] = mapped_column(ForeignKey('rendered_prompts.id'))
+    # Inline prompt text kept for rows written before prompts were normalised; new rows store ""
+    prompt: Mapped[str] = mapped_column(CompressedText, default="")
     response: Mapped[str] = mapped_column(String)
     generated_tokens: Mapped[int] = mapped_column(Integer)
     input_token_count: Mapped[int] = mapped_column(Integer)
+    # seconds until the first streamed token and until the whole answer; NULL where not measured
+    time_to_first_token: Mapped[Optional[float]] = mapped_column(Float)
+    latency: Mapped[Optional[float]] = mapped_column(Float)
 
     llm: Mapped[LLM] = relationship(back_populates="llm_responses")
     question: Mapped[Question] = relationship(back_populates="llm_responses")
     test_run: Mapped[TestRun] = relationship(back_populates="llm_responses")
+    rendered_prompt: Mapped[Optional[RenderedPrompt]] = relationship()
     llm_judge_ratings: Mapped[List[LLMJudgeRating]] = relationship(back_populates="llm_response")
-    
+
+    @property
+    def prompt_text(self) -> str:
+        """The prompt sent to the LLM, whether stored inline or in rendered_prompts."""
+        if self.prompt_id is not None:
+            return self.rendered_prompt.text
+        return self.prompt
+
+class RenderedPrompt(Base):
+    __tablename__ = 'rendered_prompts'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    prompt_hash: Mapped[str] = mapped_column(String, unique=True)
+    text: Mapped[str] = mapped_column(CompressedText)
+
 class LLMJudgeRating(Base):
     __tablename__ = 'llm_judge_ratings'
+    __table_args__ = (
+        Index('ix_llm_judge_ratings_llm_response_id_judge_model', 'llm_response_id', 'judge_model'),
+        Index('ix_llm_judge_ratings_judge_model_id', 'judge_model', 'id'),
+        Index('ix_llm_judge_ratings_test_run_id_judge_model', 'test_run_id', 'judge_model'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     llm_response_id: Mapped[Optional[int]] = mapped_column(ForeignKey('llm_responses.id'))
@@ -66,7 +150,7 @@ class LLMJudgeRating(Base):
     generated_tokens: Mapped[int] = mapped_column(Integer)
     input_token_count: Mapped[int] = mapped_column(Integer)
     judge_model: Mapped[str] = mapped_column(String)
-    judge_llm_response: Mapped[str] = mapped_column(String)
+    judge_llm_response: Mapped[str] = mapped_column(CompressedText, default="")
 
     llm_response: Mapped[LLMResponse] = relationship(back_populates="llm_judge_ratings")
     test_run: Mapped[TestRun] = relationship(back_populates="llm_judge_ratings")
@@ -84,27 +168,162 @@ class TestRun(Base):
     llm_judge_ratings: Mapped[List[LLMJudgeRating]] = relationship(back_populates="test_run")
      
 
+# The columns that identify a question, however many times its questions file is loaded
+QUESTION_IDENTITY = (Question.show_number, Question.round, Question.category, Question.question)
+
+# Column projections returned by the paged queries. Rows are plain tuples with
+# attribute access, so no ORM objects are built or tracked for listing pages.
+RESPONSE_PAGE_COLUMNS = (
+    LLMResponse.id,
+    LLMResponse.question_id,
+    LLMResponse.llm_id,
+    LLMResponse.test_run_id,
+    # queries selecting these columns outer join rendered_prompts on prompt_id
+    case((LLMResponse.prompt_id.is_not(None), RenderedPrompt.text), else_=LLMResponse.prompt).label('prompt'),
+    LLMResponse.response,
+    LLMResponse.generated_tokens,
+    LLMResponse.input_token_count,
+)
+
+# The criteria a judge scores every response on, named as LLMJudgeRating's columns
+CRITERIA = ('accuracy', 'coherence', 'completion', 'question_structure')
+
+RATING_SCORE_COLUMNS = (
+    LLMJudgeRating.id.label('rating_id'),
+    LLMJudgeRating.accuracy,
+    LLMJudgeRating.coherence,
+    LLMJudgeRating.completion,
+    LLMJudgeRating.question_structure,
+    LLMJudgeRating.generated_tokens.label('judge_generated_tokens'),
+    LLMJudgeRating.input_token_count.label('judge_input_token_count'),
+)
+
+RATING_PAGE_COLUMNS = (
+    LLMJudgeRating.id,
+    LLMJudgeRating.llm_response_id,
+    LLMJudgeRating.test_run_id,
+    LLMJudgeRating.judge_model,
+    LLMJudgeRating.accuracy,
+    LLMJudgeRating.coherence,
+    LLMJudgeRating.completion,
+    LLMJudgeRating.question_structure,
+    LLMJudgeRating.generated_tokens,
+    LLMJudgeRating.input_token_count,
+)
+
+def latest_rating(judge_model: Optional[str]):
+    """
+    Join condition matching a response to the latest rating `judge_model` gave it.
+
+    A response can be rated more than once by the same judge, e.g. by a rerun or a retried
+    rating, and joining on the judge alone would return it once per rating. The latest
+    rating id is looked up per response through ix_llm_judge_ratings_llm_response_id_judge_model.
+    """
+    rating = aliased(LLMJudgeRating)
+    latest_id = select(func.max(rating.id)) \
+        .where(rating.llm_response_id == LLMResponse.id, rating.judge_model == judge_model) \
+        .scalar_subquery()
+    return LLMJudgeRating.id == latest_id
+
+# Columns the response table can be sorted by in get_response_table_page
+TABLE_SORT_COLUMNS = {
+    "id": LLMResponse.id,
+    "generated_tokens": LLMResponse.generated_tokens,
+    "input_token_count": LLMResponse.input_token_count,
+    "accuracy": LLMJudgeRating.accuracy,
+    "coherence": LLMJudgeRating.coherence,
+    "completion": LLMJudgeRating.completion,
+    "question_structure": LLMJudgeRating.question_structure,
+}
+
 class JeopardyDB:
-    def __init__(self, db_file='jeopardy.db'):
-        # Get the script's directory
-        
-        db_path = self.get_path(db_file)
+    def __init__(self, db_file='jeopardy.db', read_only: bool = False,
+                 busy_timeout_ms: int = 30000, mmap_size: int = 256 * 1024 * 1024):
+        """
+        Open the Jeopardy SQLite database, creating it unless opened read-only.
+
+        Every thread gets its own session from a thread-local registry, so a single
+        JeopardyDB can be shared by the Gradio request threads and background jobs.
+        Connections use WAL journaling and a busy timeout so readers never block the
+        writer and concurrent writers wait instead of failing with "database is locked".
+
+        Args:
+            db_file (str): Path to the database file, relative to this script.
+            read_only (bool): Open connections with `PRAGMA query_only` and a memory-mapped
+                read path. Use this for dashboards and other reporting-only callers.
+            busy_timeout_ms (int): How long a connection waits on a lock before erroring.
+            mmap_size (int): Bytes of the database file SQLite may memory-map for reads.
+
+        Raises:
+            FileNotFoundError: If a database opened read-only does not exist.
+        """
+        db_path = self.get_path(db_file, create_dir=not read_only)
         # Create the database file if it doesn't exist
         if not os.path.exists(db_path):
+            if read_only:
+                # a mistyped path would otherwise leave an empty database that every query fails on
+                raise FileNotFoundError(f"No database at {db_path}")
             open(db_path, 'a').close()
 
-        self.engine = create_engine(f'sqlite:///{db_path}')
-        Session = sessionmaker(bind=self.engine, expire_on_commit=False)
-        self.session = Session()
-        self.create_tables()
-    
+        self.read_only = read_only
+        self.engine = create_engine(f'sqlite:///{db_path}',
+                                    connect_args={"timeout": busy_timeout_ms / 1000, "check_same_thread": False})
+        event.listen(self.engine, "connect", self._sqlite_pragmas(busy_timeout_ms, mmap_size, read_only))
+
+        # prompt hash -> rendered_prompts.id, filled by get_or_create_prompt
+        self._prompt_ids: Dict[str, int] = {}
+        session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        # scoped_session proxies every call to a session that belongs to the calling thread
+        self.session = scoped_session(session_factory)
+        if read_only:
+            self._upgrade_schema(db_path, busy_timeout_ms)
+        else:
+            self.create_tables()
+
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, traceback):
         self.close()
 
-    def get_path(self, file_name):
+    @staticmethod
+    def _sqlite_pragmas(busy_timeout_ms: int, mmap_size: int, read_only: bool):
+        def on_connect(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # WAL is persistent in the file, so read-only connections pick it up as well
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+        return on_connect
+
+    @contextmanager
+    def session_scope(self) -> Iterator[Session]:
+        """
+        Provide a transactional unit of work for the calling thread.
+
+        All JeopardyDB methods called inside the block share the yielded session. The
+        transaction is committed on success, rolled back on error, and the thread's
+        session is released afterwards so no ORM state outlives the unit of work.
+
+        Yields:
+            Session: The session bound to the calling thread.
+        """
+        session = self.session()
+        try:
+            yield session
+            if not self.read_only:
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self.session.remove()
+
+    def get_path(self, file_name, create_dir: bool = True):
         script_dir = os.path.dirname(os.path.abspath(__file__))
 
         # Split the db_file into directory and filename
@@ -114,15 +333,85 @@ class JeopardyDB:
         db_dir_path = os.path.join(script_dir, db_dir)
         db_path = os.path.join(db_dir_path, db_filename)
 
-        os.makedirs(db_dir_path, exist_ok=True)
+        if create_dir:
+            os.makedirs(db_dir_path, exist_ok=True)
 
         return db_path
 
-    def create_tables(self):
+    def _upgrade_schema(self, db_path: str, busy_timeout_ms: int):
+        """
+        Bring a database created by an older version up to date for a read-only opener.
+
+        The read-only engine's connections are query-only, so the tables, columns and
+        indexes are created on a short-lived writable engine instead. On an up-to-date
+        database this only reads the schema.
+
+        Raises:
+            RuntimeError: If the schema is out of date and the file cannot be written.
+        """
+        engine = create_engine(f'sqlite:///{db_path}', connect_args={"timeout": busy_timeout_ms / 1000})
+        try:
+            self.create_tables(engine)
+        except OperationalError as e:
+            raise RuntimeError(f"{db_path} was created by an older version and cannot be upgraded here ({e.orig}); "
+                               f"open it once with a writer, e.g. gen_jeopardy.py, first") from e
+        finally:
+            engine.dispose()
+
+    def create_tables(self, engine=None):
+        """
+        Create the database tables and indexes if they don't already exist.
+
+        Args:
+            engine: The engine to create them with; this database's own engine when None.
+        """
+        engine = engine or self.engine
+        Base.metadata.create_all(engine)
+        added_columns = self._add_missing_columns(engine)
+        if {'questions.value_amount', 'questions.air_year'} & added_columns:
+            self._backfill_question_dimensions(engine)
+        # create_all skips tables that already exist, including any index added to them later
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+
+    def _add_missing_columns(self, engine) -> set:
+        """
+        Add columns that were introduced after a database file was created.
+
+        New columns are always nullable, so ALTER TABLE ADD COLUMN is enough and
+        existing rows are left untouched.
+
+        Returns:
+            set: The added columns as "table.column" names.
         """
-        Create the database tables if they don't already exist.
+        added_columns = set()
+        inspector = inspect(engine)
+        with engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing_columns:
+                        column_type = column.type.compile(dialect=engine.dialect)
+                        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                        added_columns.add(f'{table.name}.{column.name}')
+        return added_columns
+
+    def _backfill_question_dimensions(self, engine):
         """
-        Base.metadata.create_all(self.engine)
+        Fill value_amount and air_year for questions inserted before those columns existed.
+
+        Mirrors parse_value_amount and parse_air_year in SQL, so a large question table
+        is converted in two UPDATE statements.
+        """
+        with engine.begin() as connection:
+            connection.execute(text(
+                "UPDATE questions SET value_amount = CAST(REPLACE(REPLACE(TRIM(value), '$', ''), ',', '') AS INTEGER) "
+                "WHERE value_amount IS NULL AND REPLACE(REPLACE(TRIM(value), '$', ''), ',', '') GLOB '[0-9]*' "
+                "AND REPLACE(REPLACE(TRIM(value), '$', ''), ',', '') NOT GLOB '*[^0-9]*'"))
+            connection.execute(text(
+                "UPDATE questions SET air_year = CAST(SUBSTR(air_date, 1, 4) AS INTEGER) "
+                "WHERE air_year IS NULL AND air_date GLOB '[0-9][0-9][0-9][0-9]*'"))
 
     def insert_llm(self, name, provider):
         llm = LLM(
@@ -134,40 +423,77 @@ class JeopardyDB:
         return llm.id
     
     def insert_and_return_llms_from_file(self, file_path):
+        """
+        Get the LLMs of a models file, inserting those not in the database yet.
+
+        An LLM is identified by its provider and name, so every run of a model answers
+        as the same LLM and test runs can be compared per model. Where a database already
+        holds several rows for one model, the first is used.
+
+        Returns:
+            List[LLM]: The file's LLMs in file order, each once.
+        """
         llms_data = self.load_file(file_path)
-        llms = [LLM(name=llm['model'], provider=llm['provider']) for llm in llms_data]
-        self.session.add_all(llms)
+        existing = {}
+        for llm in self.session.query(LLM).order_by(LLM.id.desc()):
+            existing[(llm.provider, llm.name)] = llm
+        llms = []
+        for data in llms_data:
+            key = (data['provider'], data['model'])
+            if key not in existing:
+                existing[key] = LLM(name=data['model'], provider=data['provider'])
+                self.session.add(existing[key])
+            if existing[key] not in llms:
+                llms.append(existing[key])
         self.session.commit()
         return llms
 
     def get_all_llms(self):
         return self.session.query(LLM).all()
 
-    def insert_question(self, data):
-        question = Question(
+    @staticmethod
+    def _question(data: Dict) -> Question:
+        """Build a Question from a questions-file record, with its parsed value and air year."""
+        return Question(
             category=data['category'],
             air_date=data['air_date'],
             question=data['question'],
             value=data['value'],
             answer=data['answer'],
             round=data['round'],
-            show_number=data['show_number']
+            show_number=data['show_number'],
+            value_amount=parse_value_amount(data['value']),
+            air_year=parse_air_year(data['air_date'])
         )
+
+    def insert_question(self, data):
+        question = self._question(data)
         self.session.add(question)
         self.session.commit()
         return question.id
 
-    def insert_questions(self, questions):
-        self.session.add_all([Question(
-            category=q['category'],
-            air_date=q['air_date'],
-            question=q['question'],
-            value=q['value'],
-            answer=q['answer'],
-            round=q['round'],
-            show_number=q['show_number']
-        ) for q in questions])
+    def insert_questions(self, questions) -> int:
+        """
+        Insert questions-file records, skipping the questions already in the database.
+
+        A question is identified by its show, round, category and clue, so reloading a
+        questions file for a new test run reuses the existing rows: the run answers each
+        question once and can be compared with earlier runs question by question.
+
+        Returns:
+            int: The number of questions inserted.
+        """
+        existing = {tuple(row) for row in self.session.query(*QUESTION_IDENTITY)}
+        new_questions = []
+        for data in questions:
+            question = self._question(data)
+            key = tuple(getattr(question, column.key) for column in QUESTION_IDENTITY)
+            if key not in existing:
+                existing.add(key)
+                new_questions.append(question)
+        self.session.add_all(new_questions)
         self.session.commit()
+        return len(new_questions)
 
     def load_file(self, model_file: str):
         """Load JSONL from a file."""
@@ -179,19 +505,35 @@ class JeopardyDB:
                     lines.append(json.loads(line))
         return lines
 
-    def insert_questions_file(self, file_path):
-        questions_data = self.load_file(file_path)
-        questions = [Question(
-            category=q['category'],
-            air_date=q['air_date'],
-            question=q['question'],
-            value=q['value'],
-            answer=q['answer'],
-            round=q['round'],
-            show_number=q['show_number']
-        ) for q in questions_data]
-        self.session.add_all(questions)
-        self.session.commit()
+    def insert_questions_file(self, file_path) -> int:
+        """Insert the questions of a questions file not in the database yet; see insert_questions."""
+        return self.insert_questions(self.load_file(file_path))
+
+    def get_or_create_prompt(self, prompt: str) -> int:
+        """
+        Store a rendered prompt once and return its id.
+
+        Prompts are keyed by the SHA-256 of their text, so the same category and clue
+        rendered for every model and every test run shares a single row. Safe to call
+        from several processes at once.
+
+        Args:
+            prompt (str): The fully rendered prompt text.
+
+        Returns:
+            int: The id of the row in rendered_prompts.
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        prompt_id = self._prompt_ids.get(prompt_hash)
+        if prompt_id is None:
+            self.session.execute(sqlite_insert(RenderedPrompt)
+                                 .values(prompt_hash=prompt_hash, text=prompt)
+                                 .on_conflict_do_nothing(index_elements=['prompt_hash']))
+            self.session.commit()
+            prompt_id = self.session.execute(
+                select(RenderedPrompt.id).where(RenderedPrompt.prompt_hash == prompt_hash)).scalar_one()
+            self._prompt_ids[prompt_hash] = prompt_id
+        return prompt_id
 
     def insert_llm_response(self, llm_response: LLMResponse):
         self.session.add(llm_response)
@@ -202,14 +544,83 @@ class JeopardyDB:
         self.session.add(llm_judge_rating)
         self.session.commit()
 
+    def _insert_each(self, rows: list) -> int:
+        """
+        Insert rows in a single commit, or one savepoint per row if that commit fails.
+
+        A row that cannot be written, e.g. one breaking a constraint, is reported and
+        skipped instead of rolling back the rest of its batch.
+
+        Returns:
+            int: The number of rows written.
+        """
+        try:
+            self.session.add_all(rows)
+            self.session.commit()
+            return len(rows)
+        except SQLAlchemyError:
+            self.session.rollback()
+        written = 0
+        for row in rows:
+            try:
+                with self.session.begin_nested():
+                    self.session.add(row)
+                written += 1
+            except SQLAlchemyError as e:
+                print(f"Error writing {type(row).__name__}: {e}")
+        self.session.commit()
+        return written
+
+    def insert_llm_judge_ratings(self, llm_judge_ratings: List[LLMJudgeRating]) -> int:
+        return self._insert_each(llm_judge_ratings)
+
+    def insert_llm_responses(self, llm_responses: List[LLMResponse]) -> int:
+        return self._insert_each(llm_responses)
+
     def get_questions(self):
         return self.session.query(Question).all()
 
+    def count_questions(self) -> int:
+        return self.session.query(func.count(Question.id)).scalar()
+
+    def get_llm(self, llm_id: int) -> Optional[LLM]:
+        return self.session.get(LLM, llm_id)
+
+    def iter_questions(self, batch_size: int = 1000) -> Iterator[List[Question]]:
+        """
+        Yield all questions in id order, one batch at a time.
+
+        Each batch is read in its own unit of work and yielded detached, so the caller
+        only ever holds the current batch in memory.
+        """
+        after_id = 0
+        while True:
+            with self.session_scope():
+                batch = self.session.query(Question).filter(Question.id > after_id) \
+                    .order_by(Question.id).limit(batch_size).all()
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1].id
+
+    def get_question_ids_by_category(self) -> Dict[str, List[int]]:
+        """
+        Get the ids of all questions grouped by category, in id order within a category.
+        """
+        question_ids: Dict[str, List[int]] = {}
+        for question_id, category in self.session.query(Question.id, Question.category).order_by(Question.id):
+            question_ids.setdefault(category, []).append(question_id)
+        return question_ids
+
+    def get_questions_by_ids(self, question_ids: List[int]) -> List[Question]:
+        return self.session.query(Question).filter(Question.id.in_(question_ids)).all()
+
     def insert_test_run(self, user_prompt: str, system_prompt: str, parameters: Optional[str] = None):
         test_run = TestRun(
             user_prompt=user_prompt,
             system_prompt=system_prompt,
-            parameters=parameters
+            # the column is NOT NULL, so "no parameters" is recorded as an empty JSON object
+            parameters=parameters if parameters is not None else json.dumps({})
         )
         self.session.add(test_run)
         self.session.commit()
@@ -217,6 +628,9 @@ class JeopardyDB:
     
     def get_test_runs(self):
         return self.session.query(TestRun).all()
+
+    def get_test_run(self, test_run_id: int) -> Optional[TestRun]:
+        return self.session.get(TestRun, test_run_id)
     
     def get_last_test_run_id(self):
         last_test_run = self.session.query(TestRun.id).order_by(TestRun.id.desc()).first()
@@ -253,6 +667,57 @@ class JeopardyDB:
         
         return unrated_responses
 
+    def get_unrated_llm_responses_page(self, llm_id: int, test_run_id: int, judge_llm: str,
+                                       after_id: int = 0, limit: int = 100) -> List[LLMResponse]:
+        """
+        Get the next page of LLM responses not yet rated by a judge, in response id order.
+
+        Unlike get_unrated_llm_responses this never loads the whole test run, so long
+        judging runs can walk the responses in fixed-size units.
+
+        Args:
+            llm_id (int): The ID of the LLM.
+            test_run_id (int): The ID of the test run.
+            judge_llm (str): The name of the judge LLM.
+            after_id (int): Cursor; the id of the last response of the previous page, or 0.
+            limit (int): Maximum number of responses to return.
+
+        Returns:
+            List[LLMResponse]: Unrated responses with their rendered prompt already loaded.
+        """
+        already_rated = exists().where(LLMJudgeRating.llm_response_id == LLMResponse.id,
+                                       LLMJudgeRating.judge_model == judge_llm,
+                                       LLMJudgeRating.test_run_id == test_run_id)
+        return self.session.query(LLMResponse).options(joinedload(LLMResponse.rendered_prompt)) \
+            .filter(LLMResponse.llm_id == llm_id, LLMResponse.test_run_id == test_run_id,
+                    LLMResponse.id > after_id, ~already_rated) \
+            .order_by(LLMResponse.id).limit(limit).all()
+
+    def get_test_run_llm_ids(self, test_run_id: int) -> List[int]:
+        """
+        Get the ids of the LLMs with responses in a test run.
+        """
+        return [row[0] for row in self.session.query(LLMResponse.llm_id)
+                .filter(LLMResponse.test_run_id == test_run_id).distinct().order_by(LLMResponse.llm_id)]
+
+    def get_llm_responses_by_ids(self, llm_response_ids: List[int]) -> List[LLMResponse]:
+        """
+        Get LLM responses by id, e.g. to retry judging them, with their rendered prompt already loaded.
+        """
+        return self.session.query(LLMResponse).options(joinedload(LLMResponse.rendered_prompt)) \
+            .filter(LLMResponse.id.in_(llm_response_ids)).all()
+
+    def count_unrated_llm_responses(self, llm_id: int, test_run_id: int, judge_llm: str) -> int:
+        """
+        Count the LLM responses in a test run not yet rated by the given judge.
+        """
+        already_rated = exists().where(LLMJudgeRating.llm_response_id == LLMResponse.id,
+                                       LLMJudgeRating.judge_model == judge_llm,
+                                       LLMJudgeRating.test_run_id == test_run_id)
+        return self.session.query(func.count(LLMResponse.id)) \
+            .filter(LLMResponse.llm_id == llm_id, LLMResponse.test_run_id == test_run_id, ~already_rated) \
+            .scalar()
+
     def get_llm_responses_by_llm_id(self, llm_id):
         return self.session.query(LLMResponse).filter_by(llm_id=llm_id).all()
 
@@ -300,6 +765,181 @@ class JeopardyDB:
             'accuracy', 'coherence', 'completion', 'question_structure', 'judge_generated_tokens', 'judge_input_token_count'],
             row)) for row in result]
 
+    def _rating_filters(self, query, test_run_id: Optional[int], judge_model: Optional[str],
+                        after_rating_id: int, up_to_rating_id: Optional[int]):
+        if test_run_id is not None:
+            query = query.filter(LLMJudgeRating.test_run_id == test_run_id)
+        if judge_model is not None:
+            query = query.filter(LLMJudgeRating.judge_model == judge_model)
+        if after_rating_id:
+            query = query.filter(LLMJudgeRating.id > after_rating_id)
+        if up_to_rating_id is not None:
+            query = query.filter(LLMJudgeRating.id <= up_to_rating_id)
+        return query
+
+    def get_llm_score_totals(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None,
+                             after_rating_id: int = 0, up_to_rating_id: Optional[int] = None,
+                             llm_id: Optional[int] = None, by_test_run: bool = False) -> List[Row]:
+        """
+        Sum judge ratings per LLM, or per LLM and test run, in a single GROUP BY query.
+
+        Sums and non-null counts are returned instead of means, so totals over successive
+        rating id ranges can be added together.
+
+        Args:
+            test_run_id (Optional[int]): Only ratings from this test run.
+            judge_model (Optional[str]): Only ratings by this judge.
+            after_rating_id (int): Only ratings with a higher id.
+            up_to_rating_id (Optional[int]): Only ratings with this id or lower.
+            llm_id (Optional[int]): Only ratings of this LLM's responses.
+            by_test_run (bool): One row per LLM and test run, with a test_run_id column.
+
+        Returns:
+            List[Row]: One row per LLM with llm_id, llm_name, rating_count, and `<measure>_sum`
+            and `<measure>_count` for each criterion and for generated_tokens,
+            input_tokens and judge_input_tokens.
+        """
+        measures = [(name, getattr(LLMJudgeRating, name)) for name in CRITERIA]
+        measures += [('generated_tokens', LLMResponse.generated_tokens),
+                     ('input_tokens', LLMResponse.input_token_count),
+                     ('judge_input_tokens', LLMJudgeRating.input_token_count)]
+        columns = []
+        for name, column in measures:
+            columns += [func.sum(column).label(f'{name}_sum'), func.count(column).label(f'{name}_count')]
+        groups = [LLM.id.label('llm_id'), LLM.name.label('llm_name')]
+        if by_test_run:
+            groups.append(LLMJudgeRating.test_run_id.label('test_run_id'))
+        query = self.session.query(
+            *groups,
+            func.count(LLMJudgeRating.id).label('rating_count'),
+            *columns,
+        ).select_from(LLMJudgeRating) \
+            .join(LLMResponse, LLMResponse.id == LLMJudgeRating.llm_response_id) \
+            .join(LLM, LLM.id == LLMResponse.llm_id)
+        query = self._rating_filters(query, test_run_id, judge_model, after_rating_id, up_to_rating_id)
+        if llm_id is not None:
+            query = query.filter(LLMResponse.llm_id == llm_id)
+        return query.group_by(*groups).order_by(*groups).all()
+
+    def get_score_cube_rows(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None,
+                            after_rating_id: int = 0, up_to_rating_id: Optional[int] = None) -> List[Row]:
+        """
+        Aggregate judge ratings at the finest analytics grain in a single GROUP BY query.
+
+        There is one row per LLM, category, round, value and air year, holding the rating
+        count and, for each criterion, the sum and number of non-null scores, so that any
+        coarser breakdown can be rolled up from these rows without querying again.
+
+        Args:
+            test_run_id (Optional[int]): Only ratings from this test run.
+            judge_model (Optional[str]): Only ratings by this judge.
+            after_rating_id (int): Only ratings with a higher id.
+            up_to_rating_id (Optional[int]): Only ratings with this id or lower.
+
+        Returns:
+            List[Row]: Rows with llm_id, llm_name, category, round, value_amount, air_year,
+            rating_count, and `<criterion>_sum` and `<criterion>_count` for every criterion.
+        """
+        measures = []
+        for criterion in CRITERIA:
+            column = getattr(LLMJudgeRating, criterion)
+            measures += [func.sum(column).label(f'{criterion}_sum'), func.count(column).label(f'{criterion}_count')]
+        dimensions = (LLMResponse.llm_id, LLM.name, Question.category, Question.round,
+                      Question.value_amount, Question.air_year)
+        query = self.session.query(
+            LLMResponse.llm_id.label('llm_id'),
+            LLM.name.label('llm_name'),
+            Question.category.label('category'),
+            Question.round.label('round'),
+            Question.value_amount.label('value_amount'),
+            Question.air_year.label('air_year'),
+            func.count(LLMJudgeRating.id).label('rating_count'),
+            *measures,
+        ).select_from(LLMJudgeRating) \
+            .join(LLMResponse, LLMResponse.id == LLMJudgeRating.llm_response_id) \
+            .join(LLM, LLM.id == LLMResponse.llm_id) \
+            .join(Question, Question.id == LLMResponse.question_id)
+        query = self._rating_filters(query, test_run_id, judge_model, after_rating_id, up_to_rating_id)
+        return query.group_by(*dimensions).all()
+
+    def get_rating_scores(self, test_run_id: Optional[int] = None,
+                          judge_model: Optional[str] = None) -> List[Row]:
+        """
+        Get the LLM, question and criterion scores of every matching judge rating.
+
+        Only plain columns are selected, without GROUP BY or ORM entities, so hundreds of
+        thousands of ratings load quickly for aggregation in NumPy.
+
+        Args:
+            test_run_id (Optional[int]): Only ratings from this test run.
+            judge_model (Optional[str]): Only ratings by this judge.
+
+        Returns:
+            List[Row]: Rows with llm_id, question_id, accuracy, coherence, completion and
+            question_structure.
+        """
+        query = select(LLMResponse.llm_id, LLMResponse.question_id, LLMJudgeRating.accuracy,
+                       LLMJudgeRating.coherence, LLMJudgeRating.completion, LLMJudgeRating.question_structure) \
+            .select_from(LLMJudgeRating) \
+            .join(LLMResponse, LLMResponse.id == LLMJudgeRating.llm_response_id)
+        if test_run_id is not None:
+            query = query.where(LLMJudgeRating.test_run_id == test_run_id)
+        if judge_model is not None:
+            query = query.where(LLMJudgeRating.judge_model == judge_model)
+        return self.session.execute(query).all()
+
+    def diff_test_runs(self, base_run_id: int, compare_run_id: int,
+                       judge_model: Optional[str] = None) -> List[Row]:
+        """
+        Pair the judged answers of two test runs by question and LLM.
+
+        Both runs are read in one pass over the ratings' (test_run_id, judge_model) index
+        and grouped on (question_id, llm_id), with each run's scores averaged into its own
+        columns. This is a full outer join of the two runs on that key, without
+        materialising and re-indexing each side as a self-join would.
+
+        Args:
+            base_run_id (int): The run to compare against, e.g. the old prompt.
+            compare_run_id (int): The new run.
+            judge_model (Optional[str]): Only ratings by this judge; all judges when None.
+
+        Returns:
+            List[Row]: Rows with question_id, llm_id, base_ratings and compare_ratings (0 when
+            the pair was not rated in that run), and `base_<criterion>` and
+            `compare_<criterion>` for every criterion (None where unscored).
+        """
+        in_base = LLMJudgeRating.test_run_id == base_run_id
+        in_compare = LLMJudgeRating.test_run_id == compare_run_id
+        columns = [func.count(case((in_base, 1))).label('base_ratings'),
+                   func.count(case((in_compare, 1))).label('compare_ratings')]
+        for criterion in CRITERIA:
+            column = getattr(LLMJudgeRating, criterion)
+            columns += [func.avg(case((in_base, column))).label(f'base_{criterion}'),
+                        func.avg(case((in_compare, column))).label(f'compare_{criterion}')]
+        query = select(LLMResponse.question_id, LLMResponse.llm_id, *columns) \
+            .select_from(LLMJudgeRating) \
+            .join(LLMResponse, LLMResponse.id == LLMJudgeRating.llm_response_id) \
+            .where(LLMJudgeRating.test_run_id.in_([base_run_id, compare_run_id]))
+        if judge_model is not None:
+            query = query.where(LLMJudgeRating.judge_model == judge_model)
+        query = query.group_by(LLMResponse.question_id, LLMResponse.llm_id)
+        # plain Core rows; the ORM result wrapper adds a third to the time for runs this size
+        return self.session.connection().execute(query).all()
+
+    def get_run_answers(self, test_run_ids: List[int], question_ids: List[int]) -> List[Row]:
+        """
+        Get the questions and answers given in some test runs, for showing diff rows side by side.
+
+        Returns:
+            List[Row]: Rows with test_run_id, question_id, llm_id, question, answer and response.
+        """
+        query = select(LLMResponse.test_run_id, LLMResponse.question_id, LLMResponse.llm_id,
+                       Question.question, Question.answer, LLMResponse.response) \
+            .select_from(LLMResponse) \
+            .join(Question, Question.id == LLMResponse.question_id) \
+            .where(LLMResponse.test_run_id.in_(test_run_ids), LLMResponse.question_id.in_(question_ids))
+        return self.session.execute(query).all()
+
     def get_judgement_by_llm_response_id(self, llm_response_id):
         return self.session.query(LLMJudgeRating).filter_by(llm_response_id=llm_response_id).all()
         
@@ -307,13 +947,168 @@ class JeopardyDB:
         return self.session.query(LLMJudgeRating).filter_by(llm_response_id=llm_response_id, judge_model=judge_model).all()
 
     def get_llm_responses_by_llm_id_and_test_run_id(self, llm_id: int, test_run_id: int):
-        return self.session.query(LLMResponse).filter_by(llm_id=llm_id, test_run_id=test_run_id).all()
+        return self.session.query(LLMResponse).options(joinedload(LLMResponse.rendered_prompt)) \
+            .filter_by(llm_id=llm_id, test_run_id=test_run_id).all()
     
     def get_llm_responses(self, test_run_id):
         return self.session.query(LLMResponse).filter_by(test_run_id=test_run_id).all()
 
+    def get_llm_responses_page(self, llm_id: Optional[int] = None, test_run_id: Optional[int] = None,
+                               after_id: int = 0, limit: int = 100) -> List[Row]:
+        """
+        Get one page of LLM responses using keyset (id-cursor) paging.
+
+        Pages are ordered by response id and served from the (llm_id, id) and
+        (test_run_id, llm_id, id) indexes, so fetching any page costs the same no
+        matter how many responses precede it.
+
+        Args:
+            llm_id (Optional[int]): Only return responses from this LLM.
+            test_run_id (Optional[int]): Only return responses from this test run.
+            after_id (int): Cursor; the id of the last row of the previous page, or 0 for the first page.
+            limit (int): Maximum number of rows to return.
+
+        Returns:
+            List[Row]: Lightweight rows with the columns in RESPONSE_PAGE_COLUMNS. Pass the
+            `id` of the last row as `after_id` to fetch the next page.
+        """
+        query = self.session.query(*RESPONSE_PAGE_COLUMNS) \
+            .outerjoin(RenderedPrompt, RenderedPrompt.id == LLMResponse.prompt_id) \
+            .filter(LLMResponse.id > after_id)
+        if llm_id is not None:
+            query = query.filter(LLMResponse.llm_id == llm_id)
+        if test_run_id is not None:
+            query = query.filter(LLMResponse.test_run_id == test_run_id)
+        return query.order_by(LLMResponse.id).limit(limit).all()
+
+    def get_judge_ratings_page(self, llm_id: int, judge_model: str, test_run_id: Optional[int] = None,
+                               after_id: int = 0, limit: int = 100) -> List[Row]:
+        """
+        Get one page of a judge's ratings for an LLM using keyset (id-cursor) paging.
+
+        Args:
+            llm_id (int): The ID of the LLM whose responses were rated.
+            judge_model (str): The name of the judge LLM.
+            test_run_id (Optional[int]): Only return ratings from this test run.
+            after_id (int): Cursor; the rating id of the last row of the previous page, or 0.
+            limit (int): Maximum number of rows to return.
+
+        Returns:
+            List[Row]: Lightweight rows with the columns in RATING_PAGE_COLUMNS, ordered by rating id.
+        """
+        query = self.session.query(*RATING_PAGE_COLUMNS) \
+            .join(LLMResponse, LLMResponse.id == LLMJudgeRating.llm_response_id) \
+            .filter(LLMJudgeRating.judge_model == judge_model, LLMResponse.llm_id == llm_id,
+                    LLMJudgeRating.id > after_id)
+        if test_run_id is not None:
+            query = query.filter(LLMJudgeRating.test_run_id == test_run_id)
+        return query.order_by(LLMJudgeRating.id).limit(limit).all()
+
+    def get_rated_llm_responses_page(self, llm_id: int, judge_model: Optional[str] = None,
+                                     test_run_id: Optional[int] = None,
+                                     after_id: int = 0, limit: int = 100) -> List[Row]:
+        """
+        Get one page of LLM responses together with a judge's rating of each, if any.
+
+        Responses without a rating from `judge_model` are still returned, with the
+        rating columns set to None; a response the judge rated more than once comes back
+        once, with its latest rating. Paging works as in get_llm_responses_page.
+
+        Returns:
+            List[Row]: Rows with the columns in RESPONSE_PAGE_COLUMNS followed by those in
+            RATING_SCORE_COLUMNS, ordered by response id.
+        """
+        query = self.session.query(*RESPONSE_PAGE_COLUMNS, *RATING_SCORE_COLUMNS) \
+            .outerjoin(RenderedPrompt, RenderedPrompt.id == LLMResponse.prompt_id) \
+            .outerjoin(LLMJudgeRating, latest_rating(judge_model)) \
+            .filter(LLMResponse.llm_id == llm_id, LLMResponse.id > after_id)
+        if test_run_id is not None:
+            query = query.filter(LLMResponse.test_run_id == test_run_id)
+        return query.order_by(LLMResponse.id).limit(limit).all()
+
+    def get_response_table_page(self, llm_id: int, judge_model: Optional[str] = None,
+                                test_run_id: Optional[int] = None, sort_by: str = "id",
+                                descending: bool = False, search: Optional[str] = None,
+                                cursor: Optional[Tuple[float, int]] = None, limit: int = 100) -> List[Row]:
+        """
+        Get one sorted, filtered page of an LLM's responses with a judge's ratings.
+
+        Paging is keyset-based on (sort key, response id). Sorted by id or a token count,
+        a page seeks to its cursor in the (llm_id, id) or (llm_id, <count>, id) index and
+        reads just its rows. A rating column has no index on the joined result, so each
+        page joins and sorts all of the LLM's matching responses before taking its rows,
+        and costs grow with the run; so does a search, which may have to read most of
+        them to fill a page. Missing ratings sort as -1. A response the judge rated more
+        than once is shown once, with its latest rating.
+
+        Args:
+            llm_id (int): The ID of the LLM.
+            judge_model (Optional[str]): Judge whose ratings are joined in; None for no ratings.
+            test_run_id (Optional[int]): Only responses from this test run.
+            sort_by (str): One of TABLE_SORT_COLUMNS.
+            descending (bool): Sort from highest to lowest.
+            search (Optional[str]): Only responses whose text, category or clue contains this string.
+            cursor (Optional[Tuple[float, int]]): `(sort_key, id)` of the last row of the previous page.
+            limit (int): Maximum number of rows to return.
+
+        Returns:
+            List[Row]: Rows with RESPONSE_PAGE_COLUMNS, RATING_SCORE_COLUMNS and a `sort_key` column.
+        """
+        if sort_by not in TABLE_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort_by}; expected one of {list(TABLE_SORT_COLUMNS)}")
+        sort_column = TABLE_SORT_COLUMNS[sort_by]
+        # response columns are never NULL and stay bare, so the llm_id indexes can order and seek the page
+        sort_key = sort_column if sort_column.table is LLMResponse.__table__ else func.coalesce(sort_column, -1)
+
+        query = self.session.query(*RESPONSE_PAGE_COLUMNS, *RATING_SCORE_COLUMNS, sort_key.label('sort_key')) \
+            .outerjoin(RenderedPrompt, RenderedPrompt.id == LLMResponse.prompt_id) \
+            .outerjoin(LLMJudgeRating, latest_rating(judge_model)) \
+            .filter(LLMResponse.llm_id == llm_id)
+        if test_run_id is not None:
+            query = query.filter(LLMResponse.test_run_id == test_run_id)
+        if search:
+            pattern = f"%{search}%"
+            query = query.join(Question, Question.id == LLMResponse.question_id) \
+                .filter(or_(LLMResponse.response.like(pattern), Question.category.like(pattern),
+                            Question.question.like(pattern)))
+        if cursor is not None:
+            position = tuple_(sort_key, LLMResponse.id)
+            query = query.filter(position < tuple_(*cursor) if descending else position > tuple_(*cursor))
+        if descending:
+            query = query.order_by(sort_key.desc(), LLMResponse.id.desc())
+        else:
+            query = query.order_by(sort_key, LLMResponse.id)
+        return query.limit(limit).all()
+
+    def get_watermarks(self) -> Tuple[int, int]:
+        """
+        Get the highest llm_responses and llm_judge_ratings ids.
+
+        Both are primary key lookups, so callers can poll this cheaply to find out
+        whether anything was written since they last looked.
+
+        Returns:
+            Tuple[int, int]: (max response id, max rating id), 0 for empty tables.
+        """
+        max_response_id = self.session.query(func.max(LLMResponse.id)).scalar() or 0
+        max_rating_id = self.session.query(func.max(LLMJudgeRating.id)).scalar() or 0
+        return max_response_id, max_rating_id
+
+    def iter_llm_responses_pages(self, llm_id: Optional[int] = None, test_run_id: Optional[int] = None,
+                                 page_size: int = 1000) -> Iterator[List[Row]]:
+        """
+        Walk every matching LLM response page by page, following the id cursor.
+        """
+        after_id = 0
+        while True:
+            page = self.get_llm_responses_page(llm_id, test_run_id, after_id, page_size)
+            if not page:
+                return
+            yield page
+            after_id = page[-1].id
+
     def close(self):
-        self.session.close()
+        self.session.remove()
 
 if __name__ == '__main__':
     # Insert data
@@ -1,15 +1,25 @@
+from answer_cache import AnswerCache
+from cassette import open_cassette
+from circuit_breaker import CircuitOpenError, MAX_OUTAGE_WAIT, RETRY_ROUNDS, await_ready, breakers
+from hedging import HedgedCaller, HedgePolicy
 from llmproviders import LLMProvider
+import asyncio
 import json
-import multiprocess
+import time
+from dataclasses import dataclass
+from budget import RunBudget, interleave, round_robin, stratified
 from db_operations import JeopardyDB, Question, LLMResponse, LLM
-from typing import Generator, Tuple, List
-from prompts import PROMPTS
+from typing import Dict, Generator, Tuple, List, Optional
+from job_queue import Job
+from prompts import PROMPTS, generation_limits
+from dotenv import load_dotenv
 import argparse
 
-from genai.client import Client
-from genai.credentials import Credentials
+# settings such as JEOPARDY_COMPRESS_TEXT apply from the first write, before any provider loads the .env
+load_dotenv()
 
-client = Client(credentials=Credentials.from_env())
+# Answers streamed at once per LLM
+ANSWER_CONCURRENCY = 32
 
 def prepare_prompt_in_batches(db_file: str, batch_size: int) -> Generator[List[Tuple[Question, str]], None, None]:
     """
@@ -23,13 +33,27 @@ def prepare_prompt_in_batches(db_file: str, batch_size: int) -> Generator[List[T
         List[Tuple[Question, str]]: A list of prompts, where each prompt is a tuple containing the Question object and the prompt text.
     """
     with JeopardyDB(db_file) as db:
-        questions = db.get_questions()
-        batches = list(chunked_iterable(questions, batch_size))
-
-        for batch in batches:
+        # questions are read a batch at a time so the whole question set is never held in memory
+        for batch in db.iter_questions(batch_size):
             prompts = [(question, get_prompt(question)) for question in batch]
             yield prompts
 
+def prepare_stratified_prompts(db_file: str, batch_size: int) -> Generator[List[Tuple[int, str]], None, None]:
+    """
+    Generate prompts in batches, taking the categories in turn so that every prefix of the
+    batches covers the categories evenly.
+
+    Yields:
+        List[Tuple[int, str]]: (question id, prompt text) pairs.
+    """
+    with JeopardyDB(db_file) as db:
+        with db.session_scope():
+            question_ids = stratified(db.get_question_ids_by_category())
+        for batch_ids in chunked_iterable(question_ids, batch_size):
+            with db.session_scope():
+                questions = {question.id: question for question in db.get_questions_by_ids(batch_ids)}
+            yield [(question_id, get_prompt(questions[question_id])) for question_id in batch_ids]
+
 def get_prompt(question: Question):
     """
     Prepare the prompt for the question.
@@ -41,52 +65,317 @@ def get_prompt(question: Question):
     prompt = PROMPTS["play"]["user"].format(question.category, question.question)
     return prompt
 
-def generate_jeopardy_answer(prompt: str, llm: LLM, provider: LLMProvider) -> LLMResponse:
+def _llm_response(result: Dict, llm: LLM) -> LLMResponse:
+    return LLMResponse(
+        llm_id=llm.id,
+        response=result['answer'],
+        generated_tokens=result['generated_token_count'],
+        input_token_count=result['input_token_count'],
+        time_to_first_token=result.get('time_to_first_token'),
+        latency=result.get('latency')
+    )
+
+def generate_jeopardy_answer(prompt: str, llm: LLM, provider: LLMProvider,
+                             limits: Optional[Dict] = None) -> LLMResponse:
     """
     Send a question to the LLM and return the LLMResponse object.
 
     Args:
         prompt (str): The input prompt for the model.
         llm (LLM): The language model object to use.
+        limits (Optional[Dict]): max_tokens and stop for the answer; the play template's when None.
 
     Returns:
         LLMResponse: An LLMResponse object containing the generated response.
     """
-    result = provider.generate_answer(prompt, llm.provider, llm.name)
+    start = time.perf_counter()
+    result = provider.generate_answer(prompt, llm.provider, llm.name, **(limits or generation_limits("play")))
+    # not streamed, so only the total latency is known
+    return _llm_response({**result, 'latency': time.perf_counter() - start}, llm)
 
-    llm_response = LLMResponse(
-        llm_id=llm.id,
-        response=result['answer'],
-        generated_tokens=result['generated_token_count'],
-        input_token_count=result['input_token_count']
-    )
+async def agenerate_jeopardy_answer(prompt: str, llm: LLM, provider: LLMProvider,
+                                    hedger: Optional[HedgedCaller] = None, limits: Optional[Dict] = None,
+                                    decoding: Optional[Dict] = None, cache: Optional[AnswerCache] = None,
+                                    budget: Optional[RunBudget] = None) -> LLMResponse:
+    """
+    Stream a question's answer from the LLM and return the LLMResponse object, with its timings.
+
+    The call goes through the model's circuit breaker, so it fails at once with
+    CircuitOpenError while the model is down. With a hedger, the call gets its deadline
+    and, if slow, a hedge; the timings are those of the attempt that answered. `limits`
+    are as for generate_jeopardy_answer, and `decoding` holds sampling parameters such
+    as temperature, top_p and top_k.
+
+    With a cache, an answer that decoding makes deterministic is asked for once and shared
+    by every caller, timings included. Only calls actually made are charged to the budget.
+    """
+    key = (llm.provider, llm.name)
+    limits = limits or generation_limits("play")
+
+    def make_call():
+        return provider.agenerate_answer(prompt, llm.provider, llm.name, **limits, decoding=decoding)
+
+    def attempt():
+        return hedger.acall(key, make_call) if hedger is not None else make_call()
+
+    async def call() -> Dict:
+        result = await breakers.get(key).acall(attempt)
+        if budget is not None:
+            budget.charge((result["input_token_count"] or 0) + (result["generated_token_count"] or 0))
+        return result
+    cache_key = cache.key(llm, prompt, limits, decoding) if cache is not None else None
+    result = await (cache.aget(cache_key, call) if cache_key is not None else call())
+    return _llm_response(result, llm)
 
-    return llm_response
+@dataclass(eq=False)
+class Player:
+    """An LLM answering the questions of a test run, with the decoding parameters of that run."""
+    llm: LLM
+    test_run_id: int
+    decoding: Optional[Dict] = None
 
+async def aplay(players: List[Player], db_file: str, batch_size: int, concurrency: int = ANSWER_CONCURRENCY,
+                job: Optional[Job] = None, hedger: Optional[HedgedCaller] = None, budget: Optional[RunBudget] = None,
+                cache: Optional[AnswerCache] = None) -> int:
+    """
+    Answer the questions in the database with several players at once, streaming on one event loop.
+
+    Questions are taken in category-stratified order, and every batch goes to every player
+    before the next batch starts, so the players progress through the same questions
+    together. Up to `concurrency` answers per LLM are in flight at any time, across batch
+    boundaries and shared by every player of that LLM. Only question ids are held for the
+    whole run: questions are read and responses written a batch at a time, and a batch is
+    written in a single commit as soon as all of its answers are in. If a background job
+    is given, progress is reported to it batch by batch; when the job is cancelled no
+    further questions are sent and answers still in flight are abandoned. With a hedger,
+    answers past its deadline fail, and hedges are sent on top of the `concurrency` slots.
+    With a cache, see AnswerCache, deterministic answers are shared between players.
+
+    Once the budget is used up, counting the questions in flight at their average cost so
+    far, no further questions are sent; answers in flight are still written, and every
+    player has answered the same, category-balanced share of the questions.
+
+    Questions whose answer failed are parked and asked again, in up to RETRY_ROUNDS
+    passes after the first. While every LLM's circuit is open no questions are sent;
+    waiting on circuits is capped at MAX_OUTAGE_WAIT seconds per run, and questions still
+    failing after the last pass are left unanswered.
+
+    Returns:
+        int: The number of responses written.
+    """
+    provider = LLMProvider()
+    llms = {player.llm.id: player.llm for player in players}
+    for llm in llms.values():
+        # fail early on an unknown provider
+        provider.get_provider(llm.provider)
+    llm_breakers = {llm_id: breakers.get((llm.provider, llm.name)) for llm_id, llm in llms.items()}
+    slots = {llm_id: asyncio.Semaphore(concurrency) for llm_id in llms}
+    limits = generation_limits("play")
+    # enough batches queued to keep every slot busy while the oldest batch finishes
+    max_pending = len(players) * (concurrency // batch_size + 2)
+    written = 0
+    # questions sent and not yet answered, which the budget counts as already spent
+    queued = 0
+    out_of_budget = False
+    # (player, question id, prompt) of answers that failed, to ask again once the LLM is back
+    parked: List[Tuple[Player, int, str]] = []
+    outage_wait = 0.0
+
+    def cancelled() -> bool:
+        return job is not None and job.cancelled
 
-def process_chunk(prompts: List[Tuple[Question, str]], 
-                  llm: LLM, provider: LLMProvider, test_run_id: int, 
-                  db_file: str) -> List[Tuple[Question, LLMResponse]]:
-    """Process a chunk of tasks."""
     with JeopardyDB(db_file) as db:
-        results = []
-        for question, prompt in prompts:
-            llm_response = generate_jeopardy_answer(prompt, llm, provider)
-            llm_response.question_id = question.id
-            llm_response.test_run_id = test_run_id
-            llm_response.prompt = prompt
-            db.insert_llm_response(llm_response)
-            results.append((question, llm_response))
-    return results
-
-def generate_answers(llm : LLM, db_file: str, test_run_id: int, batch_size: int):    
-    """Generate answers for questions in the database."""
-    provider = LLMProvider(llm.provider)
-    with multiprocess.Pool() as pool:
-        batches = prepare_prompt_in_batches(db_file, batch_size)
-        
-        args_chunks =  [(batch, llm, provider, test_run_id, db_file) for batch in batches]
-        pool.starmap(process_chunk, args_chunks)
+        if job is not None:
+            job.set_total(db.count_questions() * len(players))
+
+        async def answer(player: Player, question_id: int, prompt: str) -> Optional[LLMResponse]:
+            async with slots[player.llm.id]:
+                try:
+                    return await agenerate_jeopardy_answer(prompt, player.llm, provider, hedger, limits,
+                                                           player.decoding, cache, budget)
+                except CircuitOpenError:
+                    # the failures that opened the circuit were already reported
+                    parked.append((player, question_id, prompt))
+                except Exception as e:
+                    print(f"Error generating answer: {e}")
+                    if job is not None:
+                        job.record_error(str(e))
+                    parked.append((player, question_id, prompt))
+                return None
+
+        async def answer_batch(player: Player, prompts: List[Tuple[int, str]], advance: bool) -> Tuple[int, int]:
+            nonlocal queued
+            try:
+                llm_responses = await asyncio.gather(*(answer(player, question_id, prompt)
+                                                       for question_id, prompt in prompts))
+            finally:
+                queued -= len(prompts)
+            answered = []
+            for (question_id, prompt), llm_response in zip(prompts, llm_responses):
+                if llm_response is None:
+                    continue
+                llm_response.question_id = question_id
+                llm_response.test_run_id = player.test_run_id
+                try:
+                    # the rendered prompt is stored once and shared by every model and test run
+                    llm_response.prompt_id = db.get_or_create_prompt(prompt)
+                except Exception as e:
+                    # one answer that cannot be stored does not cost the rest of the batch
+                    print(f"Error storing prompt for question {question_id}: {e}")
+                    db.session.rollback()
+                    parked.append((player, question_id, prompt))
+                    continue
+                answered.append(llm_response)
+            # a response that cannot be written is skipped, and the others are still committed
+            written_count = db.insert_llm_responses(answered)
+            # retried questions were counted towards the job's progress the first time
+            return len(prompts) if advance else 0, written_count
+
+        pending = set()
+
+        async def wait_for_batches(max_left: int) -> bool:
+            """Wait until at most `max_left` batches are pending; False once the job is cancelled."""
+            nonlocal pending, written
+            while len(pending) > max_left:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    question_count, response_count = task.result()
+                    written += response_count
+                    if job is not None:
+                        job.advance(question_count)
+                if cancelled():
+                    return False
+            return True
+
+        async def wait_for_circuits(retry_in) -> bool:
+            """Hold off while circuits are open; False once the job is cancelled."""
+            nonlocal outage_wait
+            max_wait = MAX_OUTAGE_WAIT - outage_wait
+            if budget is not None:
+                max_wait = min(max_wait, budget.seconds_left())
+            outage_wait += await await_ready(retry_in, max_wait, cancelled)
+            return not cancelled()
+
+        async def play(work, advance: bool) -> bool:
+            """
+            Answer (player, batch) pairs with at most `max_pending` batches in flight.
+
+            Returns:
+                bool: False once the job is cancelled or the budget is used up.
+            """
+            nonlocal queued, out_of_budget
+            current_batch = None
+            for player, batch in work:
+                if batch is not current_batch:
+                    current_batch = batch
+                    # the budget is checked per batch, as a batch once started goes to every player
+                    if budget is not None and not budget.allows(queued + len(batch) * len(players)):
+                        out_of_budget = True
+                        break
+                # any LLM whose circuit is closed can make progress
+                if not await wait_for_circuits(lambda: min(breaker.retry_in() for breaker in llm_breakers.values())):
+                    return False
+                queued += len(batch)
+                pending.add(asyncio.create_task(answer_batch(player, batch, advance)))
+                if not await wait_for_batches(max_pending - 1):
+                    return False
+            return await wait_for_batches(0) and not out_of_budget
+
+        try:
+            if await play(interleave(players, prepare_stratified_prompts(db_file, batch_size)), advance=True):
+                for _ in range(RETRY_ROUNDS):
+                    if not parked:
+                        break
+                    retry = parked[:]
+                    parked.clear()
+                    if not await wait_for_circuits(lambda: max(llm_breakers[player.llm.id].retry_in()
+                                                               for player, _, _ in retry)):
+                        break
+                    # each player's parked questions, in batches, taking turns between the players
+                    work = round_robin([(player, chunk) for chunk in chunked_iterable(
+                        [(question_id, prompt) for parked_player, question_id, prompt in retry
+                         if parked_player is player], batch_size)] for player in players)
+                    if not await play(work, advance=False):
+                        break
+                if parked:
+                    print(f"{len(parked)} questions left unanswered after {RETRY_ROUNDS} retries")
+            if out_of_budget:
+                print(f"Budget used up ({budget.exhausted_by() or 'tokens'}): stopped after {written} responses")
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    return written
+
+async def agenerate_round_robin(llms: List[LLM], db_file: str, test_run_id: int, batch_size: int,
+                                concurrency: int = ANSWER_CONCURRENCY, job: Optional[Job] = None,
+                                hedger: Optional[HedgedCaller] = None, budget: Optional[RunBudget] = None) -> int:
+    """
+    Answer the questions in the database with several LLMs at once, taking turns batch by batch; see aplay.
+
+    Returns:
+        int: The number of responses written.
+    """
+    return await aplay([Player(llm, test_run_id) for llm in llms], db_file, batch_size, concurrency, job, hedger,
+                       budget)
+
+async def agenerate_answers(llm: LLM, db_file: str, test_run_id: int, batch_size: int,
+                            concurrency: int = ANSWER_CONCURRENCY, job: Optional[Job] = None,
+                            hedger: Optional[HedgedCaller] = None, budget: Optional[RunBudget] = None) -> int:
+    """
+    Generate answers for questions in the database with one LLM; see agenerate_round_robin.
+
+    Returns:
+        int: The number of responses written.
+    """
+    return await agenerate_round_robin([llm], db_file, test_run_id, batch_size, concurrency, job, hedger, budget)
+
+def generate_answers(llm : LLM, db_file: str, test_run_id: int, batch_size: int, job: Optional[Job] = None,
+                     concurrency: int = ANSWER_CONCURRENCY, hedger: Optional[HedgedCaller] = None,
+                     budget: Optional[RunBudget] = None) -> int:
+    """
+    Generate answers for questions in the database; see agenerate_round_robin.
+
+    Returns:
+        int: The number of responses written.
+    """
+    return asyncio.run(agenerate_answers(llm, db_file, test_run_id, batch_size, concurrency, job, hedger, budget))
+
+def generate_round_robin(llms: List[LLM], db_file: str, test_run_id: int, batch_size: int,
+                         concurrency: int = ANSWER_CONCURRENCY, hedger: Optional[HedgedCaller] = None,
+                         budget: Optional[RunBudget] = None) -> int:
+    """
+    Answer the questions with every LLM, taking turns between them; see agenerate_round_robin.
+
+    Returns:
+        int: The number of responses written.
+    """
+    return asyncio.run(agenerate_round_robin(llms, db_file, test_run_id, batch_size, concurrency,
+                                             hedger=hedger, budget=budget))
+
+def generate_answers_for_llm(job: Optional[Job], db_file: str, llm_id: int,
+                             test_run_id: Optional[int] = None, batch_size: int = 25) -> int:
+    """
+    Answer every question in the database with one LLM, e.g. from a dashboard job.
+
+    Args:
+        job (Optional[Job]): Background job to report progress to.
+        db_file (str): Path to the database file.
+        llm_id (int): The ID of the LLM to play.
+        test_run_id (Optional[int]): Test run to add the responses to; a new one is created when None.
+        batch_size (int): Number of questions per committed batch.
+
+    Returns:
+        int: The test run the responses were written to.
+    """
+    with JeopardyDB(db_file) as db:
+        llm = db.get_llm(llm_id)
+        if llm is None:
+            raise ValueError(f"No LLM with id {llm_id}")
+        if test_run_id is None:
+            test_run_id = db.insert_test_run(PROMPTS["play"]["user"], PROMPTS["play"]["system"])
+    generate_answers(llm, db_file, test_run_id, batch_size, job)
+    return test_run_id
 
 def load_json_data(file_path: str):
     """
@@ -102,19 +391,28 @@ def chunked_iterable(iterable, size):
     for i in range(0, len(iterable), size):
         yield iterable[i:i + size]
 
-def main(models_file: str, questions_file: str, db_file: str):
+def main(models_file: str, questions_file: str, db_file: str, concurrency: int = ANSWER_CONCURRENCY,
+         hedger: Optional[HedgedCaller] = None, budget: Optional[RunBudget] = None):
     """
     Main execution function.
+
+    All models play at once, taking turns batch by batch, so a run stopped by its budget
+    has the same questions answered by every model.
     """
     # Load LLM information from the models file and insert them into the database
     with JeopardyDB(db_file) as db:
         llms = db.insert_and_return_llms_from_file(models_file)
         # Load the questions from the file and insert them into the database
         db.insert_questions_file(questions_file)
-        test_run_id = db.insert_test_run(PROMPTS["play"]["user"], PROMPTS["play"]["system"])
+        # the output limits are part of what the run measured
+        test_run_id = db.insert_test_run(PROMPTS["play"]["user"], PROMPTS["play"]["system"],
+                                         json.dumps(generation_limits("play")))
 
-    for llm in llms:
-        generate_answers(llm, db_file, test_run_id, 25)   # batch size of 25
+    generate_round_robin(llms, db_file, test_run_id, 25, concurrency, hedger, budget)   # batch size of 25
+    if hedger is not None:
+        print(f"Hedging: {hedger.stats()}")
+    if budget is not None:
+        print(f"Budget: {budget.stats()}")
 
     
 if __name__ == "__main__":
@@ -143,6 +441,50 @@ if __name__ == "__main__":
         default=None,
         help="The ID of the test run to use for generating judgements."
     )
+    parser.add_argument(
+        "--concurrency", type=int,
+        default=ANSWER_CONCURRENCY,
+        help="Number of answers streamed at once per LLM."
+    )
+    parser.add_argument(
+        "--deadline", type=float,
+        default=None,
+        help="Seconds to wait for an answer, hedge included, before giving up on it."
+    )
+    parser.add_argument(
+        "--hedge_percentile", type=float,
+        default=0,
+        help="Send a duplicate request when an answer is slower than this percentile of the model's recent latencies; 0 disables hedging."
+    )
+    parser.add_argument(
+        "--hedge_max_ratio", type=float,
+        default=0.1,
+        help="Largest share of requests that may be hedged, which caps the extra spend."
+    )
+    parser.add_argument(
+        "--time-budget", type=float,
+        default=None,
+        help="Seconds the run may take; no new questions are sent after that."
+    )
+    parser.add_argument(
+        "--token-budget", type=int,
+        default=None,
+        help="Input and generated tokens the run may spend, over all models; no new questions are sent after that."
+    )
+    parser.add_argument(
+        "--record", type=str,
+        default=None,
+        help="Record every provider call, with its timing, to this cassette (.jsonl.gz), appending to it."
+    )
+    parser.add_argument(
+        "--replay", type=str,
+        default=None,
+        help="Answer from this recorded cassette instead of calling the providers."
+    )
+    parser.add_argument(
+        "--replay_latency", action="store_true",
+        help="Wait for the recorded latency of every replayed call."
+    )
     args = parser.parse_args()
     models_file = f"{args.models_file}"
     questions_file=f"{args.questions_file}"
@@ -150,5 +492,18 @@ if __name__ == "__main__":
     #models_file = "data/models.jsonl"  # Path to the models configuration file
     #questions_file = "data/questions-test.jsonl"  # Path to the questions file
     #db_file = "outs/jeopardy.db"
-    main(models_file, questions_file, db_file)
+    hedger = None
+    if args.deadline or args.hedge_percentile:
+        hedger = HedgedCaller(HedgePolicy(percentile=args.hedge_percentile, max_hedge_ratio=args.hedge_max_ratio,
+                                          deadline=args.deadline))
+    budget = None
+    if args.time_budget is not None or args.token_budget is not None:
+        budget = RunBudget(seconds=args.time_budget, tokens=args.token_budget)
+    cassette = open_cassette(args.record, args.replay, args.replay_latency)
+    try:
+        main(models_file, questions_file, db_file, args.concurrency, hedger, budget)
+    finally:
+        if cassette is not None:
+            cassette.close()
+            print(f"Cassette: {cassette.stats()}")
 
@@ -1,3 +1,6 @@
+from budget import RunBudget
+from cassette import open_cassette
+from hedging import HedgedCaller, HedgePolicy
 from judge_manager import JudgeManager
 import argparse
 
@@ -23,10 +26,66 @@ if __name__ == "__main__":
         "--llm_id",
         type=int,
         default=None,
-        help="The LLM ID to use."
+        help="The LLM ID to use; every LLM of the test run, taking turns, when omitted."
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Seconds to wait for a judge's answer, hedge included, before leaving the response unrated.")
+    parser.add_argument(
+        "--hedge_percentile",
+        type=float,
+        default=0,
+        help="Send a duplicate request when a judge call is slower than this percentile of its recent latencies; 0 disables hedging.")
+    parser.add_argument(
+        "--hedge_max_ratio",
+        type=float,
+        default=0.1,
+        help="Largest share of judge calls that may be hedged, which caps the extra spend.")
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        help="Seconds judging may take; no new responses are judged after that.")
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Judge input and generated tokens judging may spend; no new responses are judged after that.")
+    parser.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        help="Record every judge call, with its timing, to this cassette (.jsonl.gz), appending to it.")
+    parser.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        help="Rate with the judges recorded in this cassette instead of calling them.")
+    parser.add_argument(
+        "--replay_latency",
+        action="store_true",
+        help="Wait for the recorded latency of every replayed call.")
     args = parser.parse_args()
-    manager = JudgeManager(args.db_file, args.judge_llm)
-    manager.generate_judgements(args.db_file, args.judge_llm, args.llm_id, args.test_run_id)
+    hedger = None
+    if args.deadline or args.hedge_percentile:
+        hedger = HedgedCaller(HedgePolicy(percentile=args.hedge_percentile, max_hedge_ratio=args.hedge_max_ratio,
+                                          deadline=args.deadline))
+    cassette = open_cassette(args.record, args.replay, args.replay_latency)
+    manager = JudgeManager(args.db_file, args.judge_llm, hedger=hedger, cassette=cassette)
+    budget = None
+    if args.time_budget is not None or args.token_budget is not None:
+        budget = RunBudget(seconds=args.time_budget, tokens=args.token_budget)
+    try:
+        manager.generate_judgements(args.db_file, args.judge_llm, args.llm_id, args.test_run_id, budget=budget)
+    finally:
+        if cassette is not None:
+            cassette.close()
+            print(f"Cassette: {cassette.stats()}")
+    if hedger is not None:
+        print(f"Hedging: {hedger.stats()}")
+    if budget is not None:
+        print(f"Budget: {budget.stats()}")
     
     # judge_manager.run()
\ No newline at end of file
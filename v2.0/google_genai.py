@@ -1,32 +1,47 @@
 import google.generativeai as genai
-from genai.client import Client
-from genai.credentials import Credentials
 import os
+from typing import AsyncIterator, Dict, List, Optional
 
 from dotenv import load_dotenv
 
+from hedging import request_timeout
+from streaming import collect_stream
+
 load_dotenv()
 
+def _generation_config(max_tokens: Optional[int], stop: Optional[List[str]], decoding: Optional[Dict]) -> Dict:
+    # temperature, top_p and top_k have the same names in the Gemini API
+    config = dict(decoding or {})
+    if max_tokens:
+        config["max_output_tokens"] = max_tokens
+    if stop:
+        config["stop_sequences"] = stop
+    return config
+
 class GoogleGenerativeAI:
     def __init__(self):
         # Set your Google Generative AI API key
         self.GOOGLE_GENAI_API_KEY = os.getenv("GOOGLE_GENAI_API_KEY")
         if not self.GOOGLE_GENAI_API_KEY:
             raise ValueError("Missing GOOGLE_GENAI_API_KEY environment variable")
-
-        # Initialize the Generative AI client
-        self.client = Client(credentials=Credentials.from_env())
+        # configured once; the adapter is shared by every Google model and call
+        genai.configure(api_key=self.GOOGLE_GENAI_API_KEY)
 
         # Initialize the model object
         self.model = None
 
-    def generate_answer(self, prompt: str, model_name: str = "gemini-1.0-pro-latest"):
+    def generate_answer(self, prompt: str, model_name: str = "gemini-1.0-pro-latest", max_tokens: Optional[int] = None,
+                        stop: Optional[List[str]] = None,
+                        decoding: Optional[Dict] = None):
         """
         Calls the Google Generative API with a given prompt and model name.
 
         Args:
             prompt (str): The text prompt to send to the model.
             model_name (str, optional): The name of the generative model to use. Defaults to "gemini-1.0-pro-latest".
+            max_tokens (Optional[int]): Most tokens to generate; the model's default when None.
+            stop (Optional[List[str]]): Sequences that end the answer.
+            decoding (Optional[Dict]): temperature, top_p and top_k; the model's defaults when not given.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -36,15 +51,13 @@ class GoogleGenerativeAI:
                 - "generated_token_count": The number of tokens in the generated response.
                 - "input_token_count": The number of tokens in the input prompt.
         """
-        # Configure the API key only once (on first call)
-        genai.configure(api_key=self.GOOGLE_GENAI_API_KEY)
-
         # Create the model object only once (on first call for a specific model)
         if not self.model or self.model.name != model_name:
             self.model = genai.GenerativeModel(model_name)
 
         # Generate content
-        response = self.model.generate_content(prompt)
+        response = self.model.generate_content(prompt, generation_config=_generation_config(max_tokens, stop, decoding),
+                                               request_options={"timeout": request_timeout()})
 
         # Calculate the token counts
         input_token_count = self.model.count_tokens(prompt).total_tokens
@@ -58,6 +71,42 @@ class GoogleGenerativeAI:
             "input_token_count": input_token_count
         }
 
+    async def astream_answer(self, prompt: str, model_name: str = "gemini-1.0-pro-latest",
+                             max_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                             decoding: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Stream the Google model's answer as it is generated.
+
+        Yields:
+            dict: {"text": ...} for each piece of the answer, then
+            {"generated_token_count": ..., "input_token_count": ...} once it is complete.
+        """
+        # a model object per call, so concurrent streams for different models do not share one
+        model = genai.GenerativeModel(model_name)
+
+        parts = []
+        config = _generation_config(max_tokens, stop, decoding)
+        async for chunk in await model.generate_content_async(prompt, stream=True, generation_config=config,
+                                                               request_options={"timeout": request_timeout()}):
+            parts.append(chunk.text)
+            yield {"text": chunk.text}
+
+        # Token counts, as generate_answer computes them
+        input_tokens = await model.count_tokens_async(prompt)
+        generated_tokens = await model.count_tokens_async("".join(parts))
+        yield {"generated_token_count": generated_tokens.total_tokens, "input_token_count": input_tokens.total_tokens}
+
+    async def agenerate_answer(self, prompt: str, model_name: str = "gemini-1.0-pro-latest",
+                               max_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                               decoding: Optional[Dict] = None) -> Dict:
+        """
+        Like generate_answer, but streamed, so many answers can be generated on one event loop.
+
+        The result also has "time_to_first_token" and "latency", in seconds.
+        """
+        return await collect_stream(self.astream_answer(prompt, model_name, max_tokens, stop, decoding),
+                                    f"google/{model_name}", prompt)
+
 # Example usage
 if __name__ == "__main__":
     prompt = "Write a poem about a cat"
@@ -0,0 +1,222 @@
+import asyncio
+import bisect
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Seconds an SDK waits on one request before giving up, unless JEOPARDY_REQUEST_TIMEOUT says otherwise
+DEFAULT_REQUEST_TIMEOUT = 120.0
+
+def request_timeout() -> float:
+    """The per-request timeout handed to every provider and judge SDK client, in seconds."""
+    return float(os.environ.get("JEOPARDY_REQUEST_TIMEOUT") or DEFAULT_REQUEST_TIMEOUT)
+
+class LatencyHistogram:
+    """
+    Latencies in log-spaced buckets, 10% wide, from 1 ms to about 20 minutes.
+
+    Percentiles are read from the buckets, so recording and reading are O(1) in the
+    number of observations. Once `max_count` latencies are recorded every bucket is
+    halved, so the histogram follows a provider whose latency drifts.
+    """
+    MIN_SECONDS = 0.001
+    GROWTH = 1.1
+
+    def __init__(self, max_count: int = 10000):
+        self.max_count = max_count
+        bucket_count = int(math.log(1200 / self.MIN_SECONDS, self.GROWTH)) + 1
+        self._bounds: List[float] = [self.MIN_SECONDS * self.GROWTH ** i for i in range(bucket_count)]
+        self._counts: List[float] = [0.0] * (bucket_count + 1)
+        self.count = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self._bounds, seconds)] += 1
+            self.count += 1
+            if self.count >= self.max_count:
+                self._counts = [count / 2 for count in self._counts]
+                self.count /= 2
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The upper bound of the bucket holding the q-th percentile; None when empty."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q / 100 * self.count
+            seen = 0.0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank and count:
+                    return self._bounds[min(index, len(self._bounds) - 1)]
+            return self._bounds[-1]
+
+@dataclass
+class HedgePolicy:
+    """
+    When to send a second copy of a slow request, and how long to wait for any answer.
+
+    A request still running at the `percentile`-th percentile of its provider's recent
+    latencies is duplicated and the first answer wins. Hedging starts after `min_samples`
+    latencies are known, and at most `max_hedge_ratio` of requests are hedged, which caps
+    the extra spend (0.1 adds at most 10% more calls).
+    """
+    # 0 turns hedging off and leaves only the deadline
+    percentile: float = 95.0
+    min_samples: int = 20
+    max_hedge_ratio: float = 0.1
+    # never hedge sooner than this, so fast providers are not hedged on noise
+    min_delay: float = 0.05
+    # seconds for a whole call, hedge included, before TimeoutError; None waits for the SDK timeout
+    deadline: Optional[float] = None
+
+class HedgedCaller:
+    """
+    Runs provider and judge calls with a deadline and, per HedgePolicy, a hedge.
+
+    Latencies are kept per key, e.g. (provider, model), and drive the hedge delays.
+    Failures are not hedged or retried: an error from the first attempt is raised,
+    unless a hedge already running answers instead.
+    """
+
+    def __init__(self, policy: Optional[HedgePolicy] = None, max_workers: int = 32):
+        self.policy = policy or HedgePolicy()
+        self.histograms: Dict[Hashable, LatencyHistogram] = {}
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def histogram(self, key: Hashable) -> LatencyHistogram:
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = LatencyHistogram()
+            return self.histograms[key]
+
+    def hedge_delay(self, key: Hashable) -> Optional[float]:
+        """Seconds after which a call for `key` is hedged, or None if it should not be."""
+        policy = self.policy
+        if not policy.percentile:
+            return None
+        histogram = self.histogram(key)
+        if histogram.count < policy.min_samples:
+            return None
+        return max(histogram.percentile(policy.percentile), policy.min_delay)
+
+    def _start(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            self.calls += 1
+        return self.hedge_delay(key)
+
+    def _claim_hedge(self) -> bool:
+        # hedges are counted when sent, so concurrent calls cannot overshoot the cap together
+        with self._lock:
+            if self.hedges + 1 > self.policy.max_hedge_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _finish(self, key: Hashable, started_at: float, hedge_won: bool):
+        self.histogram(key).record(time.perf_counter() - started_at)
+        if hedge_won:
+            with self._lock:
+                self.hedge_wins += 1
+
+    def _timed_out(self, key: Hashable) -> TimeoutError:
+        with self._lock:
+            self.timeouts += 1
+        return TimeoutError(f"No answer from {key} within {self.policy.deadline}s")
+
+    async def acall(self, key: Hashable, make_call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `make_call()` with the deadline and hedge; the losing attempt is cancelled.
+
+        Args:
+            key (Hashable): Whose latencies to learn from and hedge by, e.g. (provider, model).
+            make_call (Callable[[], Awaitable[T]]): Starts one attempt; called again for the hedge.
+
+        Raises:
+            TimeoutError: If no attempt answered within the deadline.
+        """
+        delay = self._start(key)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.policy.deadline if self.policy.deadline else None
+        attempts: Dict[asyncio.Task, float] = {asyncio.ensure_future(make_call()): time.perf_counter()}
+        first = next(iter(attempts))
+        try:
+            while True:
+                timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                if delay is not None and len(attempts) == 1:
+                    timeout = delay if timeout is None else min(timeout, delay)
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or len(attempts) == 1:
+                        if task.exception() is None:
+                            self._finish(key, attempts[task], task is not first)
+                        return task.result()
+                    # one attempt failed while the other is still running: wait for that one
+                    del attempts[task]
+                if deadline is not None and loop.time() >= deadline:
+                    raise self._timed_out(key)
+                if not done and delay is not None and first in attempts:
+                    if self._claim_hedge():
+                        attempts[asyncio.ensure_future(make_call())] = time.perf_counter()
+                    delay = None
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def call(self, key: Hashable, make_call: Callable[[], T]) -> T:
+        """
+        Blocking version of acall for synchronous SDKs, with attempts on a thread pool.
+
+        A losing attempt cannot be cancelled; its thread finishes in the background and its
+        answer is dropped, so the SDK's own timeout bounds how long it can linger.
+        """
+        delay = self._start(key)
+        if delay is None and not self.policy.deadline:
+            started_at = time.perf_counter()
+            result = make_call()
+            self._finish(key, started_at, False)
+            return result
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+        deadline = time.monotonic() + self.policy.deadline if self.policy.deadline else None
+        attempts: Dict[Future, float] = {self._executor.submit(make_call): time.perf_counter()}
+        first = next(iter(attempts))
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if delay is not None and len(attempts) == 1:
+                timeout = delay if timeout is None else min(timeout, delay)
+            done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None or len(attempts) == 1:
+                    if future.exception() is None:
+                        self._finish(key, attempts[future], future is not first)
+                    return future.result()
+                del attempts[future]
+            if deadline is not None and time.monotonic() >= deadline:
+                raise self._timed_out(key)
+            if not done and delay is not None and first in attempts:
+                if self._claim_hedge():
+                    attempts[self._executor.submit(make_call)] = time.perf_counter()
+                delay = None
+
+    def stats(self) -> Dict:
+        """Calls, hedges and timeouts so far, and each key's current hedge threshold."""
+        with self._lock:
+            keys = list(self.histograms)
+            counts = dict(calls=self.calls, hedges=self.hedges, hedge_wins=self.hedge_wins, timeouts=self.timeouts)
+        return {**counts, "thresholds": {str(key): self.histogram(key).percentile(self.policy.percentile or 95)
+                                         for key in keys}}
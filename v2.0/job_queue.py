@@ -0,0 +1,144 @@
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+class JobCancelled(Exception):
+    """Raised inside a job when it notices it has been cancelled."""
+
+@dataclass
+class Job:
+    """
+    Progress and control handle for one background job.
+
+    The job function receives its Job and reports through `set_total`, `advance` and
+    `record_error`. It should call `check_cancelled` between work items.
+    """
+    id: int
+    name: str
+    status: str = "queued"
+    done: int = 0
+    total: Optional[int] = None
+    errors: List[str] = field(default_factory=list)
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def set_total(self, total: int):
+        self.total = total
+
+    def advance(self, count: int = 1):
+        self.done += count
+
+    def record_error(self, message: str):
+        self.errors.append(message)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Work items completed per second."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the job finishes at the current throughput, if it can be estimated."""
+        if self.total is None or self.throughput == 0:
+            return None
+        return max(self.total - self.done, 0) / self.throughput
+
+    def summary(self) -> str:
+        progress = f"{self.done}/{self.total}" if self.total is not None else f"{self.done}"
+        line = f"#{self.id} {self.name}: {self.status}, {progress} done, {self.throughput:.2f}/s"
+        if self.status == "running" and self.eta is not None:
+            line += f", ETA {self.eta:.0f}s"
+        if self.errors:
+            line += f", {len(self.errors)} errors (last: {self.errors[-1]})"
+        return line
+
+class JobQueue:
+    """
+    Runs long judging and generation work off the caller's thread.
+
+    Jobs run on a small thread pool, so a web request can submit work and return at
+    once, then poll `get` for progress or call `cancel`.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, fn: Callable[..., object], *args, **kwargs) -> Job:
+        """
+        Queue `fn(job, *args, **kwargs)` and return its Job handle straight away.
+        """
+        with self._lock:
+            job = Job(id=next(self._ids), name=name)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn, *args, **kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., object], *args, **kwargs):
+        if job.cancelled:
+            job.status = "cancelled"
+            return None
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+            job.status = "cancelled" if job.cancelled else "done"
+            return result
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.record_error(str(e))
+            job.status = "failed"
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+        return None
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Ask a job to stop. Queued jobs never start; running jobs stop at their next check.
+
+        Returns:
+            bool: False if there is no such job.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def shutdown(self, cancel_running: bool = True):
+        if cancel_running:
+            for job in self.jobs():
+                job.cancel_event.set()
+        self._executor.shutdown(wait=True)
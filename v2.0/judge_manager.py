@@ -1,47 +1,232 @@
 from typing import List, Tuple
-from db_operations import JeopardyDB, LLMResponse
+from budget import RunBudget, round_robin
+from cassette import Cassette
+from circuit_breaker import CircuitOpenError, MAX_OUTAGE_WAIT, RETRY_ROUNDS, wait_until_ready
+from db_operations import JeopardyDB, LLMJudgeRating, LLMResponse
+from job_queue import Job
+from hedging import HedgedCaller
 from judges.judge import Judge
-from judges.anthropic_claude_judge import AnthropicClaudeJudge
-from judges.openai_judge import GPT4Judge
 from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Number of responses judged and written per unit of work
+JUDGE_BATCH_SIZE = 100
+
 class JudgeManager:
-    def __init__(self, db_file: str, judge_llm: str = ""):
+    def __init__(self, db_file: str, judge_llm: str = "", judges: Optional[List[Judge]] = None,
+                 hedger: Optional[HedgedCaller] = None, cassette: Optional[Cassette] = None):
         self.db = JeopardyDB(db_file=db_file)
-        self._judges: List[Judge] = self._initialize_judges(judge_llm)
+        self.judge_llm = judge_llm
+        # deadline and hedging policy applied to every judge's API calls
+        self.hedger = hedger
+        # cassette the judges' calls are recorded to or replayed from; the APIs are called directly when None
+        self.cassette = cassette
+        # judges (and their API clients) are built on first use, see the judges property
+        self._judges: Optional[List[Judge]] = judges
 
     def _initialize_judges(self, judge_llm: str) -> List[Judge]:
+        # judge modules are imported here so only the SDKs of the judges in use are loaded
         if not judge_llm:
-            return [AnthropicClaudeJudge(env_key="ANTHROPIC_API_KEY"), 
+            from judges.anthropic_claude_judge import AnthropicClaudeJudge
+            from judges.openai_judge import GPT4Judge
+            return [AnthropicClaudeJudge(env_key="ANTHROPIC_API_KEY"),
                     GPT4Judge(env_key_project="OPENAI_PROJECT_ID", env_key_org="OPENAI_ORG_ID")]
         elif judge_llm.startswith("claude"):
+            from judges.anthropic_claude_judge import AnthropicClaudeJudge
             return [AnthropicClaudeJudge(env_key="ANTHROPIC_API_KEY")]
         elif judge_llm.startswith("gpt-4"):
+            from judges.openai_judge import GPT4Judge
             return [GPT4Judge(env_key_project="OPENAI_PROJECT_ID", env_key_org="OPENAI_ORG_ID")]
+        elif judge_llm.startswith("mock"):
+            from judges.mock_judge import MockJudge
+            return [MockJudge(name=judge_llm)]
         else:
             raise ValueError(f"Invalid judge_llm: {judge_llm}")
 
     @property
     def judges(self) -> List[Judge]:
+        if self._judges is None:
+            if self.cassette is not None:
+                from judges.cassette_judge import cassette_judges
+                # replayed judges are the recorded ones, so no judge SDK or credentials are needed
+                self._judges = cassette_judges(self.cassette, self.judge_llm, None if self.cassette.replaying
+                                               else self._initialize_judges(self.judge_llm))
+            else:
+                self._judges = self._initialize_judges(self.judge_llm)
+            for judge in self._judges:
+                judge.hedger = self.hedger
         return self._judges
 
     def read_llm_responses(self) -> List[Tuple[int, int, LLMResponse]]:
         test_run_id = self.db.get_last_test_run_id()
         llm_responses = self.db.get_llm_responses(test_run_id)
         return [(test_run_id, response.llm_id, response) for response in llm_responses]
-   
-    def generate_judgements(self, db_file: str, judge_llm: str, llm_id: int, test_run_id: Optional[int] = None):
-        judge_manager = JudgeManager(db_file, judge_llm)
+
+    def generate_judgements(self, db_file: str, judge_llm: str, llm_id: Optional[int],
+                            test_run_id: Optional[int] = None, job: Optional[Job] = None,
+                            batch_size: int = JUDGE_BATCH_SIZE, budget: Optional[RunBudget] = None):
+        judge_manager = JudgeManager(db_file, judge_llm, hedger=self.hedger, cassette=self.cassette)
         # get llm responses from LLMResponse table where llm_id = llm_id
         if test_run_id is None:
             test_run_id = judge_manager.db.get_last_test_run_id()
-        
-        llm_responses = judge_manager.db.get_unrated_llm_responses(llm_id, test_run_id, judge_llm)
-        for llm_response in llm_responses:
-            for judge in judge_manager.judges:
-                if judge.total_generated_tokens is not None:
-                    judged_response = judge.judge_llmresponse(llm_response, test_run_id)
-                    judge_manager.db.insert_llm_judge_rating(judged_response)
\ No newline at end of file
+
+        if llm_id is None:
+            # every LLM of the test run, taking turns
+            with judge_manager.db.session_scope():
+                llm_ids = judge_manager.db.get_test_run_llm_ids(test_run_id)
+        else:
+            llm_ids = [llm_id]
+        judge_manager.judge_round_robin(llm_ids, test_run_id, judge_llm, batch_size, job, budget)
+
+    def _judge(self, judge: Judge, llm_response: LLMResponse, test_run_id: int,
+               job: Optional[Job]) -> Optional[LLMJudgeRating]:
+        # a failed rating is left for a retry rather than recorded as a score of 0
+        try:
+            return judge.judge_llmresponse(llm_response, test_run_id)
+        except CircuitOpenError:
+            # the failures that opened the circuit were already reported
+            return None
+        except Exception as e:
+            print(f"Error judging response {llm_response.id} with {judge.name}: {e}")
+            if job is not None:
+                job.record_error(str(e))
+            return None
+
+    def judge_unrated_responses(self, llm_id: int, test_run_id: int, judge_llm: str,
+                                batch_size: int = JUDGE_BATCH_SIZE, job: Optional[Job] = None,
+                                budget: Optional[RunBudget] = None) -> int:
+        """
+        Rate every response of an LLM in a test run that the judge has not rated yet; see judge_round_robin.
+
+        Returns:
+            int: The number of ratings written.
+        """
+        return self.judge_round_robin([llm_id], test_run_id, judge_llm, batch_size, job, budget)
+
+    def judge_round_robin(self, llm_ids: List[int], test_run_id: int, judge_llm: str,
+                          batch_size: int = JUDGE_BATCH_SIZE, job: Optional[Job] = None,
+                          budget: Optional[RunBudget] = None) -> int:
+        """
+        Rate the responses of several LLMs in a test run that the judge has not rated yet.
+
+        Each unit of work reads up to `batch_size` responses of every LLM and rates them
+        taking turns between the LLMs, so a run stopped by its budget has rated the same
+        number of responses of every LLM. Responses are read and ratings written a unit at
+        a time, each in its own session, so memory stays flat however many ratings the run
+        produces.
+
+        Each judge's calls go through its circuit breaker. While every judge's circuit is
+        open no new responses are read; responses whose rating failed are parked and
+        retried, in up to RETRY_ROUNDS passes once the first pass is done, after the
+        failing judge's circuit lets a probe through. Waiting on open circuits is capped
+        at MAX_OUTAGE_WAIT seconds per run, and responses still failing after the last
+        pass are left unrated for a later run.
+
+        Args:
+            llm_ids (List[int]): The IDs of the LLMs whose responses are judged.
+            test_run_id (int): The ID of the test run.
+            judge_llm (str): The name of the judge LLM used to find unrated responses.
+            batch_size (int): Number of responses per unit of work.
+            job (Optional[Job]): Background job to report progress to. Judging stops, keeping
+                the ratings already written, once the job is cancelled.
+            budget (Optional[RunBudget]): Time and tokens judging may use; judging stops,
+                keeping the ratings already written, once it is used up.
+
+        Returns:
+            int: The number of ratings written.
+        """
+        if job is not None:
+            with self.db.session_scope():
+                job.set_total(sum(self.db.count_unrated_llm_responses(llm_id, test_run_id, judge_llm)
+                                  for llm_id in llm_ids))
+
+        judges = [judge for judge in self.judges if judge.total_generated_tokens is not None]
+        # (judge, response id) of ratings that failed, to retry once the judge is back
+        parked: List[Tuple[Judge, int]] = []
+        outage_wait = 0.0
+
+        def stopped() -> bool:
+            return job is not None and job.cancelled or budget is not None and not budget.allows()
+
+        def wait_for_judges(retry_in) -> bool:
+            """Wait for open circuits; False once judging should stop."""
+            nonlocal outage_wait
+            max_wait = MAX_OUTAGE_WAIT - outage_wait
+            if budget is not None:
+                max_wait = min(max_wait, budget.seconds_left())
+            outage_wait += wait_until_ready(retry_in, max_wait, job.cancel_event if job is not None else None)
+            return not stopped()
+
+        def rate(llm_response: LLMResponse, response_judges: List[Judge]) -> List[LLMJudgeRating]:
+            ratings = []
+            for judge in response_judges:
+                tokens_before = judge.total_input_tokens + judge.total_generated_tokens
+                rating = self._judge(judge, llm_response, test_run_id, job)
+                if budget is not None:
+                    budget.charge(judge.total_input_tokens + judge.total_generated_tokens - tokens_before)
+                if rating is None:
+                    parked.append((judge, llm_response.id))
+                else:
+                    ratings.append(rating)
+            return ratings
+
+        def units():
+            """The next page of unrated responses of every LLM, until all are rated or judging stops."""
+            # the id of the last response read, per LLM still to judge
+            after_ids = {llm_id: 0 for llm_id in llm_ids}
+            # any judge whose circuit is closed can make progress
+            while after_ids and wait_for_judges(lambda: min((judge.breaker.retry_in() for judge in judges),
+                                                            default=0.0)):
+                pages = []
+                with self.db.session_scope():
+                    for llm_id in list(after_ids):
+                        llm_responses = self.db.get_unrated_llm_responses_page(llm_id, test_run_id, judge_llm,
+                                                                               after_ids[llm_id], batch_size)
+                        if llm_responses:
+                            after_ids[llm_id] = llm_responses[-1].id
+                            pages.append(llm_responses)
+                        else:
+                            del after_ids[llm_id]
+                if pages:
+                    yield pages
+
+        rating_count = 0
+        for pages in units():
+            judged_responses = []
+            for llm_response in round_robin(pages):
+                judged_responses.extend(rate(llm_response, judges))
+                if job is not None:
+                    job.advance()
+                if stopped():
+                    break
+            with self.db.session_scope():
+                rating_count += self.db.insert_llm_judge_ratings(judged_responses)
+
+        for _ in range(RETRY_ROUNDS):
+            if not parked or stopped():
+                break
+            retry = parked[:]
+            parked.clear()
+            if not wait_for_judges(lambda: max(judge.breaker.retry_in() for judge, _ in retry)):
+                parked.extend(retry)
+                break
+            for i in range(0, len(retry), batch_size):
+                chunk = retry[i:i + batch_size]
+                with self.db.session_scope():
+                    llm_responses = {llm_response.id: llm_response for llm_response in
+                                     self.db.get_llm_responses_by_ids([response_id for _, response_id in chunk])}
+                judged_responses = []
+                for judge, response_id in chunk:
+                    if response_id in llm_responses:
+                        judged_responses.extend(rate(llm_responses[response_id], [judge]))
+                with self.db.session_scope():
+                    rating_count += self.db.insert_llm_judge_ratings(judged_responses)
+
+        if budget is not None and not budget.allows():
+            print(f"Budget used up ({budget.exhausted_by() or 'tokens'}): stopped after {rating_count} ratings")
+        elif parked and (job is None or not job.cancelled):
+            print(f"{len(parked)} judgements left unrated after {RETRY_ROUNDS} retries; "
+                  f"run the judge again once it is back")
+        return rating_count
@@ -0,0 +1,53 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from cassette import Cassette
+from judges.judge import Judge
+
+@dataclass
+class CassetteJudge(Judge):
+    """
+    A judge whose ratings are recorded to a cassette, or one rating from a cassette instead.
+
+    It takes the name of the judge it records or stands in for, and so shares that judge's
+    circuit breaker and hedging latencies. Replaying needs no judge, and so neither its
+    SDK nor its credentials.
+    """
+    cassette: Optional[Cassette] = None
+    judge: Optional[Judge] = None
+
+    def _make_api_call(self, prompt: str, system_prompt: str, max_tokens: int, temperature: float) -> Tuple[int, int, str]:
+        request = {"judge": self.name, "prompt": prompt, "system_prompt": system_prompt, "max_tokens": max_tokens,
+                   "temperature": temperature}
+        if self.cassette.replaying:
+            entry = self.cassette.replay("judge", request)
+            if self.cassette.replay_latency:
+                time.sleep(entry["latency"])
+            response = entry["response"]
+            return response["input_tokens"], response["generated_tokens"], response["text"]
+        start = time.perf_counter()
+        input_tokens, generated_tokens, text = self.judge._make_api_call(prompt, system_prompt, max_tokens, temperature)
+        self.cassette.record("judge", request,
+                             {"input_tokens": input_tokens, "generated_tokens": generated_tokens, "text": text},
+                             time.perf_counter() - start)
+        return input_tokens, generated_tokens, text
+
+def cassette_judges(cassette: Cassette, judge_llm: str = "", judges: Optional[List[Judge]] = None) -> List[Judge]:
+    """
+    Route judges through a cassette.
+
+    Args:
+        cassette (Cassette): The cassette to record to or replay from.
+        judge_llm (str): When replaying, the recorded judges whose name starts with it; all when empty.
+        judges (Optional[List[Judge]]): When recording, the judges to record.
+
+    Raises:
+        ValueError: If no recorded judge matches `judge_llm`.
+    """
+    if not cassette.replaying:
+        return [CassetteJudge(name=judge.name, env_key="", cassette=cassette, judge=judge) for judge in judges]
+    names = [name for name in cassette.judge_names() if name.startswith(judge_llm or "")]
+    if not names:
+        raise ValueError(f"{cassette.path} has no ratings recorded by a judge matching '{judge_llm or ''}'")
+    return [CassetteJudge(name=name, env_key="", cassette=cassette) for name in names]
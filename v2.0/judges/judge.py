@@ -2,7 +2,9 @@ from typing import Tuple, Optional
 from abc import ABC
 from dataclasses import dataclass
 
+from circuit_breaker import CircuitBreaker, breakers
 from db_operations import LLMResponse, LLMJudgeRating
+from hedging import HedgedCaller
 from prompts import PROMPTS
 import re
 import os
@@ -13,15 +15,29 @@ class Judge(ABC):
     env_key: str
     total_generated_tokens: int = 0
     total_input_tokens: int = 0
+    # deadline and hedging for the API calls; called directly when None
+    hedger: Optional[HedgedCaller] = None
     
     def __post_init__(self):
         if self.env_key:
             self.api_key = os.environ.get(self.env_key)
 
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """The circuit breaker this judge's API calls go through, shared by every instance of the judge."""
+        return breakers.get(("judge", self.name))
+
     def judge_llmresponse(self, llmresponse: LLMResponse, test_id: Optional[int] = None) -> LLMJudgeRating:
+        """
+        Rate a response on every criterion.
+
+        Raises:
+            Exception: Whatever a failed API call raised, or CircuitOpenError while the judge's
+                circuit is open, so that no made-up score is recorded for the response.
+        """
         ratings = {}
         for evaluation_type in ["completeness", "accuracy", "coherence", "is_question"]:
-            ratings[evaluation_type] = self._evaluate(evaluation_type, llmresponse.prompt, llmresponse.response)
+            ratings[evaluation_type] = self._evaluate(evaluation_type, llmresponse.prompt_text, llmresponse.response)
 
         return LLMJudgeRating(
             accuracy=ratings["accuracy"],
@@ -35,7 +51,8 @@ class Judge(ABC):
             judge_model=self.name
         )
 
-    def _evaluate(self, evaluation_type: str, llm_prompt: str, llm_response: str, max_tokens: int = 7, temperature: float = 0) -> float:
+    def _evaluate(self, evaluation_type: str, llm_prompt: str, llm_response: str, max_tokens: Optional[int] = None,
+                  temperature: float = 0) -> float:
         if evaluation_type == "accuracy":
             user_prompt = PROMPTS[evaluation_type]["user"].format(llm_prompt, llm_response)
         elif evaluation_type == "completeness":
@@ -43,7 +60,15 @@ class Judge(ABC):
         else:
             user_prompt = PROMPTS[evaluation_type]["user"].format(llm_response)
         system_prompt = PROMPTS[evaluation_type]["system"]
-        input_tokens, generated_tokens, response = self._make_api_call(user_prompt, system_prompt, max_tokens, temperature)
+        if max_tokens is None:
+            max_tokens = PROMPTS[evaluation_type]["max_tokens"]
+
+        def make_call():
+            return self._make_api_call(user_prompt, system_prompt, max_tokens, temperature)
+
+        def attempt():
+            return self.hedger.call(self.name, make_call) if self.hedger else make_call()
+        input_tokens, generated_tokens, response = self.breaker.call(attempt)
         self.total_generated_tokens += generated_tokens
         self.total_input_tokens += input_tokens
 
@@ -0,0 +1,33 @@
+import random
+import time
+from typing import Optional, Tuple
+
+from judges.judge import Judge
+from mock_genai import MockBehaviour, MockConfig, stable_hash
+from prompts import PROMPTS
+
+class MockJudge(Judge):
+    """
+    Offline judge for tests and load runs: rates without an API key, after a simulated latency.
+
+    The same response always gets the same ratings. The is_question rating checks for a
+    question mark; the others are drawn from a hash of the judge name, prompt and response.
+    Latency and failures (raised as MockProviderError) follow a MockConfig, read from MOCK_JUDGE_* environment variables
+    unless one is given.
+    """
+
+    def __init__(self, name: str = "mock-judge", config: Optional[MockConfig] = None):
+        super().__init__(name=name, env_key="")
+        self.config = config or MockConfig.from_env("MOCK_JUDGE_")
+        self.behaviour = MockBehaviour(self.config)
+
+    def _make_api_call(self, prompt: str, system_prompt: str, max_tokens: int, temperature: float) -> Tuple[int, int, str]:
+        latency, error = self.behaviour.plan()
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        if system_prompt == PROMPTS["is_question"]["system"]:
+            rating = "1" if "?" in prompt else "0"
+        else:
+            rating = f"{random.Random(stable_hash(self.name, system_prompt, prompt)).random():.2f}"
+        return len(system_prompt.split()) + len(prompt.split()), min(len(rating), max_tokens), rating
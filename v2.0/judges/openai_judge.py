@@ -1,6 +1,7 @@
 from typing import Tuple
 from openai import OpenAI
 
+from hedging import request_timeout
 from judges.judge import Judge
 import os
 
@@ -9,29 +10,26 @@ class GPT4Judge(Judge):
         super().__init__(name="gpt-4", env_key="")
         self.project_key = os.environ.get(env_key_project)
         self.org_id = os.environ.get(env_key_org)
-        self.openAI = OpenAI(organization=self.org_id, project=self.project_key)
+        self.openAI = OpenAI(organization=self.org_id, project=self.project_key, timeout=request_timeout())
 
     def _make_api_call(self, prompt: str, system_prompt: str, max_tokens: int, temperature: float) -> Tuple[int, int, str]:
-        try:
-            completion = self.openAI.chat.completions.create(
-                model=self.name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            if completion.usage:
-                prompt_tokens = completion.usage.prompt_tokens if completion.usage.prompt_tokens is not None else 0
-                completion_tokens = completion.usage.completion_tokens if completion.usage.completion_tokens is not None else 0
-            else:
-                prompt_tokens = 0
-                completion_tokens = 0
-                
-            content = completion.choices[0].message.content if completion.choices[0].message.content is not None else ""
-            return (prompt_tokens, completion_tokens, content)
-        except Exception as e:
-            print(f"Error making API call: {e}")
-            return (0, 0, "")
+        # errors are raised, so the judge's circuit breaker sees them and no score is made up
+        completion = self.openAI.chat.completions.create(
+            model=self.name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        if completion.usage:
+            prompt_tokens = completion.usage.prompt_tokens if completion.usage.prompt_tokens is not None else 0
+            completion_tokens = completion.usage.completion_tokens if completion.usage.completion_tokens is not None else 0
+        else:
+            prompt_tokens = 0
+            completion_tokens = 0
+
+        content = completion.choices[0].message.content if completion.choices[0].message.content is not None else ""
+        return (prompt_tokens, completion_tokens, content)
 
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from dataclasses import asdict
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from aggregates import ScoreBoard
+from dashboard_cache import WatermarkCache
+from db_operations import JeopardyDB
+
+# Seconds a database watermark is trusted before it is looked up again
+WATERMARK_TTL_SECONDS = 1.0
+
+def resource_key(path: str, query: Dict[str, str]) -> str:
+    """Canonical form of a request, so the same query in any parameter order shares one ETag."""
+    return path + "?" + "&".join(f"{key}={query[key]}" for key in sorted(query))
+
+class NotFound(Exception):
+    """Raised for unknown paths, test runs and models."""
+
+class LeaderboardService:
+    """
+    Read-only JSON views of model scores, built from ScoreBoard aggregates.
+
+    Every response is tagged with the database watermark it was built at. The watermark
+    itself is only looked up once per `watermark_ttl` seconds, so within that window a
+    conditional request is answered from memory, and a repeat request that is not
+    conditional is served from the body cache; neither touches the database once the
+    test run or model it names has been seen to exist.
+    """
+
+    def __init__(self, db: JeopardyDB, watermark_ttl: float = WATERMARK_TTL_SECONDS):
+        self.db = db
+        self.score_board = ScoreBoard(db)
+        self.watermark_ttl = watermark_ttl
+        self._bodies = WatermarkCache(maxsize=512)
+        self._watermark: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        # time the current watermark was first seen, used as Last-Modified
+        self._modified_at = 0.0
+        self._lock = threading.Lock()
+        # (kind, id) of the test runs and models seen to exist; nothing deletes them
+        self._existing = set()
+
+    def watermark(self) -> Tuple[Tuple[int, int], float]:
+        """
+        Get the (response id, rating id) watermark and when it last changed, refreshing at most once per TTL.
+        """
+        with self._lock:
+            now = time.time()
+            if self._watermark is None or now - self._checked_at >= self.watermark_ttl:
+                with self.db.session_scope():
+                    watermark = self.db.get_watermarks()
+                if watermark != self._watermark:
+                    self._watermark = watermark
+                    # HTTP dates have one-second resolution
+                    self._modified_at = float(int(now))
+                self._checked_at = now
+            return self._watermark, self._modified_at
+
+    def etag(self, watermark: Tuple[int, int], resource: str) -> str:
+        digest = hashlib.sha1(f"{watermark}:{resource}".encode("utf-8")).hexdigest()[:20]
+        return f'"{digest}"'
+
+    def leaderboard(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None) -> Dict:
+        scores = self.score_board.summary(test_run_id, judge_model)
+        ranked = sorted(scores, key=lambda score: (score.accuracy is None, -(score.accuracy or 0.0)))
+        return {
+            "test_run_id": test_run_id,
+            "judge_model": judge_model,
+            "models": [dict(rank=rank, **asdict(score)) for rank, score in enumerate(ranked, start=1)],
+        }
+
+    def runs(self) -> Dict:
+        with self.db.session_scope():
+            test_runs = self.db.get_test_runs()
+        return {"runs": [{"id": run.id, "run_time": run.run_time.isoformat() if run.run_time else None}
+                         for run in test_runs]}
+
+    def run(self, test_run_id: int, judge_model: Optional[str] = None) -> Dict:
+        with self.db.session_scope():
+            test_run = self.db.get_test_run(test_run_id)
+        if test_run is None:
+            raise NotFound(f"No test run with id {test_run_id}")
+        return {
+            "id": test_run.id,
+            "run_time": test_run.run_time.isoformat() if test_run.run_time else None,
+            "parameters": json.loads(test_run.parameters or "{}"),
+            **self.leaderboard(test_run_id, judge_model),
+        }
+
+    def model(self, llm_id: int, judge_model: Optional[str] = None) -> Dict:
+        with self.db.session_scope():
+            llm = self.db.get_llm(llm_id)
+        if llm is None:
+            raise NotFound(f"No model with id {llm_id}")
+        runs = [{"test_run_id": test_run_id, **asdict(score)}
+                for test_run_id, score in self.score_board.runs_of(llm_id, judge_model).items()]
+        overall = [score for score in self.score_board.summary(None, judge_model) if score.llm_id == llm_id]
+        return {
+            "id": llm.id,
+            "name": llm.name,
+            "provider": llm.provider,
+            "judge_model": judge_model,
+            "overall": asdict(overall[0]) if overall else None,
+            "runs": runs,
+        }
+
+    def _require(self, kind: str, key: int, lookup: Callable[[int], object]):
+        # each id is looked up until it is found, then trusted from memory
+        if (kind, key) in self._existing:
+            return
+        with self.db.session_scope():
+            found = lookup(key) is not None
+        if not found:
+            raise NotFound(f"No {kind} with id {key}")
+        self._existing.add((kind, key))
+
+    def route(self, path: str, query: Dict[str, str]) -> Callable[[], Dict]:
+        """
+        Resolve a request to the view that builds its body.
+
+        A test run or model must exist, so that conditional requests for one that does
+        not are answered 404 too; that is one primary key lookup the first time an id is
+        requested, and none after.
+
+        Raises:
+            NotFound: For an unknown path, test run or model.
+            ValueError: For a malformed id.
+        """
+        judge_model = query.get("judge") or None
+        parts = [part for part in path.split("/") if part]
+        if parts == ["leaderboard"]:
+            test_run_id = query.get("test_run")
+            test_run_id = int(test_run_id) if test_run_id else None
+            return lambda: self.leaderboard(test_run_id, judge_model)
+        if parts == ["runs"]:
+            return self.runs
+        if len(parts) == 2 and parts[0] == "runs":
+            test_run_id = int(parts[1])
+            self._require("test run", test_run_id, self.db.get_test_run)
+            return lambda: self.run(test_run_id, judge_model)
+        if len(parts) == 2 and parts[0] == "models":
+            llm_id = int(parts[1])
+            self._require("model", llm_id, self.db.get_llm)
+            return lambda: self.model(llm_id, judge_model)
+        raise NotFound(f"Unknown path {path}")
+
+    def build(self, path: str, query: Dict[str, str]) -> Dict:
+        """Route a request path to its view and build it; raises NotFound or ValueError."""
+        return self.route(path, query)()
+
+    def get(self, path: str, query: Dict[str, str]) -> Tuple[bytes, str, float]:
+        """
+        Get the JSON body of a resource, with its ETag and Last-Modified time.
+
+        Bodies are cached per resource until the watermark moves.
+        """
+        watermark, modified_at = self.watermark()
+        resource = resource_key(path, query)
+        self._bodies.validate(watermark)
+        body = self._bodies.get(resource)
+        if body is None:
+            body = json.dumps(self.build(path, query)).encode("utf-8")
+            self._bodies.put(resource, body)
+        return body, self.etag(watermark, resource), modified_at
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    # keep-alive, so pollers reuse their connection
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; without TCP_NODELAY each 200 waits on a delayed ACK
+    disable_nagle_algorithm = True
+    service: LeaderboardService = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        resource = resource_key(url.path, query)
+        try:
+            # unknown paths and ids are errors, whatever the request's validators say; `*` only matches what exists
+            self.service.route(url.path, query)
+        except NotFound as e:
+            self._send_error(HTTPStatus.NOT_FOUND, str(e))
+            return
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        # answer conditional requests before building anything
+        watermark, modified_at = self.service.watermark()
+        etag = self.service.etag(watermark, resource)
+        if self._not_modified(etag, modified_at):
+            self._send(HTTPStatus.NOT_MODIFIED, b"", etag, modified_at)
+            return
+
+        try:
+            body, etag, modified_at = self.service.get(url.path, query)
+        except NotFound as e:
+            self._send_error(HTTPStatus.NOT_FOUND, str(e))
+            return
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        self._send(HTTPStatus.OK, body, etag, modified_at)
+
+    def _not_modified(self, etag: str, modified_at: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= modified_at
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send(self, status: HTTPStatus, body: bytes, etag: str, modified_at: float):
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(modified_at, usegmt=True))
+        self.send_header("Cache-Control", "no-cache")
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # polling clients would flood stderr with one line per request
+        pass
+
+def make_server(db_file: str, host: str = "127.0.0.1", port: int = 8080,
+                watermark_ttl: float = WATERMARK_TTL_SECONDS) -> ThreadingHTTPServer:
+    """
+    Create the leaderboard server on a read-only connection to `db_file`.
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to start serving; port 0 picks a free port.
+    """
+    service = LeaderboardService(JeopardyDB(db_file, read_only=True), watermark_ttl)
+    handler = type("BoundLeaderboardHandler", (LeaderboardHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve model scores as read-only JSON.")
+    parser.add_argument(
+        "--db_file", type=str,
+        default="outs/jeopardy.db",
+        help="Path to the database file.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument(
+        "--watermark_ttl", type=float,
+        default=WATERMARK_TTL_SECONDS,
+        help="Seconds between checks for new responses and ratings.")
+    args = parser.parse_args()
+    try:
+        server = make_server(args.db_file, args.host, args.port, args.watermark_ttl)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    print(f"Serving /leaderboard, /runs, /runs/<id> and /models/<id> on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
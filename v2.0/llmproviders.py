@@ -1,36 +1,192 @@
-import anthropic_genai
-import google_genai
-import watsonx_genai
-from typing import Dict, Union
+import asyncio
+import functools
+import importlib
+import inspect
+import threading
+import time
+from importlib.metadata import EntryPoint, entry_points
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+
+from streaming import iterate_in_thread
+
+# Entry point group third-party packages register provider adapters under, e.g. in pyproject.toml:
+#   [project.entry-points."jeopardy_llm.providers"]
+#   acme = "acme_genai:AcmeGenerativeAI"
+# The entry point's name is the provider name used in models files; it must load a callable
+# that takes no arguments and returns an adapter with generate_answer(prompt, model_name), which may
+# also take max_tokens, stop and decoding keyword arguments.
+PROVIDER_ENTRY_POINT_GROUP = "jeopardy_llm.providers"
+
+# Sampling parameters a `decoding` dict may hold; every adapter that takes decoding understands them
+DECODING_PARAMETERS = ("temperature", "top_p", "top_k")
+
+# Adapters shipped with the package, as "module:attribute" so each SDK is imported only when selected
+BUILTIN_PROVIDERS = {
+    "anthropic": "anthropic_genai:AnthropicClaude",
+    "google": "google_genai:GoogleGenerativeAI",
+    "ibm": "watsonx_genai:WatsonxGenerativeAI",
+    "local": "local_genai:LocalGenerativeAI",
+    "mock": "mock_genai:MockGenerativeAI",
+}
+
+class ProviderRegistry:
+    """
+    Process-wide provider adapters, created on first use and then shared.
+
+    Each adapter holds its SDK client and so its HTTP keep-alive pool. Every model of a
+    provider, and every thread or job asking for it, gets the same adapter, since the
+    model is passed per call.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Union[str, Callable]]] = None):
+        self._factories: Dict[str, Union[str, Callable, EntryPoint]] = dict(factories or {})
+        self._adapters: Dict[str, object] = {}
+        self._entry_points_loaded = False
+        self._wrapper: Optional[Callable[[str, Callable[[], object]], object]] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Union[str, Callable]):
+        """
+        Register a provider.
+
+        Args:
+            name (str): Provider name, matched case-insensitively.
+            factory (Union[str, Callable]): A callable returning the adapter, or a
+                "module:attribute" reference to one, imported on first use.
+        """
+        with self._lock:
+            self._factories[name.lower()] = factory
+            self._adapters.pop(name.lower(), None)
+
+    def intercept(self, wrapper: Optional[Callable[[str, Callable[[], object]], object]]):
+        """
+        Have every adapter made from now on by `wrapper(name, create)`, or by its factory again when None.
+
+        `create()` makes the provider's own adapter, so a wrapper can decorate it, e.g. to
+        record its answers, or stand in for it without importing its SDK. Adapters already
+        made are dropped.
+        """
+        with self._lock:
+            self._wrapper = wrapper
+            self._adapters.clear()
+
+    def _load_entry_points(self):
+        # entry points are only scanned for names that are not built in, which keeps startup fast
+        for entry_point in entry_points(group=PROVIDER_ENTRY_POINT_GROUP):
+            self._factories.setdefault(entry_point.name.lower(), entry_point)
+        self._entry_points_loaded = True
+
+    def names(self) -> List[str]:
+        with self._lock:
+            if not self._entry_points_loaded:
+                self._load_entry_points()
+            return sorted(self._factories)
+
+    def get(self, name: str):
+        """
+        Get the shared adapter of a provider, creating it on first use.
+
+        Raises:
+            ValueError: If no provider of that name is built in or registered.
+        """
+        provider_name = name.lower()
+        adapter = self._adapters.get(provider_name)
+        if adapter is not None:
+            return adapter
+        with self._lock:
+            # another thread may have created it while this one waited
+            adapter = self._adapters.get(provider_name)
+            if adapter is None:
+                if provider_name not in self._factories and not self._entry_points_loaded:
+                    self._load_entry_points()
+                factory = self._factories.get(provider_name)
+                if factory is None:
+                    raise ValueError(f"Unsupported provider: {name}")
+                create = functools.partial(_create_adapter, factory)
+                adapter = create() if self._wrapper is None else self._wrapper(provider_name, create)
+                self._adapters[provider_name] = adapter
+        return adapter
+
+def _create_adapter(factory: Union[str, Callable, EntryPoint]):
+    if isinstance(factory, EntryPoint):
+        factory = factory.load()
+    elif isinstance(factory, str):
+        module_name, attribute = factory.split(":")
+        factory = getattr(importlib.import_module(module_name), attribute)
+    return factory()
+
+registry = ProviderRegistry(BUILTIN_PROVIDERS)
+
+def _options(method: Callable, **options) -> Dict:
+    # generation options are passed only to adapters that take them, so older third-party adapters keep working
+    parameters = inspect.signature(method).parameters
+    return {name: value for name, value in options.items() if value is not None and name in parameters}
 
 class LLMProvider:
-    def __init__(self, llm: str):
+    """Answers prompts with the shared adapter of the provider each call names."""
+
+    def __init__(self, llm: Optional[str] = None):
         self.providers: Dict[str, Union["LLMProvider", None]] = {}
-        self.providers[llm.lower()] = self._initialize_provider(llm.lower())
-
-    def _initialize_provider(self, llm: str) -> Union["LLMProvider", None] :
-        provider_name = llm.lower()
-        if provider_name == "anthropic":
-            return anthropic_genai.AnthropicClaude()
-        elif provider_name == "google":
-            return google_genai.GoogleGenerativeAI()
-        elif provider_name == "ibm":
-            return watsonx_genai.WatsonxGenerativeAI()
-        else:
-            raise ValueError(f"Unsupported provider: {llm}")
+        if llm:
+            # fail early on an unknown provider, as callers expect
+            self.get_provider(llm)
 
     def get_provider(self, provider_name: str) -> Union["LLMProvider", None] :
-        provider = self.providers[provider_name.lower()]
-        if not provider:
-            raise ValueError(f"Invalid provider: {provider_name}")
+        provider = self.providers.get(provider_name.lower())
+        if provider is None:
+            provider = self.providers[provider_name.lower()] = registry.get(provider_name)
         return provider
 
-    def generate_answer(self, prompt: str, provider_name: str, model: str) -> str:
+    def generate_answer(self, prompt: str, provider_name: str, model: str, max_tokens: Optional[int] = None,
+                        stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> str:
         provider = self.get_provider(provider_name)
         if provider :
-            return provider.generate_answer(prompt, model)
+            return provider.generate_answer(prompt, model, **_options(provider.generate_answer, max_tokens=max_tokens,
+                                                                      stop=stop, decoding=decoding))
         raise ValueError(f"Invalid provider: {provider_name}")
-        
+
+    async def agenerate_answer(self, prompt: str, provider_name: str, model: str, max_tokens: Optional[int] = None,
+                               stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> Dict:
+        """
+        Generate an answer without blocking the event loop, timing the first token and the whole answer.
+
+        Adapters that cannot stream are run on a worker thread, and only their total latency
+        is known. `max_tokens` and `stop`, e.g. from prompts.generation_limits, and `decoding`,
+        sampling parameters such as {"temperature": 0.7, "top_p": 1, "top_k": 50}, are
+        ignored by adapters that do not take them.
+
+        Returns:
+            dict: The generate_answer result plus "time_to_first_token" and "latency" in seconds.
+        """
+        provider = self.get_provider(provider_name)
+        if hasattr(provider, "agenerate_answer"):
+            return await provider.agenerate_answer(prompt, model, **_options(
+                provider.agenerate_answer, max_tokens=max_tokens, stop=stop, decoding=decoding))
+        start = time.perf_counter()
+        result = await asyncio.to_thread(provider.generate_answer, prompt, model, **_options(
+            provider.generate_answer, max_tokens=max_tokens, stop=stop, decoding=decoding))
+        return {**result, "time_to_first_token": None, "latency": time.perf_counter() - start}
+
+    def astream_answer(self, prompt: str, provider_name: str, model: str, max_tokens: Optional[int] = None,
+                       stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Stream an answer as {"text": ...} events followed by its token counts.
+
+        Adapters that cannot stream are run on a worker thread, and their whole answer
+        arrives as a single event.
+        """
+        provider = self.get_provider(provider_name)
+        if hasattr(provider, "astream_answer"):
+            return provider.astream_answer(prompt, model, **_options(provider.astream_answer, max_tokens=max_tokens,
+                                                                     stop=stop, decoding=decoding))
+        options = _options(provider.generate_answer, max_tokens=max_tokens, stop=stop, decoding=decoding)
+
+        def answer_events():
+            result = provider.generate_answer(prompt, model, **options)
+            yield {"text": result["answer"]}
+            yield {"generated_token_count": result.get("generated_token_count"),
+                   "input_token_count": result.get("input_token_count")}
+        return iterate_in_thread(answer_events)
     
 if __name__ == "__main__":
 # Example usage
@@ -40,8 +196,9 @@ if __name__ == "__main__":
                 {'provider': 'IBM', 'model': 'meta-llama/llama-2-70b'},
                 {'provider': 'IBM', 'model': 'ibm/granite-13b-instruct-v2'}
             ]
+    # one LLMProvider serves every provider; the two IBM models share one client
+    llm_provider = LLMProvider()
     for llm in llms:
-        llm_provider = LLMProvider(llm['provider'])
         print(llm_provider.generate_answer("Who killed Jessica Rabbit?", llm['provider'], llm['model']))
         print("\n")
     
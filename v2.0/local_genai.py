@@ -0,0 +1,214 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from prompts import cut_at_stop
+from streaming import collect_stream
+
+load_dotenv()
+
+# (answer, generated token count, input token count) for one prompt
+Completion = Tuple[str, int, int]
+
+class TransformersBackend:
+    """
+    A Hugging Face model on CPU, e.g. google/flan-t5-small; encoder-decoder and causal models both work.
+
+    Decoding is greedy, so the same prompt always gets the same answer.
+    """
+
+    def __init__(self, model_name: str, threads: int = 0):
+        import torch
+        from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.seq2seq = AutoConfig.from_pretrained(model_name).is_encoder_decoder
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if not self.seq2seq:
+            # a decoder-only model continues each prompt, so prompts of a batch must end in the same column
+            self.tokenizer.padding_side = "left"
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+        model_class = AutoModelForSeq2SeqLM if self.seq2seq else AutoModelForCausalLM
+        self.model = model_class.from_pretrained(model_name).eval()
+        self.special_ids = set(self.tokenizer.all_special_ids)
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[Completion]:
+        """Answer a batch of prompts in one padded generate call."""
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True)
+        with self.torch.inference_mode():
+            outputs = self.model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                          pad_token_id=self.tokenizer.pad_token_id)
+        if not self.seq2seq:
+            # causal models return the prompt followed by the answer
+            outputs = outputs[:, inputs["input_ids"].shape[1]:]
+        completions = []
+        for output, input_count in zip(outputs.tolist(), inputs["attention_mask"].sum(dim=1).tolist()):
+            # padding, the decoder start token and the end-of-sequence token are not part of the answer
+            tokens = [token for token in output if token not in self.special_ids]
+            completions.append((self.tokenizer.decode(tokens).strip(), len(tokens), int(input_count)))
+        return completions
+
+class LlamaCppBackend:
+    """A GGUF model file run with llama.cpp."""
+
+    def __init__(self, model_path: str, threads: int = 0):
+        from llama_cpp import Llama
+
+        self.llm = Llama(model_path=model_path, n_ctx=2048, n_threads=threads or None, verbose=False)
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[Completion]:
+        # llama-cpp-python completes one prompt per call; the batch still shares the loaded model
+        completions = []
+        for prompt in prompts:
+            completion = self.llm.create_completion(prompt, max_tokens=max_new_tokens, temperature=0)
+            usage = completion["usage"]
+            completions.append((completion["choices"][0]["text"].strip(), usage["completion_tokens"],
+                                usage["prompt_tokens"]))
+        return completions
+
+class BatchRunner:
+    """
+    Runs one model's prompts in batches on a dedicated thread.
+
+    Prompts submitted from any thread or event loop queue up while a batch is being
+    generated, and the next batch takes up to `max_batch` of them at once. A batch is
+    only held back for `max_wait` seconds to let more prompts arrive. A batch generates
+    up to the largest token limit of its prompts.
+    """
+
+    def __init__(self, load_backend: Callable[[], object], max_batch: int, max_wait: float):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self._queue: "queue.Queue[Tuple[str, int, Future]]" = queue.Queue()
+        # the model loads on the runner's thread, so the first caller's event loop is not blocked
+        threading.Thread(target=self._run, args=(load_backend,), daemon=True).start()
+
+    def submit(self, prompt: str, max_new_tokens: int) -> Future:
+        """Queue a prompt; the Future resolves to its (answer, generated tokens, input tokens)."""
+        future: Future = Future()
+        self._queue.put((prompt, max_new_tokens, future))
+        return future
+
+    def _next_batch(self) -> List[Tuple[str, int, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        # cancelled requests, e.g. of a stopped job, are dropped before any work is done for them
+        return [(prompt, max_new_tokens, future) for prompt, max_new_tokens, future in batch
+                if future.set_running_or_notify_cancel()]
+
+    def _run(self, load_backend: Callable[[], object]):
+        try:
+            backend = load_backend()
+        except Exception as e:
+            while True:
+                for _, _, future in self._next_batch():
+                    future.set_exception(e)
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                completions = backend.generate([prompt for prompt, _, _ in batch],
+                                               max(max_new_tokens for _, max_new_tokens, _ in batch))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            for (_, _, future), completion in zip(batch, completions):
+                future.set_result(completion)
+
+class LocalGenerativeAI:
+    """
+    Plays Jeopardy with a small open model on this machine, with no API latency or cost.
+
+    Model names ending in ".gguf" are paths to llama.cpp models; any other name is a
+    Hugging Face model id. Each model is loaded once per process, and the prompts that
+    are in flight at the same time are answered together in batched forward passes.
+    Token counts come from the model's own tokenizer. LOCAL_MAX_NEW_TOKENS caps every
+    answer's length; stop sequences are applied to the decoded answer.
+    """
+
+    def __init__(self):
+        self.max_batch = int(os.environ.get("LOCAL_MAX_BATCH") or 16)
+        self.max_new_tokens = int(os.environ.get("LOCAL_MAX_NEW_TOKENS") or 64)
+        self.batch_wait = float(os.environ.get("LOCAL_BATCH_WAIT_MS") or 5) / 1000
+        # 0 leaves the thread count to the backend
+        self.threads = int(os.environ.get("LOCAL_THREADS") or 0)
+        self._runners: Dict[str, BatchRunner] = {}
+        self._lock = threading.Lock()
+
+    def _load_backend(self, model_name: str):
+        if model_name.endswith(".gguf"):
+            return LlamaCppBackend(model_name, self.threads)
+        return TransformersBackend(model_name, self.threads)
+
+    def _runner(self, model_name: str) -> BatchRunner:
+        with self._lock:
+            if model_name not in self._runners:
+                self._runners[model_name] = BatchRunner(lambda: self._load_backend(model_name), self.max_batch,
+                                                        self.batch_wait)
+            return self._runners[model_name]
+
+    def _submit(self, prompt: str, model_name: str, max_tokens: Optional[int]) -> Future:
+        return self._runner(model_name).submit(prompt, min(max_tokens or self.max_new_tokens, self.max_new_tokens))
+
+    def _result(self, prompt: str, model_name: str, completion: Completion,
+                stop: Optional[List[str]]) -> Dict[str, str | int]:
+        answer, generated_token_count, input_token_count = completion
+        return {
+            "llm": f"local/{model_name}",
+            "prompt": prompt,
+            "answer": cut_at_stop(answer, stop),
+            "generated_token_count": generated_token_count,
+            "input_token_count": input_token_count,
+        }
+
+    def generate_answer(self, prompt: str, model_name: str = "google/flan-t5-small", max_tokens: Optional[int] = None,
+                        stop: Optional[List[str]] = None) -> Dict[str, str | int]:
+        """
+        Answer a prompt with a local model, batched with any other prompts in flight.
+
+        Returns:
+            dict: llm (prefixed with "local/"), prompt, answer, generated_token_count and input_token_count.
+        """
+        return self._result(prompt, model_name, self._submit(prompt, model_name, max_tokens).result(), stop)
+
+    async def astream_answer(self, prompt: str, model_name: str = "google/flan-t5-small",
+                             max_tokens: Optional[int] = None, stop: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """
+        Yield the answer as one {"text": ...} event, then its token counts.
+
+        Batched generation finishes every answer of a batch at once, so there is nothing to
+        stream earlier; the time to first token is the batch's latency.
+        """
+        answer, generated_token_count, input_token_count = \
+            await asyncio.wrap_future(self._submit(prompt, model_name, max_tokens))
+        yield {"text": cut_at_stop(answer, stop)}
+        yield {"generated_token_count": generated_token_count, "input_token_count": input_token_count}
+
+    async def agenerate_answer(self, prompt: str, model_name: str = "google/flan-t5-small",
+                               max_tokens: Optional[int] = None, stop: Optional[List[str]] = None) -> Dict:
+        """Like generate_answer, but awaitable; the result also has "time_to_first_token" and "latency"."""
+        return await collect_stream(self.astream_answer(prompt, model_name, max_tokens, stop), f"local/{model_name}",
+                                    prompt)
+
+# Example usage
+if __name__ == "__main__":
+    local_ai = LocalGenerativeAI()
+    print(local_ai.generate_answer("Who killed Jessica Rabbit?", "google/flan-t5-small"))
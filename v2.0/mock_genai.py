@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from prompts import cut_at_stop
+from streaming import collect_stream
+
+# Answers are built from these words, picked by a hash of the model and prompt
+ANSWER_WORDS = ["Paris", "Lincoln", "the Nile", "Mozart", "photosynthesis", "Everest", "Shakespeare", "Mars",
+                "the Alamo", "Einstein", "Beethoven", "Tokyo", "the Titanic", "Cleopatra", "Darwin", "Jupiter",
+                "Napoleon", "Picasso", "the Amazon", "Newton", "Venus", "Rome", "Sahara", "Odysseus"]
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+class MockProviderError(Exception):
+    """A simulated API failure; `status_code` mirrors the status the SDKs' API errors carry."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+class MockRateLimitError(MockProviderError):
+    def __init__(self, message: str):
+        super().__init__(message, status_code=429)
+
+@dataclass
+class MockConfig:
+    """
+    How a mock backend behaves. Every field can be set from the environment, see from_env.
+
+    Latencies are drawn around `latency_ms`: "fixed" always takes it, "uniform" takes
+    latency_ms * (1 +/- latency_spread), "exponential" uses it as the mean, and "lognormal"
+    as the median with `latency_spread` as sigma, which gives the long tail real APIs have.
+    """
+    latency_ms: float = 0.0
+    latency_distribution: str = "lognormal"
+    latency_spread: float = 0.5
+    # share of a streamed answer's latency spent before its first token
+    ttft_fraction: float = 0.3
+    # chance that a call fails with a server error, and with a 429 rate limit
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    min_output_tokens: int = 5
+    max_output_tokens: int = 40
+    # share of answers phrased as a question, as Jeopardy requires
+    question_rate: float = 0.8
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {self.latency_distribution}; "
+                             f"expected one of {list(LATENCY_DISTRIBUTIONS)}")
+
+    @classmethod
+    def from_env(cls, prefix: str = "MOCK_") -> "MockConfig":
+        """Read each field from an environment variable named `prefix` + the field name in capitals."""
+        values = {}
+        for field in fields(cls):
+            value = os.environ.get(prefix + field.name.upper())
+            if value:
+                values[field.name] = type(field.default)(value)
+        return cls(**values)
+
+def stable_hash(*parts) -> int:
+    """A hash that, unlike hash(), is the same in every process and run."""
+    return int.from_bytes(hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).digest()[:8], "big")
+
+class MockBehaviour:
+    """Draws latencies and failures for a mock backend; calls may come from many threads."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        # one seeded sequence per backend, so a run with the same calls in the same order repeats exactly
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def plan(self) -> Tuple[float, Optional[MockProviderError]]:
+        """
+        Decide how one call goes.
+
+        Returns:
+            Tuple[float, Optional[MockProviderError]]: Seconds the call takes, and the error it
+            ends with, if any. Rate limits are meant to be raised at once, before any latency.
+        """
+        config = self.config
+        with self._lock:
+            roll = self._rng.random()
+            median = config.latency_ms / 1000
+            if median <= 0 or config.latency_distribution == "fixed":
+                latency = max(median, 0.0)
+            elif config.latency_distribution == "uniform":
+                latency = median * (1 + self._rng.uniform(-config.latency_spread, config.latency_spread))
+            elif config.latency_distribution == "exponential":
+                latency = self._rng.expovariate(1 / median)
+            else:
+                latency = self._rng.lognormvariate(math.log(median), config.latency_spread)
+        if roll < config.rate_limit_rate:
+            return 0.0, MockRateLimitError("Mock rate limit exceeded")
+        if roll < config.rate_limit_rate + config.error_rate:
+            return max(latency, 0.0), MockProviderError("Mock server error")
+        return max(latency, 0.0), None
+
+class MockGenerativeAI:
+    """
+    Offline stand-in for the provider adapters, for tests and load runs without credentials.
+
+    The same model and prompt always get the same answer and token counts, unless a
+    positive temperature is asked for; latency,
+    failures and rate limits follow a MockConfig, read from MOCK_* environment variables
+    unless one is given.
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None):
+        self.config = config or MockConfig.from_env()
+        self.behaviour = MockBehaviour(self.config)
+
+    def _answer_tokens(self, prompt: str, model_name: str, max_tokens: Optional[int] = None,
+                       stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> List[str]:
+        # like a real model, a positive temperature samples a different answer on every call
+        sampled = (decoding or {}).get("temperature", 0) > 0
+        rng = random.Random() if sampled else random.Random(stable_hash(model_name, prompt))
+        token_count = rng.randint(self.config.min_output_tokens, max(self.config.max_output_tokens,
+                                                                     self.config.min_output_tokens))
+        words = [rng.choice(ANSWER_WORDS) for _ in range(max(token_count - 2, 1))]
+        if rng.random() < self.config.question_rate:
+            tokens = ["What", "is"] + words
+            tokens[-1] += "?"
+        else:
+            tokens = words
+            tokens[-1] += "."
+        tokens = [token + " " for token in tokens[:-1]] + tokens[-1:]
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        # generation ends at a stop sequence, which is not part of the answer
+        answer = cut_at_stop("".join(tokens), stop)
+        kept, length = [], 0
+        for token in tokens:
+            if length >= len(answer):
+                break
+            kept.append(token[:len(answer) - length])
+            length += len(token)
+        return kept
+
+    def generate_answer(self, prompt: str, model_name: str = "mock-model", max_tokens: Optional[int] = None,
+                        stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> Dict[str, str | int]:
+        """
+        Answer a prompt the way the real adapters do, after the configured latency.
+
+        Raises:
+            MockProviderError: For the configured share of calls; MockRateLimitError (429) for rate limits.
+        """
+        latency, error = self.behaviour.plan()
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        tokens = self._answer_tokens(prompt, model_name, max_tokens, stop, decoding)
+        return {
+            "llm": f"mock/{model_name}",
+            "prompt": prompt,
+            "answer": "".join(tokens),
+            "generated_token_count": len(tokens),
+            "input_token_count": len(prompt.split()),
+        }
+
+    async def astream_answer(self, prompt: str, model_name: str = "mock-model", max_tokens: Optional[int] = None,
+                             stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Stream the answer a token at a time: the first after `ttft_fraction` of the latency,
+        the rest evenly over the remainder.
+        """
+        latency, error = self.behaviour.plan()
+        tokens = self._answer_tokens(prompt, model_name, max_tokens, stop, decoding)
+        await asyncio.sleep(latency * self.config.ttft_fraction)
+        if error is not None:
+            raise error
+        token_gap = latency * (1 - self.config.ttft_fraction) / max(len(tokens), 1)
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(token_gap)
+            yield {"text": token}
+        yield {"generated_token_count": len(tokens), "input_token_count": len(prompt.split())}
+
+    async def agenerate_answer(self, prompt: str, model_name: str = "mock-model", max_tokens: Optional[int] = None,
+                               stop: Optional[List[str]] = None, decoding: Optional[Dict] = None) -> Dict:
+        """Like generate_answer, but streamed; the result also has "time_to_first_token" and "latency"."""
+        return await collect_stream(self.astream_answer(prompt, model_name, max_tokens, stop, decoding),
+                                    f"mock/{model_name}", prompt)
+
+# Example usage
+if __name__ == "__main__":
+    mock_ai = MockGenerativeAI(MockConfig(latency_ms=200))
+    print(mock_ai.generate_answer("Who killed Jessica Rabbit?", "mock-model"))
+    print(asyncio.run(mock_ai.agenerate_answer("Who killed Jessica Rabbit?", "mock-model")))
@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+from sqlalchemy import text
+
+from db_operations import CRITERIA, JeopardyDB
+
+# Manifest written next to the Parquet files. Files starting with "_" are skipped by dataset discovery.
+MANIFEST_FILE = "_snapshot.json"
+
+# Rows fetched from SQLite and written per record batch
+EXPORT_BATCH_SIZE = 50000
+
+PARTITION_SCHEMA = pa.schema([
+    ("test_run_id", pa.int32()),
+    ("llm_id", pa.int32()),
+])
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("rating_id", pa.int64()),
+    ("llm_response_id", pa.int64()),
+    ("question_id", pa.int64()),
+    ("test_run_id", pa.int32()),
+    ("llm_id", pa.int32()),
+    ("llm_name", pa.string()),
+    ("judge_model", pa.string()),
+    ("category", pa.string()),
+    ("round", pa.string()),
+    ("value", pa.string()),
+    ("air_date", pa.string()),
+    ("response", pa.string()),
+    ("accuracy", pa.float64()),
+    ("coherence", pa.float64()),
+    ("completion", pa.float64()),
+    ("question_structure", pa.float64()),
+    ("generated_tokens", pa.int32()),
+    ("input_token_count", pa.int32()),
+    ("judge_generated_tokens", pa.int32()),
+    ("judge_input_token_count", pa.int32()),
+])
+
+EXPORT_QUERY = """
+    SELECT
+        llm_judge_ratings.id AS rating_id,
+        llm_responses.id AS llm_response_id,
+        llm_responses.question_id,
+        llm_judge_ratings.test_run_id,
+        llm_responses.llm_id,
+        llms.name AS llm_name,
+        llm_judge_ratings.judge_model,
+        questions.category,
+        questions.round,
+        questions.value,
+        questions.air_date,
+        llm_responses.response,
+        llm_judge_ratings.accuracy,
+        llm_judge_ratings.coherence,
+        llm_judge_ratings.completion,
+        llm_judge_ratings.question_structure,
+        llm_responses.generated_tokens,
+        llm_responses.input_token_count,
+        llm_judge_ratings.generated_tokens AS judge_generated_tokens,
+        llm_judge_ratings.input_token_count AS judge_input_token_count
+    FROM llm_judge_ratings
+    JOIN llm_responses ON llm_responses.id = llm_judge_ratings.llm_response_id
+    JOIN llms ON llms.id = llm_responses.llm_id
+    JOIN questions ON questions.id = llm_responses.question_id
+    WHERE llm_judge_ratings.id > :after_id
+      AND (:test_run_id IS NULL OR llm_judge_ratings.test_run_id = :test_run_id)
+    ORDER BY llm_judge_ratings.id
+"""
+
+def _read_manifest(out_dir: str) -> Optional[Dict]:
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as file:
+        return json.load(file)
+
+def _write_manifest(out_dir: str, manifest: Dict):
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def _clear_snapshot(out_dir: str):
+    # only the partition directories this module writes are removed, and any other files are left alone
+    for entry in os.listdir(out_dir):
+        path = os.path.join(out_dir, entry)
+        if entry.startswith(f"{PARTITION_SCHEMA.names[0]}=") and os.path.isdir(path):
+            shutil.rmtree(path)
+
+def _record_batches(db: JeopardyDB, after_id: int, test_run_id: Optional[int],
+                    stats: Dict) -> Iterator[pa.RecordBatch]:
+    """Stream the export query out of SQLite as Arrow record batches."""
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True) \
+            .execute(text(EXPORT_QUERY), {"after_id": after_id, "test_run_id": test_run_id})
+        for rows in result.partitions(EXPORT_BATCH_SIZE):
+            columns = list(zip(*rows))
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, SNAPSHOT_SCHEMA)],
+                schema=SNAPSHOT_SCHEMA)
+            stats["rows"] += batch.num_rows
+            stats["last_rating_id"] = rows[-1].rating_id
+            yield batch
+
+def export_snapshot(db_file: str, out_dir: str, test_run_id: Optional[int] = None,
+                    incremental: bool = False) -> Dict:
+    """
+    Export judge ratings joined with their responses, LLMs and questions to Parquet.
+
+    Files are partitioned hive-style by test_run_id and llm_id. With `incremental`, only
+    ratings newer than the last snapshot written to `out_dir` are exported, as new files
+    alongside the existing ones. Otherwise every partition already in `out_dir`, of any
+    test run, is removed first, so readers never mix a previous export with this one.
+
+    Args:
+        db_file (str): Path to the database file.
+        out_dir (str): Directory for the Parquet dataset and its manifest.
+        test_run_id (Optional[int]): Export only this test run; all runs when None.
+        incremental (bool): Export only ratings added since the previous snapshot.
+
+    Returns:
+        dict: The manifest entry describing this snapshot.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir) if incremental else None
+    if manifest is not None and manifest["test_run_id"] != test_run_id:
+        raise ValueError(f"{out_dir} holds a snapshot of test run {manifest['test_run_id']}, not {test_run_id}")
+    # opened before clearing, so a mistyped db_file leaves the previous snapshot in place
+    db = JeopardyDB(db_file, read_only=True)
+    if manifest is None:
+        manifest = {"test_run_id": test_run_id, "last_rating_id": 0, "snapshots": []}
+        _clear_snapshot(out_dir)
+
+    snapshot_id = len(manifest["snapshots"])
+    stats = {"rows": 0, "last_rating_id": manifest["last_rating_id"]}
+    try:
+        ds.write_dataset(
+            _record_batches(db, manifest["last_rating_id"], test_run_id, stats),
+            out_dir,
+            schema=SNAPSHOT_SCHEMA,
+            format="parquet",
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+            basename_template=f"part-{snapshot_id:05d}-{{i}}.parquet",
+            # earlier snapshots are left in place; this one only adds files
+            existing_data_behavior="overwrite_or_ignore" if incremental else "delete_matching",
+        )
+    finally:
+        db.close()
+
+    snapshot = {
+        "id": snapshot_id,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "from_rating_id": manifest["last_rating_id"],
+        "to_rating_id": stats["last_rating_id"],
+        "rows": stats["rows"],
+    }
+    manifest["snapshots"].append(snapshot)
+    manifest["last_rating_id"] = stats["last_rating_id"]
+    _write_manifest(out_dir, manifest)
+    return snapshot
+
+class SnapshotReader:
+    """
+    Read a Parquet snapshot written by export_snapshot without touching SQLite.
+
+    Files are memory-mapped and filtered on the test_run_id/llm_id partitions, so only
+    the fragments and columns a comparison needs are read.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = snapshot_dir
+        self.dataset = ds.dataset(snapshot_dir, format="parquet",
+                                  partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+                                  filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True))
+
+    def table(self, test_run_id: Optional[int] = None, llm_id: Optional[int] = None,
+              judge_model: Optional[str] = None, columns: Optional[List[str]] = None) -> pa.Table:
+        """
+        Load the matching ratings as an Arrow table.
+
+        Args:
+            test_run_id (Optional[int]): Only ratings from this test run.
+            llm_id (Optional[int]): Only ratings of this LLM's responses.
+            judge_model (Optional[str]): Only ratings by this judge.
+            columns (Optional[List[str]]): Columns to read; all when None.
+        """
+        conditions = []
+        if test_run_id is not None:
+            conditions.append(ds.field("test_run_id") == test_run_id)
+        if llm_id is not None:
+            conditions.append(ds.field("llm_id") == llm_id)
+        if judge_model is not None:
+            conditions.append(ds.field("judge_model") == judge_model)
+        condition = None
+        for expression in conditions:
+            condition = expression if condition is None else condition & expression
+        return self.dataset.to_table(columns=columns, filter=condition)
+
+    def model_scores(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None) -> pa.Table:
+        """
+        Mean score per criterion and mean token counts for every LLM.
+
+        Returns:
+            pa.Table: One row per LLM with `<criterion>_mean`, token means and `rating_id_count`.
+        """
+        table = self.table(test_run_id=test_run_id, judge_model=judge_model,
+                           columns=["llm_id", "llm_name", "rating_id", *CRITERIA,
+                                    "generated_tokens", "input_token_count", "judge_input_token_count"])
+        aggregations = [("rating_id", "count")] + [(column, "mean") for column in CRITERIA] + \
+                       [(column, "mean") for column in ["generated_tokens", "input_token_count", "judge_input_token_count"]]
+        return table.group_by(["llm_id", "llm_name"]).aggregate(aggregations).sort_by("llm_id")
+
+    def compare(self, llm_a: int, llm_b: int, metric: str = "accuracy", test_run_id: Optional[int] = None,
+                judge_model: Optional[str] = None) -> Dict[str, float]:
+        """
+        Compare two LLMs on the questions both of them answered.
+
+        Scores are first averaged per question, then the two models are joined on
+        question_id and compared element-wise.
+
+        Returns:
+            dict: Shared question count, both means, the mean difference (a - b) and win/tie counts.
+        """
+        per_model = []
+        for llm_id, suffix in ((llm_a, "a"), (llm_b, "b")):
+            scores = self.table(test_run_id=test_run_id, llm_id=llm_id, judge_model=judge_model,
+                                columns=["question_id", metric])
+            per_model.append(scores.group_by("question_id").aggregate([(metric, "mean")])
+                             .rename_columns(["question_id", suffix]))
+        joined = per_model[0].join(per_model[1], "question_id", join_type="inner")
+        if joined.num_rows == 0:
+            return {"shared_questions": 0}
+        difference = pc.subtract(joined["a"], joined["b"])
+        return {
+            "shared_questions": joined.num_rows,
+            "mean_a": pc.mean(joined["a"]).as_py(),
+            "mean_b": pc.mean(joined["b"]).as_py(),
+            "mean_difference": pc.mean(difference).as_py(),
+            "wins_a": pc.sum(pc.greater(difference, 0)).as_py(),
+            "wins_b": pc.sum(pc.less(difference, 0)).as_py(),
+            "ties": pc.sum(pc.equal(difference, 0)).as_py(),
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export judge ratings to a partitioned Parquet snapshot.")
+    parser.add_argument(
+        "--db_file", type=str,
+        default="outs/jeopardy.db",
+        help="Path to the database file.")
+    parser.add_argument(
+        "--out_dir", type=str,
+        default="output/snapshot",
+        help="Directory to write the Parquet dataset to.")
+    parser.add_argument(
+        "--test_run_id", type=int,
+        default=None,
+        help="Export only this test run (default: all runs).")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Export only ratings added since the last snapshot in out_dir.")
+    args = parser.parse_args()
+    try:
+        print(export_snapshot(args.db_file, args.out_dir, args.test_run_id, args.incremental))
+    except FileNotFoundError as e:
+        parser.error(str(e))
@@ -1,22 +1,49 @@
+from typing import Dict, List, Optional
+
+# Every template has a user and a system prompt, and optionally output limits: "max_tokens"
+# and "stop" sequences, passed to the provider or judge that renders it.
 PROMPTS = {
     "accuracy": {
         "user": "Prompt sent to the AI Assistant: {}\\n Answer from the AI Assistant: {}\\n Your rating: ",
-        "system": "Please act as an impartial judge and evaluate the accuracy of the response provided by an AI assistant to the user for playing the game of Jeopardy. Respond only with a rating between 0 and 1."
+        "system": "Please act as an impartial judge and evaluate the accuracy of the response provided by an AI assistant to the user for playing the game of Jeopardy. Respond only with a rating between 0 and 1.",
+        "max_tokens": 7
     },
     "coherence": {
         "user": "Please act as an impartial judge and determine if the response provided by an AI assistant to the user was clear or understandable. Response from the AI Assistant: {}",
-        "system": "Evaluate the coherence of the response provided by an AI assistant. Respond only with a rating between 0 and 1."
+        "system": "Evaluate the coherence of the response provided by an AI assistant. Respond only with a rating between 0 and 1.",
+        "max_tokens": 7
     },
     "completeness": {
         "user": "Evaluate the completeness of the answer '{}' to the question '{}' on a scale of 0 to 1, where 1 is highly complete and 0 is not complete at all.",
-        "system": "Please act as an impartial judge and evaluate the completeness of the response provided by an AI assistant to the user for playing the game of Jeopardy. Respond only with a rating between 0 and 1."
+        "system": "Please act as an impartial judge and evaluate the completeness of the response provided by an AI assistant to the user for playing the game of Jeopardy. Respond only with a rating between 0 and 1.",
+        "max_tokens": 7
     },
     "is_question": {
         "user": "Determine if the following text is a question (1) or not a question (0): {}",
-        "system": "Please act as an impartial judge and determine if the response provided by an AI assistant to the user for playing the game of Jeopardy is a question (1) or not a question (0)."
+        "system": "Please act as an impartial judge and determine if the response provided by an AI assistant to the user for playing the game of Jeopardy is a question (1) or not a question (0).",
+        "max_tokens": 7
     },
     "play": {
         "user": "You are playing the game of Jeopardy. You will be given a category and a statement. Using the information provided, you must respond with a question. Category: '{}'. Here's your statement: '{}'.",
-        "system" : ""
+        "system" : "",
+        # a Jeopardy response is a single question; anything after a blank line is commentary
+        "max_tokens": 64,
+        "stop": ["\n\n"]
     }
-}
\ No newline at end of file
+}
+
+def generation_limits(template: str) -> Dict[str, Optional[int | List[str]]]:
+    """
+    Output limits of a template, as the max_tokens and stop keyword arguments of LLMProvider calls.
+    """
+    return {"max_tokens": PROMPTS[template].get("max_tokens"), "stop": PROMPTS[template].get("stop")}
+
+def cut_at_stop(text: str, stop: Optional[List[str]]) -> str:
+    """
+    The text up to the first stop sequence, for backends that cannot stop generation themselves.
+    """
+    for sequence in stop or []:
+        index = text.find(sequence)
+        if index != -1:
+            text = text[:index]
+    return text
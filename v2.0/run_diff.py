@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dashboard_cache import WatermarkCache
+from db_operations import CRITERIA, JeopardyDB
+
+@dataclass
+class LLMShift:
+    """How one LLM's scores moved between two test runs, over the questions rated in both."""
+    llm_id: int
+    llm_name: str
+    shared_questions: int
+    base_only: int
+    compare_only: int
+    base_mean: Optional[float]
+    compare_mean: Optional[float]
+    mean_delta: Optional[float]
+    regressions: int
+    improvements: int
+
+@dataclass
+class QuestionDelta:
+    question_id: int
+    llm_id: int
+    llm_name: str
+    base: float
+    compare: float
+    delta: float
+
+@dataclass
+class RunDiff:
+    """
+    Per-question scores of two test runs, paired by (question, LLM).
+
+    Built once from JeopardyDB.diff_test_runs; every summary and ranking is computed from
+    these arrays with NumPy, so changing the criterion or threshold does not query again.
+    """
+    base_run_id: int
+    compare_run_id: int
+    judge_model: Optional[str]
+    question_ids: np.ndarray
+    llm_ids: np.ndarray
+    base: Dict[str, np.ndarray]
+    compare: Dict[str, np.ndarray]
+    llm_names: Dict[int, str]
+    # LLM id -> pairs rated in only one of the runs
+    base_only: Dict[int, int]
+    compare_only: Dict[int, int]
+
+    @classmethod
+    def from_rows(cls, base_run_id: int, compare_run_id: int, judge_model: Optional[str], rows: Sequence,
+                  llm_names: Dict[int, str]) -> "RunDiff":
+        """
+        Args:
+            rows (Sequence): Rows from JeopardyDB.diff_test_runs.
+            llm_names (Dict[int, str]): LLM names by id.
+        """
+        columns = [np.array(column, dtype=float) for column in zip(*rows)] if rows else \
+            [np.empty(0) for _ in range(4 + 2 * len(CRITERIA))]
+        question_ids, llm_ids, base_ratings, compare_ratings, *scores = columns
+        llm_ids = llm_ids.astype(np.int64)
+        shared = (base_ratings > 0) & (compare_ratings > 0)
+
+        def one_sided(mask: np.ndarray) -> Dict[int, int]:
+            present, counts = np.unique(llm_ids[mask], return_counts=True)
+            return {int(llm_id): int(count) for llm_id, count in zip(present, counts)}
+
+        return cls(base_run_id=base_run_id, compare_run_id=compare_run_id, judge_model=judge_model,
+                   question_ids=question_ids[shared].astype(np.int64), llm_ids=llm_ids[shared],
+                   base={criterion: scores[2 * i][shared] for i, criterion in enumerate(CRITERIA)},
+                   compare={criterion: scores[2 * i + 1][shared] for i, criterion in enumerate(CRITERIA)},
+                   llm_names=llm_names, base_only=one_sided(~shared & (base_ratings > 0)),
+                   compare_only=one_sided(~shared & (compare_ratings > 0)))
+
+    def deltas(self, criterion: str) -> np.ndarray:
+        """Compare minus base score per pair; NaN where either side is unscored."""
+        if criterion not in CRITERIA:
+            raise ValueError(f"Unknown criterion {criterion}; expected one of {list(CRITERIA)}")
+        return self.compare[criterion] - self.base[criterion]
+
+    def shifts(self, criterion: str = "accuracy", threshold: float = 0.25) -> List[LLMShift]:
+        """
+        Aggregate shift of every LLM rated in either run.
+
+        Args:
+            criterion (str): One of CRITERIA.
+            threshold (float): A pair is a regression when its score drops by more than this,
+                and an improvement when it rises by more than this.
+        """
+        deltas = self.deltas(criterion)
+        llm_ids = sorted(set(np.unique(self.llm_ids).tolist()) | set(self.base_only) | set(self.compare_only))
+        codes = np.searchsorted(llm_ids, self.llm_ids)
+        scored = ~np.isnan(deltas)
+
+        def total(weights: np.ndarray) -> np.ndarray:
+            return np.bincount(codes[scored], weights=weights[scored], minlength=len(llm_ids))
+
+        shared = np.bincount(codes, minlength=len(llm_ids))
+        scored_counts = total(np.ones(len(deltas)))
+        base_sums, compare_sums = total(self.base[criterion]), total(self.compare[criterion])
+        regressions = total((deltas < -threshold).astype(float))
+        improvements = total((deltas > threshold).astype(float))
+
+        shifts = []
+        for code, llm_id in enumerate(llm_ids):
+            count = scored_counts[code]
+            base_mean = float(base_sums[code] / count) if count else None
+            compare_mean = float(compare_sums[code] / count) if count else None
+            shifts.append(LLMShift(
+                llm_id=llm_id, llm_name=self.llm_names.get(llm_id, str(llm_id)),
+                shared_questions=int(shared[code]),
+                base_only=self.base_only.get(llm_id, 0), compare_only=self.compare_only.get(llm_id, 0),
+                base_mean=base_mean, compare_mean=compare_mean,
+                mean_delta=compare_mean - base_mean if count else None,
+                regressions=int(regressions[code]), improvements=int(improvements[code])))
+        return shifts
+
+    def changes(self, criterion: str = "accuracy", threshold: float = 0.25, limit: int = 50,
+                regressions: bool = True, llm_id: Optional[int] = None) -> List[QuestionDelta]:
+        """
+        The largest regressions (or improvements) beyond `threshold`, biggest change first.
+
+        Only the `limit` largest are sorted, so ranking a few hundred thousand pairs is cheap.
+        """
+        deltas = self.deltas(criterion)
+        signed = -deltas if regressions else deltas
+        candidates = np.nonzero(signed > threshold)[0]
+        if llm_id is not None:
+            candidates = candidates[self.llm_ids[candidates] == llm_id]
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-signed[candidates], limit - 1)[:limit]]
+        # ties are broken by question id, so the table is stable between refreshes
+        candidates = candidates[np.lexsort((self.question_ids[candidates], -signed[candidates]))]
+        return [QuestionDelta(question_id=int(self.question_ids[i]), llm_id=int(self.llm_ids[i]),
+                              llm_name=self.llm_names.get(int(self.llm_ids[i]), str(self.llm_ids[i])),
+                              base=float(self.base[criterion][i]), compare=float(self.compare[criterion][i]),
+                              delta=float(deltas[i]))
+                for i in candidates]
+
+class RunComparison:
+    """
+    Run-to-run diffs memoised per (base run, compare run, judge) until new ratings arrive.
+    """
+
+    def __init__(self, db: JeopardyDB):
+        self.db = db
+        self._cache = WatermarkCache(maxsize=8)
+
+    def diff(self, base_run_id: int, compare_run_id: int, judge_model: Optional[str] = None) -> RunDiff:
+        """
+        Get the diff between two test runs.
+
+        Args:
+            base_run_id (int): The run to compare against.
+            compare_run_id (int): The new run.
+            judge_model (Optional[str]): Only ratings by this judge; all judges when None.
+        """
+        with self.db.session_scope():
+            _, rating_watermark = self.db.get_watermarks()
+            self._cache.validate(rating_watermark)
+            key = (base_run_id, compare_run_id, judge_model, rating_watermark)
+            diff = self._cache.get(key)
+            if diff is None:
+                rows = self.db.diff_test_runs(base_run_id, compare_run_id, judge_model)
+                llm_names = {llm.id: llm.name for llm in self.db.get_all_llms()}
+                diff = RunDiff.from_rows(base_run_id, compare_run_id, judge_model, rows, llm_names)
+                self._cache.put(key, diff)
+        return diff
+
+    def answers(self, diff: RunDiff, changes: List[QuestionDelta]) -> Dict[Tuple[int, int, int], Tuple[str, str, str]]:
+        """
+        Look up the clue, the expected answer and the response of both runs for some changed pairs.
+
+        Returns:
+            Dict[Tuple[int, int, int], Tuple[str, str, str]]: (test_run_id, question_id, llm_id)
+            -> (clue, expected answer, response).
+        """
+        if not changes:
+            return {}
+        with self.db.session_scope():
+            rows = self.db.get_run_answers([diff.base_run_id, diff.compare_run_id],
+                                           sorted({change.question_id for change in changes}))
+        return {(row.test_run_id, row.question_id, row.llm_id): (row.question, row.answer, row.response)
+                for row in rows}
@@ -0,0 +1,231 @@
+import warnings
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dashboard_cache import WatermarkCache
+from db_operations import CRITERIA, JeopardyDB
+
+# Upper bound on resample weights held in memory at once (rows x questions)
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+@dataclass
+class ConfidenceInterval:
+    llm_id: int
+    llm_name: str
+    criterion: str
+    questions: int
+    mean: float
+    low: float
+    high: float
+
+@dataclass
+class PairedTest:
+    """Difference between two LLMs (a - b) on the questions both of them answered."""
+    llm_a: int
+    llm_b: int
+    llm_a_name: str
+    llm_b_name: str
+    criterion: str
+    shared_questions: int
+    mean_difference: float
+    low: float
+    high: float
+    p_value: float
+
+@dataclass
+class StatisticsReport:
+    test_run_id: Optional[int]
+    judge_model: Optional[str]
+    resamples: int
+    confidence: float
+    intervals: List[ConfidenceInterval] = field(default_factory=list)
+    tests: List[PairedTest] = field(default_factory=list)
+
+@dataclass
+class ScoreMatrix:
+    """Per-question mean score of every LLM: `scores[criterion]` is questions x LLMs, NaN where unanswered."""
+    llm_ids: List[int]
+    llm_names: List[str]
+    scores: Dict[str, np.ndarray]
+
+    @classmethod
+    def from_ratings(cls, rows: Sequence, llm_names: Dict[int, str]) -> "ScoreMatrix":
+        """
+        Average rating rows from JeopardyDB.get_rating_scores per question and LLM.
+
+        Args:
+            rows (Sequence): Rows of (llm_id, question_id, accuracy, coherence, completion, question_structure).
+            llm_names (Dict[int, str]): LLM names by id.
+        """
+        if not rows:
+            return cls(llm_ids=[], llm_names=[], scores={criterion: np.empty((0, 0)) for criterion in CRITERIA})
+        llm_column, question_column, *score_columns = (np.array(column, dtype=float) for column in zip(*rows))
+        llm_ids, llm_codes = np.unique(llm_column.astype(np.int64), return_inverse=True)
+        _, question_codes = np.unique(question_column.astype(np.int64), return_inverse=True)
+        shape = (question_codes.max() + 1, len(llm_ids))
+        cells = question_codes * shape[1] + llm_codes
+        scores = {}
+        for criterion, values in zip(CRITERIA, score_columns):
+            # a question can be rated more than once (several runs or judges); average those scores
+            scored = ~np.isnan(values)
+            sums = np.bincount(cells[scored], weights=values[scored], minlength=shape[0] * shape[1])
+            counts = np.bincount(cells[scored], minlength=shape[0] * shape[1])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scores[criterion] = (sums / counts).reshape(shape)
+        llm_ids = [int(llm_id) for llm_id in llm_ids]
+        return cls(llm_ids=llm_ids, llm_names=[llm_names.get(llm_id, str(llm_id)) for llm_id in llm_ids],
+                   scores=scores)
+
+def _chunks(resamples: int, questions: int) -> Iterator[int]:
+    """Split `resamples` into chunk sizes whose weight matrices stay under MAX_CHUNK_ELEMENTS."""
+    chunk_size = max(1, MAX_CHUNK_ELEMENTS // max(questions, 1))
+    for start in range(0, resamples, chunk_size):
+        yield min(chunk_size, resamples - start)
+
+def bootstrap_means(values: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Bootstrap the mean of every column of `values`, resampling whole rows (questions).
+
+    NaN cells are left out of their column's mean, so columns with different answered
+    questions share one set of resamples. Each resample draws row indexes uniformly and
+    counts them with bincount, which gives multinomial weights far faster than
+    Generator.multinomial; all columns are then reduced in one matrix product.
+
+    Args:
+        values (np.ndarray): Questions x columns.
+        resamples (int): Number of bootstrap resamples.
+        rng (np.random.Generator): Random source.
+
+    Returns:
+        np.ndarray: Resamples x columns of resampled means (NaN where a resample has no data).
+    """
+    questions = values.shape[0]
+    present = (~np.isnan(values)).astype(float)
+    filled = np.nan_to_num(values)
+    means = []
+    for chunk in _chunks(resamples, questions):
+        draws = rng.integers(0, questions, size=(chunk, questions))
+        draws += np.arange(chunk)[:, None] * questions
+        weights = np.bincount(draws.ravel(), minlength=chunk * questions).reshape(chunk, questions).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means.append((weights @ filled) / (weights @ present))
+    return np.vstack(means)
+
+def sign_flip_means(differences: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Mean of every column of `differences` under random sign flips (the paired permutation null).
+
+    NaN cells count as zero and are left out of the column's denominator.
+
+    Returns:
+        np.ndarray: Resamples x columns of permuted means.
+    """
+    questions = differences.shape[0]
+    filled = np.nan_to_num(differences)
+    counts = np.maximum((~np.isnan(differences)).sum(axis=0), 1)
+    means = []
+    for chunk in _chunks(resamples, questions):
+        # one random byte gives eight signs
+        bits = np.unpackbits(rng.integers(0, 256, size=(chunk, (questions + 7) // 8), dtype=np.uint8), axis=1)
+        signs = bits[:, :questions].astype(float) * 2 - 1
+        means.append((signs @ filled) / counts)
+    return np.vstack(means)
+
+def compute_statistics(matrix: ScoreMatrix, resamples: int = 1000, confidence: float = 0.95,
+                       seed: int = 0) -> Tuple[List[ConfidenceInterval], List[PairedTest]]:
+    """
+    Bootstrap confidence intervals for every LLM and paired tests for every pair of LLMs.
+
+    Intervals are percentile intervals over question resamples. Pairs are compared on the
+    questions both LLMs answered: the interval of the mean difference comes from a paired
+    bootstrap and the two-sided p-value from a sign-flip permutation test. All LLMs, pairs
+    and criteria are resampled together, one matrix product per chunk.
+
+    Args:
+        matrix (ScoreMatrix): Per-question scores.
+        resamples (int): Bootstrap resamples and permutations.
+        confidence (float): Interval coverage, e.g. 0.95.
+        seed (int): Random seed, so a report can be reproduced.
+
+    Returns:
+        Tuple[List[ConfidenceInterval], List[PairedTest]]
+    """
+    if not matrix.llm_ids:
+        return [], []
+    rng = np.random.default_rng(seed)
+    tail = (1 - confidence) / 2 * 100
+    pairs = list(combinations(range(len(matrix.llm_ids)), 2))
+
+    # one column per (criterion, LLM), then one per (criterion, pair)
+    score_columns = np.hstack([matrix.scores[criterion] for criterion in CRITERIA])
+    difference_columns = np.column_stack(
+        [matrix.scores[criterion][:, a] - matrix.scores[criterion][:, b] for criterion in CRITERIA for a, b in pairs]
+    ) if pairs else np.empty((score_columns.shape[0], 0))
+    columns = np.hstack([score_columns, difference_columns])
+
+    with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+        # columns without any answered question give NaN, and are skipped below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        observed = np.nanmean(columns, axis=0)
+        resampled = bootstrap_means(columns, resamples, rng)
+        low, high = np.nanpercentile(resampled, [tail, 100 - tail], axis=0)
+    permuted = np.abs(sign_flip_means(difference_columns, resamples, rng))
+    observed_differences = np.abs(observed[score_columns.shape[1]:])
+    p_values = (1 + (permuted >= observed_differences - 1e-12).sum(axis=0)) / (resamples + 1)
+    answered = (~np.isnan(columns)).sum(axis=0)
+
+    intervals = []
+    for column, (criterion, llm) in enumerate((c, l) for c in CRITERIA for l in range(len(matrix.llm_ids))):
+        if answered[column]:
+            intervals.append(ConfidenceInterval(
+                llm_id=matrix.llm_ids[llm], llm_name=matrix.llm_names[llm], criterion=criterion,
+                questions=int(answered[column]), mean=float(observed[column]),
+                low=float(low[column]), high=float(high[column])))
+    tests = []
+    offset = score_columns.shape[1]
+    for index, (criterion, (a, b)) in enumerate((c, p) for c in CRITERIA for p in pairs):
+        column = offset + index
+        if answered[column]:
+            tests.append(PairedTest(
+                llm_a=matrix.llm_ids[a], llm_b=matrix.llm_ids[b],
+                llm_a_name=matrix.llm_names[a], llm_b_name=matrix.llm_names[b], criterion=criterion,
+                shared_questions=int(answered[column]), mean_difference=float(observed[column]),
+                low=float(low[column]), high=float(high[column]), p_value=float(p_values[index])))
+    return intervals, tests
+
+class ModelStatistics:
+    """
+    Confidence intervals and paired tests memoised per (test_run, judge) until new ratings arrive.
+    """
+
+    def __init__(self, db: JeopardyDB):
+        self.db = db
+        self._cache = WatermarkCache(maxsize=16)
+
+    def report(self, test_run_id: Optional[int] = None, judge_model: Optional[str] = None,
+               resamples: int = 1000, confidence: float = 0.95) -> StatisticsReport:
+        """
+        Get the statistics report for a test run and judge.
+
+        Args:
+            test_run_id (Optional[int]): Only ratings from this test run; all runs when None.
+            judge_model (Optional[str]): Only ratings by this judge; all judges when None.
+            resamples (int): Bootstrap resamples and permutations.
+            confidence (float): Interval coverage.
+        """
+        with self.db.session_scope():
+            _, rating_watermark = self.db.get_watermarks()
+            self._cache.validate(rating_watermark)
+            key = (test_run_id, judge_model, resamples, confidence, rating_watermark)
+            report = self._cache.get(key)
+            if report is None:
+                llm_names = {llm.id: llm.name for llm in self.db.get_all_llms()}
+                matrix = ScoreMatrix.from_ratings(self.db.get_rating_scores(test_run_id, judge_model), llm_names)
+                intervals, tests = compute_statistics(matrix, resamples, confidence)
+                report = StatisticsReport(test_run_id=test_run_id, judge_model=judge_model, resamples=resamples,
+                                          confidence=confidence, intervals=intervals, tests=tests)
+                self._cache.put(key, report)
+        return report
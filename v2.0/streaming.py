@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Callable, Dict, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Marks the end of a stream relayed from a worker thread
+_END = object()
+
+async def collect_stream(stream: AsyncIterator[Dict], llm: str, prompt: str) -> Dict:
+    """
+    Drain an `astream_answer` stream into the dict `generate_answer` returns, with timings.
+
+    Streams yield {"text": delta} events while the answer is generated and, once done, an
+    event with "generated_token_count" and "input_token_count".
+
+    Args:
+        stream (AsyncIterator[Dict]): The events of one answer.
+        llm (str): The "llm" value of the result, as generate_answer names it.
+        prompt (str): The input prompt.
+
+    Returns:
+        dict: llm, prompt, answer, generated_token_count and input_token_count, plus
+        "time_to_first_token" (seconds until the first text arrived, None if none did)
+        and "latency" (seconds until the stream ended).
+    """
+    start = time.perf_counter()
+    time_to_first_token = None
+    parts = []
+    usage = {"generated_token_count": None, "input_token_count": None}
+    async for event in stream:
+        text = event.get("text")
+        if text:
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - start
+            parts.append(text)
+        for key in usage:
+            if event.get(key) is not None:
+                usage[key] = event[key]
+    return {
+        "llm": llm,
+        "prompt": prompt,
+        "answer": "".join(parts),
+        **usage,
+        "time_to_first_token": time_to_first_token,
+        "latency": time.perf_counter() - start,
+    }
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator]) -> AsyncIterator:
+    """
+    Relay a blocking iterator, such as a synchronous SDK's streaming call, to the event loop.
+
+    The iterator is created and consumed on its own thread and every item is handed over
+    as it arrives, so other streams keep running while this one waits on the network.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def hand_over(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # the event loop has already closed; nobody is waiting for this stream any more
+            stop.set()
+
+    def produce():
+        try:
+            for item in make_iterator():
+                hand_over(item)
+                if stop.is_set():
+                    return
+            hand_over(_END)
+        except Exception as e:
+            hand_over(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # a consumer that stops early (or is cancelled) lets the thread finish its current item and exit
+        stop.set()
+
+class PerLoop(Generic[T]):
+    """
+    One instance per event loop of something bound to the loop it is used on, like an
+    async SDK client whose pooled connections belong to that loop.
+
+    Adapters are shared across the process, while every asyncio.run (one per answer job)
+    has its own loop; each loop gets its own client, dropped once the loop is gone.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """The running loop's instance, created on first use. Must be called from a coroutine."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            instance = self._instances.get(loop)
+            if instance is None:
+                instance = self._instances[loop] = self.factory()
+        return instance
@@ -0,0 +1,197 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+from typing import Dict, List, Optional
+
+from answer_cache import AnswerCache
+from budget import RunBudget
+from cassette import open_cassette
+from db_operations import JeopardyDB
+from gen_jeopardy import ANSWER_CONCURRENCY, Player, aplay
+from hedging import HedgedCaller, HedgePolicy
+from llmproviders import DECODING_PARAMETERS
+from prompts import PROMPTS, generation_limits
+
+def load_grid(grid: str) -> Dict[str, List]:
+    """
+    Load a decoding grid, given inline as JSON or as the path of a JSON file.
+
+    E.g. {"temperature": [0, 0.7], "top_p": [0.9, 1.0], "top_k": [50]}; a single value
+    stands for a list of one.
+    """
+    if os.path.isfile(grid):
+        with open(grid, 'r', encoding='utf-8') as file:
+            grid = file.read()
+    parameters = json.loads(grid)
+    if not isinstance(parameters, dict) or not parameters:
+        raise ValueError("The grid must be a JSON object of decoding parameters")
+    return {name: values if isinstance(values, list) else [values] for name, values in parameters.items()}
+
+def check_grid(grid: Dict[str, List]):
+    """
+    Check that a grid only holds known decoding parameters with numeric values.
+
+    A typo would otherwise reach the provider SDKs and only fail once the sweep is running.
+
+    Raises:
+        ValueError: For an unknown parameter, or a value that is not a number.
+    """
+    unknown = sorted(set(grid) - set(DECODING_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown decoding parameters {unknown}; expected some of {list(DECODING_PARAMETERS)}")
+    for name, values in grid.items():
+        if not values:
+            raise ValueError(f"No values given for {name}")
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name} must be a number, not {value!r}")
+
+def grid_points(grid: Dict[str, List]) -> List[Dict]:
+    """
+    Every combination of the grid's values, in grid order, as decoding parameters.
+
+    E.g. {"temperature": [0, 0.7], "top_p": [0.9, 1.0]} gives four points, from
+    {"temperature": 0, "top_p": 0.9} to {"temperature": 0.7, "top_p": 1.0}.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def sweep(models_file: str, db_file: str, grid: Dict[str, List], questions_file: Optional[str] = None,
+          batch_size: int = 25, concurrency: int = ANSWER_CONCURRENCY, hedger: Optional[HedgedCaller] = None,
+          budget: Optional[RunBudget] = None) -> Dict[int, Dict]:
+    """
+    Answer the questions with every model at every point of a decoding grid.
+
+    Each point gets its own test run, whose parameters record the output limits and the
+    decoding parameters of the point. All models and points play at once on one event
+    loop, taking turns batch by batch and sharing each model's `concurrency` slots, so a
+    sweep stopped by its budget has the same questions answered at every point.
+
+    Answers at temperature 0 do not depend on top_p or top_k, so they are asked for once
+    per model and question and written to every temperature-0 test run (see AnswerCache).
+
+    Raises:
+        ValueError: If the grid holds anything but DECODING_PARAMETERS; nothing is written then.
+
+    Returns:
+        dict: The decoding parameters of each point, by test run id.
+    """
+    check_grid(grid)
+    points = grid_points(grid)
+    runs = {}
+    with JeopardyDB(db_file) as db:
+        llms = db.insert_and_return_llms_from_file(models_file)
+        if questions_file:
+            db.insert_questions_file(questions_file)
+        for decoding in points:
+            test_run_id = db.insert_test_run(PROMPTS["play"]["user"], PROMPTS["play"]["system"],
+                                             json.dumps({**generation_limits("play"), **decoding}))
+            runs[test_run_id] = decoding
+
+    players = [Player(llm, test_run_id, decoding) for test_run_id, decoding in runs.items() for llm in llms]
+    cache = AnswerCache()
+    written = asyncio.run(aplay(players, db_file, batch_size, concurrency, hedger=hedger, budget=budget,
+                                cache=cache))
+    print(f"Wrote {written} responses for {len(llms)} models at {len(points)} grid points")
+    print(f"Cache: {cache.stats()}")
+    return runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer Jeopardy questions over a grid of decoding parameters.")
+    parser.add_argument(
+        "--models_file", type=str,
+        default="data/models.jsonl",
+        help="Path to the models configuration file.")
+    parser.add_argument(
+        "--questions_file", type=str,
+        default=None,
+        help="Path to a questions file to load first; the questions already in the database are used otherwise."
+    )
+    parser.add_argument(
+        "--db_file", type=str,
+        default="output/jeopardy.db",
+        help="Path to the database file."
+    )
+    parser.add_argument(
+        "--grid", type=str,
+        default='{"temperature": [0, 0.7], "top_p": [0.9, 1.0]}',
+        help="Decoding parameters to sweep, as a JSON object of lists or the path of a JSON file."
+    )
+    parser.add_argument(
+        "--batch_size", type=int,
+        default=25,
+        help="Number of questions per committed batch."
+    )
+    parser.add_argument(
+        "--concurrency", type=int,
+        default=ANSWER_CONCURRENCY,
+        help="Number of answers streamed at once per LLM, shared by all grid points."
+    )
+    parser.add_argument(
+        "--deadline", type=float,
+        default=None,
+        help="Seconds to wait for an answer, hedge included, before giving up on it."
+    )
+    parser.add_argument(
+        "--hedge_percentile", type=float,
+        default=0,
+        help="Send a duplicate request when an answer is slower than this percentile of the model's recent latencies; 0 disables hedging."
+    )
+    parser.add_argument(
+        "--hedge_max_ratio", type=float,
+        default=0.1,
+        help="Largest share of requests that may be hedged, which caps the extra spend."
+    )
+    parser.add_argument(
+        "--time-budget", type=float,
+        default=None,
+        help="Seconds the sweep may take; no new questions are sent after that."
+    )
+    parser.add_argument(
+        "--token-budget", type=int,
+        default=None,
+        help="Input and generated tokens the sweep may spend, over all models and points."
+    )
+    parser.add_argument(
+        "--record", type=str,
+        default=None,
+        help="Record every provider call, with its timing, to this cassette (.jsonl.gz), appending to it."
+    )
+    parser.add_argument(
+        "--replay", type=str,
+        default=None,
+        help="Answer from this recorded cassette instead of calling the providers."
+    )
+    parser.add_argument(
+        "--replay_latency", action="store_true",
+        help="Wait for the recorded latency of every replayed call."
+    )
+    args = parser.parse_args()
+    try:
+        grid = load_grid(args.grid)
+        check_grid(grid)
+    except ValueError as e:
+        parser.error(str(e))
+    hedger = None
+    if args.deadline or args.hedge_percentile:
+        hedger = HedgedCaller(HedgePolicy(percentile=args.hedge_percentile, max_hedge_ratio=args.hedge_max_ratio,
+                                          deadline=args.deadline))
+    budget = None
+    if args.time_budget is not None or args.token_budget is not None:
+        budget = RunBudget(seconds=args.time_budget, tokens=args.token_budget)
+    cassette = open_cassette(args.record, args.replay, args.replay_latency)
+    try:
+        runs = sweep(args.models_file, args.db_file, grid, args.questions_file, args.batch_size, args.concurrency,
+                     hedger, budget)
+    finally:
+        if cassette is not None:
+            cassette.close()
+            print(f"Cassette: {cassette.stats()}")
+    for test_run_id, decoding in runs.items():
+        print(f"Test run {test_run_id}: {json.dumps(decoding)}")
+    if hedger is not None:
+        print(f"Hedging: {hedger.stats()}")
+    if budget is not None:
+        print(f"Budget: {budget.stats()}")
@@ -1,115 +1,256 @@
-import gradio as gr
-from db_operations import JeopardyDB  
+from db_operations import CRITERIA, JeopardyDB, TABLE_SORT_COLUMNS
+from aggregates import ScoreBoard
+from analytics import Analytics, DIMENSIONS
+from stats import ModelStatistics
+from run_diff import RunComparison
+from dashboard_cache import WatermarkCache
+from job_queue import Job, JobQueue
 from judge_manager import JudgeManager
-import plotly.graph_objs as go
+import argparse
+import html
 import random
-from collections import defaultdict
+import threading
 
-# Initialize database
+# Database used by the dashboard. Nothing is opened at import; the database, the chart
+# aggregates and the judge manager are created on first use (see get_db).
 database_file = 'outs/jeopardy.db'
-db = JeopardyDB(db_file=database_file)
+
+_lazy_objects = {}
+_lazy_lock = threading.RLock()
+
+def _lazy(name, factory):
+    """Return the shared object `name`, creating it with `factory` on first use."""
+    if name not in _lazy_objects:
+        with _lazy_lock:
+            if name not in _lazy_objects:
+                _lazy_objects[name] = factory()
+    return _lazy_objects[name]
+
+def get_db() -> JeopardyDB:
+    # The dashboard only reads, so it uses a query-only connection; every callback runs
+    # in its own session_scope so Gradio worker threads never share a Session.
+    return _lazy("db", lambda: JeopardyDB(db_file=database_file, read_only=True))
+
+def get_score_board() -> ScoreBoard:
+    # Spider chart aggregates, invalidated whenever new ratings are written
+    return _lazy("score_board", lambda: ScoreBoard(get_db()))
+
+def get_analytics() -> Analytics:
+    # Score cubes for the Analytics tab, rebuilt only when new ratings are written
+    return _lazy("analytics", lambda: Analytics(get_db()))
+
+def get_model_statistics() -> ModelStatistics:
+    # Bootstrap intervals and paired tests, recomputed only when new ratings are written
+    return _lazy("model_statistics", lambda: ModelStatistics(get_db()))
+
+def get_run_comparison() -> RunComparison:
+    # Run-to-run diffs for the Run Diff tab, recomputed only when new ratings are written
+    return _lazy("run_comparison", lambda: RunComparison(get_db()))
+
+def get_judge_manager() -> JudgeManager:
+    # Opens a writable connection, so it is only created once a judgement is requested
+    return _lazy("judge_manager", lambda: JudgeManager(database_file))
+
+# Number of responses fetched per keyset page
+PAGE_SIZE = 100
+
+# Rendered table pages, invalidated whenever new responses or ratings are written
+page_cache = WatermarkCache(maxsize=256)
+
+# Judging and generation started from the dashboard run here, off the request threads
+job_queue = JobQueue(max_workers=2)
+
+# Responses judged per unit of work in dashboard jobs; small so partial results show up quickly
+DASHBOARD_JOB_BATCH_SIZE = 10
+
+# Seconds between live refreshes: job progress, and new rows written by any process
+LIVE_REFRESH_SECONDS = 2.0
+
+# Most category rows shown in the Analytics tab; categories are listed weakest first
+ANALYTICS_MAX_ROWS = 40
+
+# Default number of bootstrap resamples and sign-flip permutations in the Statistics tab
+STATISTICS_RESAMPLES = 1000
+
+# Score change beyond which a question counts as a regression or improvement in the Run Diff tab
+RUN_DIFF_THRESHOLD = 0.25
+
+# Most regressions and improvements listed in the Run Diff tab
+RUN_DIFF_MAX_ROWS = 50
 
 def get_llm_options():
-    llms = db.get_all_llms()
+    db = get_db()
+    with db.session_scope():
+        llms = db.get_all_llms()
     return [(llm.name, llm.id) for llm in llms]
 
 def get_judge_options():
-    judges = db.get_llm_judge_models()
+    db = get_db()
+    with db.session_scope():
+        judges = db.get_llm_judge_models()
     return [(judge.judge_model) for judge in judges]
 
+def get_test_run_options():
+    db = get_db()
+    with db.session_scope():
+        test_runs = db.get_test_runs()
+    return [("All test runs", 0)] + [(f"Run {run.id} ({run.run_time:%Y-%m-%d %H:%M})", run.id) for run in test_runs]
+
+TABLE_HEADER = ("<table id='response_table' style='width:100%; border: 1px solid black;'>"
+                "<tr><th>Prompt</th><th>Response</th><th>Generated Tokens</th><th>Input Token Count</th>"
+                "<th>Accuracy</th><th>Coherence</th><th>Completion</th><th>Question Structure</th>"
+                "<th>Judge Generated Tokens</th><th>Judge Input Tokens</th></tr>")
+
+def _cell(value) -> str:
+    return "" if value is None else html.escape(str(value))
+
+def _response_table_html(rows) -> str:
+    """Render one page of response rows; rating cells stay empty where there is no rating."""
+    table_rows = [
+        f"<tr><td>{_cell(res.prompt)}</td><td>{_cell(res.response)}</td><td>{_cell(res.generated_tokens)}</td>"
+        f"<td>{_cell(res.input_token_count)}</td><td>{_cell(res.accuracy)}</td><td>{_cell(res.coherence)}</td>"
+        f"<td>{_cell(res.completion)}</td><td>{_cell(res.question_structure)}</td>"
+        f"<td>{_cell(res.judge_generated_tokens)}</td><td>{_cell(res.judge_input_token_count)}</td></tr>"
+        for res in rows
+    ]
+    return TABLE_HEADER + "".join(table_rows) + "</table>"
+
+def render_response_page(llm_id, judge_model=None, test_run_id=None, sort_by="id", descending=False,
+                         search="", page_size=PAGE_SIZE, cursor=None):
+    """
+    Render a single page of an LLM's responses, from cache when nothing has changed.
+
+    Only the visible page is queried and rendered. Cache entries are keyed by the
+    database watermark, so new responses or ratings invalidate them.
+
+    Returns:
+        Tuple[str, Optional[Tuple]]: The page as HTML and the cursor of the next page,
+        or None on the last page.
+    """
+    test_run_id = test_run_id or None
+    page_size = int(page_size or PAGE_SIZE)
+    db = get_db()
+    with db.session_scope():
+        watermark = db.get_watermarks()
+        page_cache.validate(watermark)
+        key = (llm_id, judge_model, test_run_id, sort_by, bool(descending), search or "", page_size, cursor, watermark)
+        page = page_cache.get(key)
+        if page is None:
+            rows = db.get_response_table_page(llm_id, judge_model, test_run_id, sort_by, bool(descending),
+                                              search or None, cursor, page_size)
+            if not rows and cursor is None:
+                page = ("No responses found for the selected LLM.", None)
+            else:
+                next_cursor = (rows[-1].sort_key, rows[-1].id) if len(rows) == page_size else None
+                page = (_response_table_html(rows), next_cursor)
+            page_cache.put(key, page)
+    return page
+
 def display_llm_responses(selected_llm_id):
-    # Clear the existing content
-    llm_responses.value = ""
-
-    responses = db.get_llm_responses_by_llm_id(selected_llm_id)
-    if not responses:
-        return "No responses found for the selected LLM."
-
-    # Create an HTML table for the responses with an ID and extra columns for judge ratings
-    table_html = ("<table id='response_table' style='width:100%; border: 1px solid black;'>"
-                  "<tr><th>Prompt</th><th>Response</th><th>Generated Tokens</th><th>Input Token Count</th>"
-                  "<th>Accuracy</th><th>Coherence</th><th>Completion</th><th>Question Structure</th>"
-                  "<th>Judge Generated Tokens</th><th>Judge Input Tokens</th></tr>")
-    
-    for res in responses:
-        # Add empty cells for the judge ratings
-        table_html += (f"<tr><td>{res.prompt}</td><td>{res.response}</td><td>{res.generated_tokens}</td>"
-                       f"<td>{res.input_token_count}</td><td></td><td></td><td></td><td></td><td></td><td></td></tr>")
-    
-    table_html += "</table>"
+    table_html, _ = render_response_page(selected_llm_id)
     return table_html
 
 def display_judge_ratings(selected_llm_id, selected_judge):
-    # Clear the existing content
-    llm_responses.value = ""
-    judge_ratings.value = ""
-
-    responses = db.get_llm_responses_by_llm_id(selected_llm_id)
-    ratings = db.get_judge_ratings_for_llm_by_model(selected_llm_id, selected_judge)
-    rating_dict = {rating.llm_response_id: rating for rating in ratings}
-
-    table_html = ("<table id='response_table' style='width:100%; border: 1px solid black;'>"
-                  "<tr><th>Prompt</th><th>Response</th><th>Generated Tokens</th><th>Input Token Count</th>"
-                  "<th>Accuracy</th><th>Coherence</th><th>Completion</th><th>Question Structure</th>"
-                  "<th>Judge Generated Tokens</th><th>Judge Input Tokens</th></tr>")
-    
-    for res in responses:
-        rating = rating_dict.get(res.id, None)
-        if rating:
-            table_html += (f"<tr><td>{res.prompt}</td><td>{res.response}</td><td>{res.generated_tokens}</td>"
-                           f"<td>{res.input_token_count}</td><td>{rating.accuracy}</td><td>{rating.coherence}</td>"
-                           f"<td>{rating.completion}</td><td>{rating.question_structure}</td>"
-                           f"<td>{rating.generated_tokens}</td><td>{rating.input_token_count}</td></tr>")
-        else:
-            # Fill with empty ratings if no ratings available
-            table_html += (f"<tr><td>{res.prompt}</td><td>{res.response}</td><td>{res.generated_tokens}</td>"
-                           f"<td>{res.input_token_count}</td><td></td><td></td><td></td><td></td><td></td><td></td></tr>")
-    
-    table_html += "</table>"
-    llm_responses.value = table_html
-    judge_ratings.value = table_html
-
-def generate_judgement(selected_llm_id: int, judge_llm: str):
-    # Call the generate_judgement function
-    manager.generate_judgements(database_file, judge_llm, selected_llm_id)
-
-    # Update the LLM dropdown, Judge dropdown, and Judge ratings
-    llm_responses.value = display_llm_responses(selected_llm_id)
-    judge_ratings.value = display_judge_ratings(selected_llm_id, judge_llm)
-
-    return llm_responses.value, judge_ratings.value
-
-def plot_spider_chart():
-    # Get the evaluation data from the database
-    evaluation_data = db.get_evaluation_data()
-
-    # Group the data by LLM
-    llm_data = defaultdict(list)
-    for data in evaluation_data:
-        llm_data[data['llm_name']].append(data)
+    table_html, _ = render_response_page(selected_llm_id, selected_judge)
+    return table_html
+
+def _show_page(table_args, cursors):
+    """Render the page starting at the last cursor in `cursors` and build the pager state."""
+    if table_args[0] is None:
+        return "", "", {"cursors": [None], "next": None}
+    table_html, next_cursor = render_response_page(*table_args, cursor=cursors[-1])
+    page_label = f"Page {len(cursors)}" + ("" if next_cursor else " (last)")
+    return table_html, page_label, {"cursors": cursors, "next": next_cursor}
+
+def first_page(*table_args):
+    return _show_page(table_args, [None])
+
+def next_page(*args):
+    *table_args, pager = args
+    if not pager["next"]:
+        return _show_page(table_args, pager["cursors"])
+    return _show_page(table_args, pager["cursors"] + [pager["next"]])
+
+def previous_page(*args):
+    *table_args, pager = args
+    return _show_page(table_args, pager["cursors"][:-1] or [None])
+
+def _judgement_job(job: Job, selected_llm_id: int, judge_llm: str, test_run_id=None):
+    get_judge_manager().generate_judgements(database_file, judge_llm, selected_llm_id, test_run_id, job=job,
+                                batch_size=DASHBOARD_JOB_BATCH_SIZE)
+
+def _answer_job(job: Job, selected_llm_id: int, test_run_id=None):
+    # imported here so the dashboard does not load the provider SDKs until answers are requested
+    from gen_jeopardy import generate_answers_for_llm
+    return generate_answers_for_llm(job, database_file, selected_llm_id, test_run_id)
+
+def generate_judgement(selected_llm_id: int, judge_llm: str, test_run_id=None):
+    if selected_llm_id is None or not judge_llm:
+        return None, "Select an LLM and a judge first."
+    # Judging runs in the background; progress is polled by refresh_view
+    job = job_queue.submit(f"Judge LLM {selected_llm_id} with {judge_llm}", _judgement_job,
+                           selected_llm_id, judge_llm, test_run_id or None)
+    return job.id, job_status()
+
+def generate_answers(selected_llm_id: int, test_run_id=None):
+    if selected_llm_id is None:
+        return None, "Select an LLM first."
+    job = job_queue.submit(f"Answer questions with LLM {selected_llm_id}", _answer_job,
+                           selected_llm_id, test_run_id or None)
+    return job.id, job_status()
+
+def cancel_job(job_id):
+    if job_id is not None:
+        job_queue.cancel(job_id)
+    return job_status()
+
+def job_status() -> str:
+    jobs = sorted(job_queue.jobs(), key=lambda job: job.id, reverse=True)[:5]
+    return "\n".join(f"- {job.summary()}" for job in jobs) or "No background jobs."
+
+def refresh_view(*args):
+    """
+    Timer callback: report job progress and follow new rows as they are written.
+
+    Each tick compares the response and rating watermarks with those seen on the previous
+    tick. Only when they moved, whether from a dashboard job or another process, are the
+    current page and the spider chart redrawn; the chart's totals are folded forward with
+    just the new ratings, so a refresh costs the same however large the run is.
+    """
+    import gradio as gr
+
+    *table_args, pager, live, seen_watermark = args
+    db = get_db()
+    with db.session_scope():
+        watermark = db.get_watermarks()
+    if not live or watermark == seen_watermark:
+        return job_status(), gr.update(), gr.update(), gr.update(), gr.update(), seen_watermark
+    judge_model, test_run_id = table_args[1], table_args[2]
+    return (job_status(), *_show_page(table_args, pager["cursors"]),
+            plot_spider_chart(test_run_id, judge_model), watermark)
+
+def plot_spider_chart(test_run_id=None, judge_model=None):
+    import plotly.graph_objs as go
+
+    # Per-LLM means come from GROUP BY totals that are folded forward as new ratings arrive
+    llm_scores = get_score_board().summary(test_run_id or None, judge_model or None)
 
     # Create the spider chart
     metrics = ['Accuracy', 'Coherence', 'Completion', 'Question Structure', 'Avg. Generated Tokens', 'Avg. Input Tokens', 'Avg. Judge Input Tokens']
     data = []
-    colors = [f'rgb({random.randint(0, 255)}, {random.randint(0, 255)}, {random.randint(0, 255)})' for _ in range(len(llm_data))]
-
-    for i, (llm_name, llm_responses) in enumerate(llm_data.items()):
-        filtered_responses = [r for r in llm_responses if None not in r.values()]
-        if not filtered_responses:
-            continue
-        accuracy = sum(map(lambda r: r['accuracy'], filtered_responses)) / len(filtered_responses)
-        coherence = sum(map(lambda r: r['coherence'], filtered_responses)) / len(filtered_responses)
-        completion = sum(map(lambda r: r['completion'], filtered_responses)) / len(filtered_responses)
-        question_structure = sum(map(lambda r: r['question_structure'], filtered_responses)) / len(filtered_responses)
-        avg_generated_tokens = sum(map(lambda r: r['generated_tokens'], llm_responses)) / len(llm_responses)
-        avg_input_tokens = sum(map(lambda r: r['input_token_count'], llm_responses)) / len(llm_responses)
-        avg_judge_input_tokens = sum(map(lambda r: r['judge_input_token_count'], llm_responses)) / len(llm_responses)
+    # colours are seeded by LLM id so they stay put when the chart is redrawn live
+    colors = []
+    for score in llm_scores:
+        rng = random.Random(score.llm_id)
+        colors.append(f'rgb({rng.randint(0, 255)}, {rng.randint(0, 255)}, {rng.randint(0, 255)})')
 
+    for i, score in enumerate(llm_scores):
         trace = go.Scatterpolar(
-            r=[accuracy, coherence, completion, question_structure, avg_generated_tokens, avg_input_tokens, avg_judge_input_tokens],
+            r=[score.accuracy, score.coherence, score.completion, score.question_structure,
+               score.avg_generated_tokens, score.avg_input_tokens, score.avg_judge_input_tokens],
             theta=metrics,
             fill='toself',
-            name=llm_name,
+            name=score.llm_name,
             line=dict(color=colors[i], width=2)
         )
         data.append(trace)
@@ -126,22 +267,244 @@ def plot_spider_chart():
     )
 
     fig = go.Figure(data=data, layout=layout)
-    spider_chart.value = fig.to_html(full_html=False, default_height=500, default_width=800)
     return fig
 
-with gr.Blocks() as interface:
-    manager = JudgeManager(database_file)
-    llm_dropdown = gr.Dropdown(label="Select LLM", choices=get_llm_options())
-    judge_dropdown = gr.Dropdown(label="Select Judge", choices=get_judge_options())
-    gen_judgement_button = gr.Button(value="Generate Judgement")
-    plot_chart_button = gr.Button(value="Plot Spider Chart")
-    llm_responses = gr.HTML()
-    judge_ratings = gr.HTML()
-    spider_chart = gr.HTML()
-
-    llm_dropdown.change(fn=display_llm_responses, inputs=llm_dropdown, outputs=llm_responses)
-    judge_dropdown.change(fn=display_judge_ratings, inputs=[llm_dropdown, judge_dropdown], outputs=llm_responses)
-    gen_judgement_button.click(fn=generate_judgement, inputs=[llm_dropdown, judge_dropdown], outputs=[llm_responses, judge_ratings])
-    plot_chart_button.click(fn=plot_spider_chart, inputs=[], outputs=[gr.Plot()])
-
-    interface.launch()
+def _range(low, high):
+    # Gradio number boxes send None or 0 when left empty
+    return (low or None, high or None)
+
+def analyse_scores(test_run_id, judge_model, dimension, metric, value_min=None, value_max=None,
+                   year_min=None, year_max=None, min_count=1):
+    """
+    Break each LLM's mean score down by a question attribute, served from the score cube.
+
+    Returns:
+        Tuple: A heatmap of slices x LLMs and the same numbers as an HTML table.
+    """
+    import plotly.graph_objs as go
+
+    cube = get_analytics().cube(test_run_id or None, judge_model or None)
+    # categories are too many to list in order, so show where the models are weakest
+    pivot = cube.pivot(dimension, metric, _range(value_min, value_max), _range(year_min, year_max),
+                       min_count=int(min_count or 1), limit=ANALYTICS_MAX_ROWS if dimension == "category" else None,
+                       weakest_first=dimension == "category")
+    if not pivot.labels:
+        return go.Figure(), "No ratings match the selected filters."
+
+    labels = [str(label) for label in pivot.labels]
+    fig = go.Figure(data=[go.Heatmap(z=pivot.means, x=pivot.llm_names, y=labels, zmin=0, zmax=1,
+                                     colorscale="RdYlGn", hoverongaps=False)],
+                    layout=go.Layout(title=f"{metric.replace('_', ' ').title()} by {dimension}",
+                                     height=max(400, 22 * len(labels)), yaxis=dict(autorange="reversed")))
+
+    header = "".join(f"<th>{_cell(name)}</th>" for name in pivot.llm_names)
+    rows = []
+    for label, means, counts in zip(labels, pivot.means, pivot.counts):
+        cells = "".join("<td></td>" if mean != mean else f"<td>{mean:.3f} ({count})</td>"
+                        for mean, count in zip(means, counts))
+        rows.append(f"<tr><td>{_cell(label)}</td>{cells}</tr>")
+    table_html = (f"<table style='width:100%; border: 1px solid black;'><tr><th>{_cell(dimension)}</th>{header}</tr>"
+                  + "".join(rows) + "</table>")
+    return fig, table_html
+
+def show_statistics(test_run_id, judge_model, criterion, resamples=STATISTICS_RESAMPLES, confidence=0.95):
+    """
+    Confidence intervals per LLM and paired tests between LLMs for one criterion.
+
+    Returns:
+        Tuple: A bar chart of means with interval error bars, the intervals as an HTML
+        table and the paired tests as an HTML table.
+    """
+    import plotly.graph_objs as go
+
+    confidence = float(confidence or 0.95)
+    report = get_model_statistics().report(test_run_id or None, judge_model or None,
+                                           int(resamples or STATISTICS_RESAMPLES), confidence)
+    intervals = [interval for interval in report.intervals if interval.criterion == criterion]
+    tests = [test for test in report.tests if test.criterion == criterion]
+    if not intervals:
+        return go.Figure(), "No ratings for the selected test run and judge.", ""
+
+    fig = go.Figure(data=[go.Bar(
+        x=[interval.llm_name for interval in intervals],
+        y=[interval.mean for interval in intervals],
+        error_y=dict(type="data", symmetric=False,
+                     array=[interval.high - interval.mean for interval in intervals],
+                     arrayminus=[interval.mean - interval.low for interval in intervals]))],
+        layout=go.Layout(title=f"Mean {criterion.replace('_', ' ')} with {confidence:.0%} bootstrap intervals",
+                         yaxis=dict(range=[0, 1])))
+
+    interval_rows = "".join(
+        f"<tr><td>{_cell(interval.llm_name)}</td><td>{interval.questions}</td><td>{interval.mean:.4f}</td>"
+        f"<td>[{interval.low:.4f}, {interval.high:.4f}]</td></tr>" for interval in intervals)
+    intervals_html = ("<table style='width:100%; border: 1px solid black;'><tr><th>LLM</th><th>Questions</th>"
+                      "<th>Mean</th><th>Interval</th></tr>" + interval_rows + "</table>")
+
+    alpha = 1 - confidence
+    test_rows = "".join(
+        f"<tr><td>{_cell(test.llm_a_name)}</td><td>{_cell(test.llm_b_name)}</td><td>{test.shared_questions}</td>"
+        f"<td>{test.mean_difference:+.4f}</td><td>[{test.low:+.4f}, {test.high:+.4f}]</td>"
+        f"<td>{test.p_value:.4f}</td><td>{'yes' if test.p_value < alpha else 'no'}</td></tr>" for test in tests)
+    tests_html = ("<table style='width:100%; border: 1px solid black;'><tr><th>LLM A</th><th>LLM B</th>"
+                  "<th>Shared Questions</th><th>Mean Difference (A - B)</th><th>Interval</th><th>p-value</th>"
+                  f"<th>Significant at {alpha:.2f}</th></tr>" + test_rows + "</table>")
+    return fig, intervals_html, tests_html
+
+def _changes_table(comparison, diff, changes) -> str:
+    if not changes:
+        return "No questions changed by more than the threshold."
+    answers = comparison.answers(diff, changes)
+    rows = []
+    for change in changes:
+        clue, expected, base_response = answers.get((diff.base_run_id, change.question_id, change.llm_id),
+                                                    ("", "", ""))
+        compare_response = answers.get((diff.compare_run_id, change.question_id, change.llm_id), ("", "", ""))[2]
+        rows.append(f"<tr><td>{_cell(change.llm_name)}</td><td>{_cell(clue)}</td><td>{_cell(expected)}</td>"
+                    f"<td>{_cell(base_response)}</td><td>{_cell(compare_response)}</td>"
+                    f"<td>{change.base:.2f}</td><td>{change.compare:.2f}</td><td>{change.delta:+.2f}</td></tr>")
+    return ("<table style='width:100%; border: 1px solid black;'><tr><th>LLM</th><th>Clue</th><th>Answer</th>"
+            f"<th>Run {diff.base_run_id} Response</th><th>Run {diff.compare_run_id} Response</th>"
+            f"<th>Run {diff.base_run_id}</th><th>Run {diff.compare_run_id}</th><th>Change</th></tr>"
+            + "".join(rows) + "</table>")
+
+def diff_runs(base_run_id, compare_run_id, judge_model, criterion, threshold=RUN_DIFF_THRESHOLD, llm_id=None):
+    """
+    Compare two test runs question by question.
+
+    Returns:
+        Tuple: Per-LLM shifts, the largest regressions and the largest improvements, as HTML tables.
+    """
+    if not base_run_id or not compare_run_id:
+        return "Select two test runs.", "", ""
+    threshold = float(threshold if threshold is not None else RUN_DIFF_THRESHOLD)
+    comparison = get_run_comparison()
+    diff = comparison.diff(int(base_run_id), int(compare_run_id), judge_model or None)
+    shifts = diff.shifts(criterion, threshold)
+    if not shifts:
+        return "No ratings for these test runs and judge.", "", ""
+
+    def mean(value):
+        return "" if value is None else f"{value:.4f}"
+
+    shift_rows = "".join(
+        f"<tr><td>{_cell(shift.llm_name)}</td><td>{shift.shared_questions}</td><td>{shift.base_only}</td>"
+        f"<td>{shift.compare_only}</td><td>{mean(shift.base_mean)}</td><td>{mean(shift.compare_mean)}</td>"
+        f"<td>{'' if shift.mean_delta is None else f'{shift.mean_delta:+.4f}'}</td>"
+        f"<td>{shift.regressions}</td><td>{shift.improvements}</td></tr>" for shift in shifts)
+    shifts_html = ("<table style='width:100%; border: 1px solid black;'><tr><th>LLM</th><th>Shared Questions</th>"
+                   f"<th>Only In Run {diff.base_run_id}</th><th>Only In Run {diff.compare_run_id}</th>"
+                   f"<th>Run {diff.base_run_id} Mean</th><th>Run {diff.compare_run_id} Mean</th><th>Change</th>"
+                   "<th>Regressions</th><th>Improvements</th></tr>" + shift_rows + "</table>")
+    llm_id = llm_id or None
+    regressions = diff.changes(criterion, threshold, RUN_DIFF_MAX_ROWS, regressions=True, llm_id=llm_id)
+    improvements = diff.changes(criterion, threshold, RUN_DIFF_MAX_ROWS, regressions=False, llm_id=llm_id)
+    return (shifts_html, _changes_table(comparison, diff, regressions),
+            _changes_table(comparison, diff, improvements))
+
+def build_interface():
+    """Build the dashboard UI. Gradio is imported here so the callbacks above can be imported without it."""
+    import gradio as gr
+
+    with gr.Blocks() as interface:
+        llm_dropdown = gr.Dropdown(label="Select LLM", choices=get_llm_options())
+        judge_dropdown = gr.Dropdown(label="Select Judge", choices=get_judge_options())
+        test_run_dropdown = gr.Dropdown(label="Test Run", choices=get_test_run_options(), value=0)
+        with gr.Tab("Responses"):
+            with gr.Row():
+                gen_judgement_button = gr.Button(value="Generate Judgement")
+                gen_answers_button = gr.Button(value="Generate Answers")
+                cancel_button = gr.Button(value="Cancel Job")
+                plot_chart_button = gr.Button(value="Plot Spider Chart")
+            job_state = gr.State(None)
+            job_progress = gr.Markdown()
+            live_checkbox = gr.Checkbox(label="Live refresh", value=True)
+            watermark_state = gr.State(None)
+            live_timer = gr.Timer(LIVE_REFRESH_SECONDS)
+            with gr.Row():
+                sort_dropdown = gr.Dropdown(label="Sort By", choices=list(TABLE_SORT_COLUMNS), value="id")
+                descending_checkbox = gr.Checkbox(label="Descending", value=False)
+                search_box = gr.Textbox(label="Filter (response, category or clue)")
+                page_size_dropdown = gr.Dropdown(label="Rows Per Page", choices=[25, 50, 100, 250], value=PAGE_SIZE)
+            with gr.Row():
+                previous_button = gr.Button(value="< Previous")
+                page_label = gr.Markdown()
+                next_button = gr.Button(value="Next >")
+            pager_state = gr.State({"cursors": [None], "next": None})
+            llm_responses = gr.HTML()
+            spider_plot = gr.Plot()
+        with gr.Tab("Analytics"):
+            with gr.Row():
+                dimension_dropdown = gr.Dropdown(label="Break Down By", choices=list(DIMENSIONS), value="category")
+                metric_dropdown = gr.Dropdown(label="Criterion", choices=list(CRITERIA), value="accuracy")
+                min_count_number = gr.Number(label="Min Ratings Per Cell", value=1, precision=0)
+            with gr.Row():
+                value_min_number = gr.Number(label="Min Value ($)", precision=0)
+                value_max_number = gr.Number(label="Max Value ($)", precision=0)
+                year_min_number = gr.Number(label="From Year", precision=0)
+                year_max_number = gr.Number(label="To Year", precision=0)
+            analyse_button = gr.Button(value="Analyse")
+            analytics_plot = gr.Plot()
+            analytics_table = gr.HTML()
+        with gr.Tab("Statistics"):
+            with gr.Row():
+                statistics_metric_dropdown = gr.Dropdown(label="Criterion", choices=list(CRITERIA), value="accuracy")
+                resamples_number = gr.Number(label="Resamples", value=STATISTICS_RESAMPLES, precision=0)
+                confidence_dropdown = gr.Dropdown(label="Confidence", choices=[0.9, 0.95, 0.99], value=0.95)
+            statistics_button = gr.Button(value="Compute Statistics")
+            statistics_plot = gr.Plot()
+            intervals_table = gr.HTML()
+            tests_table = gr.HTML()
+        with gr.Tab("Run Diff"):
+            with gr.Row():
+                base_run_dropdown = gr.Dropdown(label="Base Run", choices=get_test_run_options()[1:])
+                compare_run_dropdown = gr.Dropdown(label="Compare Run", choices=get_test_run_options()[1:])
+                diff_metric_dropdown = gr.Dropdown(label="Criterion", choices=list(CRITERIA), value="accuracy")
+                threshold_number = gr.Number(label="Change Threshold", value=RUN_DIFF_THRESHOLD)
+            diff_button = gr.Button(value="Compare Runs")
+            shifts_table = gr.HTML()
+            gr.Markdown("Regressions (the selected LLM only, when one is selected)")
+            regressions_table = gr.HTML()
+            gr.Markdown("Improvements")
+            improvements_table = gr.HTML()
+
+        table_inputs = [llm_dropdown, judge_dropdown, test_run_dropdown, sort_dropdown,
+                        descending_checkbox, search_box, page_size_dropdown]
+        table_outputs = [llm_responses, page_label, pager_state]
+        for control in table_inputs:
+            if control is not search_box:
+                control.change(fn=first_page, inputs=table_inputs, outputs=table_outputs)
+        search_box.submit(fn=first_page, inputs=table_inputs, outputs=table_outputs)
+        next_button.click(fn=next_page, inputs=table_inputs + [pager_state], outputs=table_outputs)
+        previous_button.click(fn=previous_page, inputs=table_inputs + [pager_state], outputs=table_outputs)
+        gen_judgement_button.click(fn=generate_judgement, inputs=[llm_dropdown, judge_dropdown, test_run_dropdown],
+                                   outputs=[job_state, job_progress])
+        gen_answers_button.click(fn=generate_answers, inputs=[llm_dropdown, test_run_dropdown],
+                                 outputs=[job_state, job_progress])
+        cancel_button.click(fn=cancel_job, inputs=[job_state], outputs=[job_progress])
+        live_timer.tick(fn=refresh_view, inputs=table_inputs + [pager_state, live_checkbox, watermark_state],
+                        outputs=[job_progress] + table_outputs + [spider_plot, watermark_state])
+        plot_chart_button.click(fn=plot_spider_chart, inputs=[test_run_dropdown, judge_dropdown], outputs=[spider_plot])
+        analyse_button.click(fn=analyse_scores,
+                             inputs=[test_run_dropdown, judge_dropdown, dimension_dropdown, metric_dropdown,
+                                     value_min_number, value_max_number, year_min_number, year_max_number,
+                                     min_count_number],
+                             outputs=[analytics_plot, analytics_table])
+        statistics_button.click(fn=show_statistics,
+                                inputs=[test_run_dropdown, judge_dropdown, statistics_metric_dropdown,
+                                        resamples_number, confidence_dropdown],
+                                outputs=[statistics_plot, intervals_table, tests_table])
+        diff_button.click(fn=diff_runs,
+                          inputs=[base_run_dropdown, compare_run_dropdown, judge_dropdown, diff_metric_dropdown,
+                                  threshold_number, llm_dropdown],
+                          outputs=[shifts_table, regressions_table, improvements_table])
+    return interface
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Browse responses and judge ratings.")
+    parser.add_argument(
+        "--db_file", type=str,
+        default=database_file,
+        help="Path to the database file.")
+    args = parser.parse_args()
+    database_file = args.db_file
+    build_interface().launch()
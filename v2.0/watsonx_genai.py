@@ -2,9 +2,13 @@ from genai.client import Client
 from genai.credentials import Credentials
 from genai.schema import TextGenerationParameters, TextGenerationReturnOptions, DecodingMethod
 import os
+from typing import AsyncIterator, Dict, List, Optional
 
 from dotenv import load_dotenv
 
+from hedging import request_timeout
+from streaming import collect_stream, iterate_in_thread
+
 load_dotenv()
 
 class WatsonxGenerativeAI:
@@ -15,18 +19,46 @@ class WatsonxGenerativeAI:
             raise ValueError("Missing GENAI_KEY environment variable")
 
         # Initialize the Generative AI client
-        self.client = Client(credentials=Credentials.from_env())
+        self.client = Client(credentials=Credentials.from_env(),
+                             config={"api_client_config": {"client_options": {"timeout": request_timeout()}}})
 
         # Initialize the model object
         self.model = None
 
-    def generate_answer(self, prompt: str, model_name: str = "ibm/granite-13b-instruct-v2"):
+    def _parameters(self, max_tokens: Optional[int], stop: Optional[List[str]],
+                    decoding: Optional[Dict]) -> TextGenerationParameters:
+        sampling = {"temperature": 0.7, "top_k": 50, "top_p": 1, **(decoding or {})}
+        if sampling["temperature"] == 0:
+            # sampling needs a positive temperature; temperature 0 means greedy decoding
+            return TextGenerationParameters(
+                decoding_method=DecodingMethod.GREEDY,
+                max_new_tokens=max_tokens or 500,
+                min_new_tokens=5,
+                stop_sequences=stop or None,
+                return_options=TextGenerationReturnOptions(input_text=True),
+            )
+        return TextGenerationParameters(
+            decoding_method=DecodingMethod.SAMPLE,
+            max_new_tokens=max_tokens or 500,
+            min_new_tokens=5,
+            stop_sequences=stop or None,
+            **sampling,
+            return_options=TextGenerationReturnOptions(input_text=True),
+        )
+
+    def generate_answer(self, prompt: str, model_name: str = "ibm/granite-13b-instruct-v2",
+                        max_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                        decoding: Optional[Dict] = None):
         """
         Calls the IBM watsonx Generative API with a given prompt and model name.
 
         Args:
             prompt (str): The text prompt to send to the model.
             model_name (str, optional): The name of the generative model to use. Defaults to "ibm/granite-13b-instruct-v2".
+            max_tokens (Optional[int]): Most tokens to generate; 500 when None.
+            stop (Optional[List[str]]): Sequences that end the answer.
+            decoding (Optional[Dict]): temperature (0.7), top_k (50) and top_p (1) when not given;
+                temperature 0 decodes greedily.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -36,19 +68,9 @@ class WatsonxGenerativeAI:
                 - "generated_token_count": The number of tokens in the generated response.
                 - "input_token_count": The number of tokens in the input prompt.
         """
-        parameters = TextGenerationParameters(
-            decoding_method=DecodingMethod.SAMPLE,
-            max_new_tokens=500,
-            min_new_tokens=5,
-            temperature=0.7,
-            top_k=50,
-            top_p=1,
-            return_options=TextGenerationReturnOptions(input_text=True),
-        )
-
         for response in self.client.text.generation.create(model_id=model_name, 
                         inputs=prompt, 
-                        parameters=parameters):
+                        parameters=self._parameters(max_tokens, stop, decoding)):
             result = response.results[0].generated_text
 
         return {
@@ -59,6 +81,43 @@ class WatsonxGenerativeAI:
             "input_token_count": response.results[0].input_token_count
         }
 
+    async def astream_answer(self, prompt: str, model_name: str = "ibm/granite-13b-instruct-v2",
+                             max_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                             decoding: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Stream the watsonx model's answer as it is generated.
+
+        The genai SDK only streams synchronously, so its stream is read on a worker thread
+        and relayed to the event loop event by event.
+
+        Yields:
+            dict: {"text": ...} for each piece of the answer, and the token counts as
+            {"generated_token_count": ..., "input_token_count": ...} when the API reports them.
+        """
+        def stream():
+            return self.client.text.generation.create_stream(model_id=model_name, input=prompt,
+                                                             parameters=self._parameters(max_tokens, stop, decoding))
+
+        async for response in iterate_in_thread(stream):
+            for result in response.results or []:
+                if result.generated_text:
+                    yield {"text": result.generated_text}
+                # token counts are running totals, so the last ones reported win
+                if result.generated_token_count is not None or result.input_token_count is not None:
+                    yield {"generated_token_count": result.generated_token_count,
+                           "input_token_count": result.input_token_count}
+
+    async def agenerate_answer(self, prompt: str, model_name: str = "ibm/granite-13b-instruct-v2",
+                               max_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                               decoding: Optional[Dict] = None) -> Dict:
+        """
+        Like generate_answer, but streamed, so many answers can be generated on one event loop.
+
+        The result also has "time_to_first_token" and "latency", in seconds.
+        """
+        return await collect_stream(self.astream_answer(prompt, model_name, max_tokens, stop, decoding), model_name,
+                                    prompt)
+
 
 # Example usage
 if __name__ == "__main__":